@@ -170,11 +170,19 @@ export async function POST(request: NextRequest, { params }: { params: { id: str
   try {
     const productId = params.id
 
+    // Pass the visitor's address and agent through so Django can de-duplicate repeat views
+    const forwardedFor = request.headers.get('x-forwarded-for') || request.ip || ''
+    const userAgent = request.headers.get('user-agent') || ''
+    const authHeader = request.headers.get('authorization')
+
     // Call Django API to increment view count
     const response = await fetch(`${DJANGO_API_URL}/api/products/${productId}/increment_view/`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        'X-Forwarded-For': forwardedFor,
+        'User-Agent': userAgent,
+        ...(authHeader ? { Authorization: authHeader } : {}),
       },
     })
 
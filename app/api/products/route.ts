@@ -2,12 +2,25 @@ import { type NextRequest, NextResponse } from "next/server"
 
 const DJANGO_API_URL = process.env.DJANGO_API_URL || "http://127.0.0.1:8000"
 
+function extractCursor(link: string | null | undefined): string | null {
+  if (!link) {
+    return null
+  }
+  try {
+    return new URL(link).searchParams.get("cursor")
+  } catch {
+    return null
+  }
+}
+
 export async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url)
     const djangoUrl = new URL(`${DJANGO_API_URL}/api/products/`)
     const page = Number.parseInt(searchParams.get("page") || "1")
     const limit = Number.parseInt(searchParams.get("limit") || "12")
+    // Keyset pagination: no COUNT(*) and steady per-page latency for infinite scroll
+    const cursorMode = searchParams.get("pagination") === "cursor" || searchParams.has("cursor")
 
     searchParams.forEach((value, key) => {
       if (!value) {
@@ -21,7 +34,7 @@ export async function GET(request: NextRequest) {
       }
     })
 
-    if (!djangoUrl.searchParams.has("page")) {
+    if (!cursorMode && !djangoUrl.searchParams.has("page")) {
       djangoUrl.searchParams.set("page", page.toString())
     }
     if (!djangoUrl.searchParams.has("page_size")) {
@@ -55,6 +68,15 @@ export async function GET(request: NextRequest) {
       }, { status: response.status })
     }
 
+    if (cursorMode) {
+      return NextResponse.json({
+        success: true,
+        products: data.results || [],
+        nextCursor: extractCursor(data.next),
+        previousCursor: extractCursor(data.previous),
+      })
+    }
+
     return NextResponse.json({
       success: true,
       products: data.results || data || [],
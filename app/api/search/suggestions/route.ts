@@ -0,0 +1,40 @@
+import { type NextRequest, NextResponse } from "next/server"
+
+const DJANGO_API_URL = process.env.DJANGO_API_URL || 'http://127.0.0.1:8000'
+
+export async function GET(request: NextRequest) {
+  try {
+    const { searchParams } = new URL(request.url)
+    const query = searchParams.get('q')
+    const limit = searchParams.get('limit') || '8'
+
+    if (!query || !query.trim()) {
+      return NextResponse.json({ suggestions: [] })
+    }
+
+    // Served from the Django in-memory autocomplete index (no DB round trip)
+    const response = await fetch(
+      `${DJANGO_API_URL}/api/search/suggestions/?q=${encodeURIComponent(query)}&limit=${encodeURIComponent(limit)}`,
+      {
+        method: 'GET',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      }
+    )
+
+    const data = await response.json()
+
+    if (!response.ok) {
+      return NextResponse.json({
+        error: data.error || "Suggestions failed",
+        message: data.message || "Please try again"
+      }, { status: response.status })
+    }
+
+    return NextResponse.json({ suggestions: data.suggestions || [] })
+  } catch (error) {
+    console.error("Search suggestions API error:", error)
+    return NextResponse.json({ error: "Internal server error" }, { status: 500 })
+  }
+}
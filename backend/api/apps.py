@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
@@ -8,3 +9,7 @@ class ApiConfig(AppConfig):
     def ready(self):
         # Import signals to register them
         import api.signals  # noqa
+        from api.cache_backends import create_cache_tables
+
+        # The shared 'default' cache lives in a database table without Redis
+        post_migrate.connect(create_cache_tables, sender=self)
@@ -0,0 +1,405 @@
+"""
+In-process autocomplete index for search suggestions.
+
+Product names, category names and brands (English and Amharic) are held in a
+prefix map (every prefix of every token points at the entries containing it)
+plus a trigram map used as a typo-tolerant fallback. Lookups are a handful of
+dict reads and set intersections, so they stay well under a millisecond and
+never touch the database.
+
+The index is built lazily on first use, from the cached snapshot when one
+exists, and kept current by the Product/Category signals. Each change is
+also stored in the shared cache as a numbered delta (a short list of index
+operations) and only then is the shared version advanced, so every version
+a reader sees already has its deltas; other worker processes replay the
+deltas they have not seen. A process only rebuilds from the database when
+deltas have expired or it has fallen too far behind, and then stores a
+fresh snapshot under the current version. If the shared cache fails, a
+process keeps serving the index it has.
+"""
+import logging
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.core.cache import cache
+
+from .search import normalize_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "autocomplete_snapshot_v2"
+VERSION_KEY = "autocomplete_version"
+DELTA_KEY = "autocomplete_delta_{version}"
+SNAPSHOT_TIMEOUT = 3600
+MAX_DELTA_REPLAY = 500  # beyond this many missed changes, rebuild instead
+VERSION_CHECK_INTERVAL = 30  # seconds between shared-version checks per process
+MAX_PREFIX_LENGTH = 20
+
+# Entry kinds in ranking order when weights tie
+KIND_WEIGHTS = {'category': 3.0, 'brand': 2.0, 'product': 1.0}
+
+# (kind, id, title, title_amharic, category, weight)
+Entry = Tuple[str, str, str, Optional[str], Optional[str], float]
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestionIndex:
+    """Prefix + trigram index over suggestion entries."""
+
+    def __init__(self, entries: Iterable[Entry] = ()):
+        self._lock = threading.RLock()
+        self.entries: Dict[Tuple[str, str], Entry] = {}
+        self.prefixes: Dict[str, Set[Tuple[str, str]]] = {}
+        self.trigrams: Dict[str, Set[Tuple[str, str]]] = {}
+        self.brand_products: Dict[str, Set[str]] = {}
+        self.product_brands: Dict[str, str] = {}
+        for entry in entries:
+            self._add(entry)
+
+    # -- maintenance -----------------------------------------------------
+
+    def _entry_terms(self, entry: Entry) -> Set[str]:
+        _, _, title, title_amharic, _, _ = entry
+        return set(tokenize(title)) | set(tokenize(title_amharic))
+
+    def _add(self, entry: Entry) -> None:
+        key = (entry[0], entry[1])
+        self._remove(key)
+        self.entries[key] = entry
+        for term in self._entry_terms(entry):
+            for end in range(1, min(len(term), MAX_PREFIX_LENGTH) + 1):
+                self.prefixes.setdefault(term[:end], set()).add(key)
+            for gram in _trigrams(term):
+                self.trigrams.setdefault(gram, set()).add(key)
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for term in self._entry_terms(entry):
+            for end in range(1, min(len(term), MAX_PREFIX_LENGTH) + 1):
+                bucket = self.prefixes.get(term[:end])
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self.prefixes[term[:end]]
+            for gram in _trigrams(term):
+                bucket = self.trigrams.get(gram)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self.trigrams[gram]
+
+    def upsert(self, entry: Entry) -> None:
+        with self._lock:
+            self._add(entry)
+
+    def remove(self, kind: str, entry_id: str) -> None:
+        with self._lock:
+            self._remove((kind, str(entry_id)))
+
+    def set_product_brand(self, product_id: str, brand: Optional[str]) -> None:
+        """Reference-count brands so a brand disappears with its last product."""
+        product_id = str(product_id)
+        brand_key = normalize_text(brand).strip() if brand else ''
+        with self._lock:
+            previous = self.product_brands.pop(product_id, None)
+            if previous and previous != brand_key:
+                owners = self.brand_products.get(previous, set())
+                owners.discard(product_id)
+                if not owners:
+                    self.brand_products.pop(previous, None)
+                    self._remove(('brand', previous))
+            if brand_key:
+                self.product_brands[product_id] = brand_key
+                self.brand_products.setdefault(brand_key, set()).add(product_id)
+                if ('brand', brand_key) not in self.entries:
+                    self._add(('brand', brand_key, brand.strip(), None, None, KIND_WEIGHTS['brand']))
+
+    # -- lookup ----------------------------------------------------------
+
+    def lookup(self, query: str, limit: int = 8) -> List[Dict]:
+        tokens = [token[:MAX_PREFIX_LENGTH] for token in tokenize(query)]
+        if not tokens:
+            return []
+        with self._lock:
+            keys = None
+            for token in tokens:
+                bucket = self.prefixes.get(token, set())
+                keys = set(bucket) if keys is None else keys & bucket
+                if not keys:
+                    break
+            if keys:
+                scored = [(self.entries[key][5], key) for key in keys]
+            else:
+                scored = self._fuzzy(tokens)
+            scored.sort(key=lambda item: (-item[0], self.entries[item[1]][2]))
+            return [self._serialize(self.entries[key]) for _, key in scored[:limit]]
+
+    def _fuzzy(self, tokens: List[str]) -> List[Tuple[float, Tuple[str, str]]]:
+        """Rank entries by trigram overlap with the query, for misspellings."""
+        grams = set()
+        for token in tokens:
+            grams |= _trigrams(token)
+        counts: Dict[Tuple[str, str], int] = {}
+        for gram in grams:
+            for key in self.trigrams.get(gram, ()):
+                counts[key] = counts.get(key, 0) + 1
+        threshold = max(2, math.ceil(len(grams) * 0.4))
+        return [
+            (count / len(grams) * self.entries[key][5], key)
+            for key, count in counts.items()
+            if count >= threshold
+        ]
+
+    @staticmethod
+    def _serialize(entry: Entry) -> Dict:
+        kind, entry_id, title, title_amharic, category, _ = entry
+        return {
+            'id': entry_id,
+            'type': kind,
+            'title': title,
+            'title_amharic': title_amharic,
+            'category': category,
+        }
+
+    def snapshot(self) -> List[Entry]:
+        with self._lock:
+            return list(self.entries.values())
+
+
+# -- entry builders ---------------------------------------------------------
+
+def product_entry(product) -> Entry:
+    weight = KIND_WEIGHTS['product'] + math.log1p(product.view_count or 0) / 10
+    category = product.category.name if product.category_id and product.category else None
+    return ('product', str(product.pk), product.name, product.name_amharic, category, weight)
+
+
+def category_entry(category) -> Entry:
+    return ('category', str(category.pk), category.name, category.name_amharic, None, KIND_WEIGHTS['category'])
+
+
+def is_suggestible(product) -> bool:
+    return product.status == 'active' and not product.is_subscription_hidden
+
+
+def build_index_from_db() -> SuggestionIndex:
+    from .models import Category, Product
+
+    index = SuggestionIndex(category_entry(category) for category in Category.objects.filter(is_active=True))
+    products = Product.objects.filter(status='active', is_subscription_hidden=False).select_related('category').only(
+        'id', 'name', 'name_amharic', 'brand', 'view_count', 'category__name',
+    )
+    for product in products.iterator(chunk_size=1000):
+        index.upsert(product_entry(product))
+        index.set_product_brand(product.pk, product.brand)
+    return index
+
+
+# -- process-wide index -------------------------------------------------------
+
+# Delta operations: ('upsert', entry), ('remove', kind, id), ('brand', product_id, brand)
+Operation = Tuple
+
+
+def apply_operations(index: SuggestionIndex, operations: Iterable[Operation]) -> None:
+    for name, *args in operations:
+        if name == 'upsert':
+            index.upsert(tuple(args[0]))
+        elif name == 'remove':
+            index.remove(*args)
+        elif name == 'brand':
+            index.set_product_brand(*args)
+
+
+_index: Optional[SuggestionIndex] = None
+_index_version = None
+_last_version_check = 0.0
+_index_lock = threading.Lock()
+
+
+def _catch_up(index: Optional[SuggestionIndex], version, target) -> Optional[SuggestionIndex]:
+    """Replay the deltas after ``version`` up to ``target`` into ``index``, or None if they can't be."""
+    if index is None or target is None or version == target:
+        return index
+    if version is None or not 0 < target - version <= MAX_DELTA_REPLAY:
+        return None
+    keys = [DELTA_KEY.format(version=number) for number in range(version + 1, target + 1)]
+    try:
+        deltas = cache.get_many(keys)
+    except Exception as e:
+        logger.error(f"Error reading autocomplete deltas: {e}")
+        return None
+    if len(deltas) != len(keys):
+        return None  # expired
+    for key in keys:
+        apply_operations(index, deltas[key])
+    return index
+
+
+def _restore_snapshot() -> Tuple[Optional[SuggestionIndex], Optional[int]]:
+    try:
+        snapshot = cache.get(SNAPSHOT_KEY)
+    except Exception as e:
+        logger.error(f"Error reading autocomplete snapshot: {e}")
+        snapshot = None
+    if not snapshot:
+        return None, None
+
+    entries, brand_products, version = snapshot
+    index = SuggestionIndex(entries)
+    for brand_key, product_ids in brand_products.items():
+        index.brand_products[brand_key] = set(product_ids)
+        for product_id in product_ids:
+            index.product_brands[product_id] = brand_key
+    return index, version
+
+
+def _load_index(index: Optional[SuggestionIndex], version, target) -> SuggestionIndex:
+    """Bring ``index`` (or the cached snapshot) up to ``target``, rebuilding if deltas are missing."""
+    if index is None:
+        index, version = _restore_snapshot()
+    current = _catch_up(index, version, target)
+    if current is not None:
+        return current
+    index = build_index_from_db()
+    save_snapshot(index, target)
+    return index
+
+
+def save_snapshot(index: SuggestionIndex, version=None) -> None:
+    try:
+        with index._lock:
+            brand_products = {brand: sorted(ids) for brand, ids in index.brand_products.items()}
+        cache.set(SNAPSHOT_KEY, (index.snapshot(), brand_products, version), SNAPSHOT_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error caching autocomplete snapshot: {e}")
+
+
+def get_suggestion_index() -> SuggestionIndex:
+    """Return this process's index, replaying changes other processes published."""
+    global _index, _index_version, _last_version_check
+    now = time.monotonic()
+    with _index_lock:
+        if _index is not None and now - _last_version_check < VERSION_CHECK_INTERVAL:
+            return _index
+        _last_version_check = now
+        try:
+            version = _shared_version()
+        except Exception as e:
+            logger.error(f"Error reading autocomplete version: {e}")
+            if _index is not None:
+                return _index
+            version = None
+        if _index is None or (version is not None and version != _index_version):
+            _index = _load_index(_index, _index_version, version)
+            _index_version = version
+        return _index
+
+
+def _start_version() -> None:
+    # Unset or evicted: start above any number handed out before
+    cache.add(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def _shared_version() -> Optional[int]:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        _start_version()  # so the snapshot we may store has a version to replay from
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _store_delta(operations: List[Operation]) -> Optional[int]:
+    """Store ``operations`` under the first free number past the shared version and return it."""
+    version = _shared_version()
+    if version is None:
+        return None  # no shared cache (e.g. DummyCache)
+    # add() fails for numbers concurrent publishers have already taken
+    for number in range(version + 1, version + 1 + MAX_DELTA_REPLAY):
+        if cache.add(DELTA_KEY.format(version=number), operations, SNAPSHOT_TIMEOUT):
+            return number
+    logger.error("Error publishing autocomplete delta: no free delta number")
+    return None
+
+
+def _publish(operations: List[Operation]) -> None:
+    """Apply ``operations`` to this process's index and publish them as the next delta."""
+    global _index_version
+    index = _loaded_index()
+    if index is not None:
+        apply_operations(index, operations)
+    try:
+        number = _store_delta(operations)
+        if number is None:
+            return
+        # The delta is in place before readers can see a version that includes it
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        _start_version()  # evicted meanwhile; the jump makes other processes rebuild
+        return
+    except Exception as e:
+        logger.error(f"Error publishing autocomplete delta: {e}")
+        return
+    with _index_lock:
+        # Skip ahead only if no other process's delta came in between
+        if _index is not None and version == number and _index_version == version - 1:
+            _index_version = version
+
+
+def _loaded_index() -> Optional[SuggestionIndex]:
+    # Only maintain an index this process has already built; a fresh build
+    # will read the change from the database anyway.
+    return _index
+
+
+def _product_operations(product) -> List[Operation]:
+    if is_suggestible(product):
+        return [('upsert', product_entry(product)), ('brand', str(product.pk), product.brand)]
+    return [('remove', 'product', str(product.pk)), ('brand', str(product.pk), None)]
+
+
+def on_product_saved(product) -> None:
+    _publish(_product_operations(product))
+
+
+def on_products_saved(products: Iterable) -> None:
+    """Publish changes to many products (e.g. after a bulk ``update()``) as one delta."""
+    operations = [operation for product in products for operation in _product_operations(product)]
+    if operations:
+        _publish(operations)
+
+
+def on_product_deleted(product_id) -> None:
+    _publish([('remove', 'product', str(product_id)), ('brand', str(product_id), None)])
+
+
+def on_category_saved(category) -> None:
+    if category.is_active:
+        _publish([('upsert', category_entry(category))])
+    else:
+        _publish([('remove', 'category', str(category.pk))])
+
+
+def on_category_deleted(category_id) -> None:
+    _publish([('remove', 'category', str(category_id))])
+
+
+def reset_suggestion_index() -> None:
+    """Forget this process's index so the next lookup rebuilds it."""
+    global _index, _index_version, _last_version_check
+    with _index_lock:
+        _index = None
+        _index_version = None
+        _last_version_check = 0.0
+
+
+def suggest(query: str, limit: int = 8) -> List[Dict]:
+    return get_suggestion_index().lookup(query, limit=limit)
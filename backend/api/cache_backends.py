@@ -0,0 +1,336 @@
+"""
+Two-tier cache backend for Zutali Conmart.
+
+``TieredCache`` keeps a small per-process LRU (Django's LocMemCache) in front
+of a shared cache alias (Redis, or a file/database cache when Redis is not
+configured):
+
+* reads check L1, then L2, and copy L2 hits into L1;
+* writes and deletes go to both tiers;
+* counters (``incr``/``decr``) and ``add`` are decided by L2 alone, since they
+  must be consistent across processes, and drop the L1 copy.
+
+L1 entries live at most ``L1_TIMEOUT`` seconds, which bounds how long another
+process can serve a value that was changed or deleted elsewhere.
+
+``LockingDatabaseCache`` is the shared tier used for ``default`` when Redis
+is not configured: Django's ``DatabaseCache`` already has an atomic ``add``
+(the key is the primary key), and this subclass makes ``incr``/``decr``
+atomic too by locking the row before reading it. ``create_cache_tables``
+runs after ``migrate`` (see ``api.apps``), so its table exists wherever the
+schema does.
+
+``MeteredCache`` is the same proxy without an L1, for namespaces that must
+always read the shared tier. Both record hits, misses, sets, deletes, L1
+evictions, latency and payload sizes in ``api.cache_metrics`` under their
+``LOCATION`` (the namespace name), and encode values for L2 with the
+``SERIALIZER``/``COMPRESSOR`` options (see ``api.cache_serializers``).
+
+Configure it in ``CACHES``::
+
+    'products': {
+        'BACKEND': 'api.cache_backends.TieredCache',
+        'LOCATION': 'products',
+        'TIMEOUT': 1800,
+        'OPTIONS': {
+            'L2': 'products_shared', 'L1_TIMEOUT': 60, 'L1_MAX_ENTRIES': 1000,
+            'SERIALIZER': 'json', 'COMPRESSOR': 'zlib', 'COMPRESS_MIN_BYTES': 1024,
+        },
+    }
+"""
+import base64
+import pickle
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import cache_metrics
+from .cache_serializers import CacheSerializer
+
+_MISSING = object()
+
+
+class MeteredCache(BaseCache):
+    """A shared cache alias (L2) behind a namespace, with metrics."""
+
+    def __init__(self, name, params):
+        options = dict(params.get('OPTIONS', {}))
+        self.l2_alias = options.pop('L2')
+        self.serializer = CacheSerializer(
+            options.pop('SERIALIZER', 'pickle'),
+            compressor=options.pop('COMPRESSOR', None),
+            min_compress_bytes=int(options.pop('COMPRESS_MIN_BYTES', 1024)),
+        )
+        self._pop_options(options)
+        super().__init__({**params, 'OPTIONS': options})
+        self.namespace = name or self.l2_alias
+        self.metrics = cache_metrics.namespace(self.namespace)
+
+    def _pop_options(self, options):
+        """Take subclass-specific OPTIONS out before BaseCache sees them."""
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _encode_many(self, data):
+        return {key: self.serializer.dumps(value) for key, value in data.items()}
+
+    def _record_set(self, started, values, encoded, count=1):
+        """Record exact encoded sizes, or let the metrics sample values stored as is."""
+        seconds = time.perf_counter() - started
+        if self.serializer.passthrough:
+            self.metrics.record_set(seconds, values, count=count)
+        else:
+            sizes = (len(item) if isinstance(item, bytes) else None for item in encoded)
+            self.metrics.record_set(seconds, count=count, sizes=sizes)
+
+    def _l2_get(self, key, version):
+        value = self.l2.get(key, _MISSING, version=version)
+        return _MISSING if value is _MISSING else self.serializer.loads(value)
+
+    def _l2_get_many(self, keys, version):
+        return {key: self.serializer.loads(value) for key, value in self.l2.get_many(keys, version=version).items()}
+
+    def get(self, key, default=None, version=None):
+        start = time.perf_counter()
+        value = self._l2_get(key, version)
+        hit = value is not _MISSING
+        self.metrics.record_get(int(hit), int(not hit), time.perf_counter() - start)
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        start = time.perf_counter()
+        found = self._l2_get_many(keys, version)
+        self.metrics.record_get(len(found), len(keys) - len(found), time.perf_counter() - start)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        start = time.perf_counter()
+        data = self.serializer.dumps(value)
+        self.l2.set(key, data, timeout, version=version)
+        self._record_set(start, (value,), (data,))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        start = time.perf_counter()
+        encoded = self._encode_many(data)
+        failed = self.l2.set_many(encoded, timeout, version=version)
+        self._record_set(start, data.values(), encoded.values(), count=len(data))
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        start = time.perf_counter()
+        data = self.serializer.dumps(value)
+        added = self.l2.add(key, data, timeout, version=version)
+        if added:
+            self._record_set(start, (value,), (data,))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.metrics.record_delete()
+        return self.l2.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.metrics.record_delete(len(keys))
+        self.l2.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.l2.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        return self.l2.decr(key, delta, version=version)
+
+    def clear(self):
+        self.l2.clear()
+
+    def make_key(self, key, version=None):
+        return self.l2.make_key(key, version=version)
+
+    def validate_key(self, key):
+        self.l2.validate_key(key)
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+
+class _MeteredLocMemCache(LocMemCache):
+    """LocMemCache that reports the entries its LRU cull drops."""
+
+    def __init__(self, name, params, on_evict):
+        super().__init__(name, params)
+        self._on_evict = on_evict
+
+    def _cull(self):
+        before = len(self._cache)
+        super()._cull()
+        self._on_evict(before - len(self._cache))
+
+
+class TieredCache(MeteredCache):
+    """Per-process LRU (L1) over a shared cache alias (L2)."""
+
+    def _pop_options(self, options):
+        self.l1_timeout = int(options.pop('L1_TIMEOUT', 60))
+        self.l1_max_entries = int(options.pop('L1_MAX_ENTRIES', 1000))
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        # LocMemCache shares its store by name: key it on the L2 alias too, so
+        # namespaces never share (or clear) each other's L1 whatever LOCATION says
+        self.l1 = _MeteredLocMemCache(f"tiered-l1-{self.namespace}-{self.l2_alias}", {
+            'TIMEOUT': self.l1_timeout,
+            'OPTIONS': {'MAX_ENTRIES': self.l1_max_entries, 'CULL_FREQUENCY': 4},
+        }, on_evict=self.metrics.record_evictions)
+        self.metrics.key_count = lambda: {'l1': len(self.l1._cache)}
+
+    def _timeouts(self, timeout):
+        """Return (l1_timeout, l2_timeout) for a write, keeping L1 no longer than L2."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.l1_timeout, None
+        return min(self.l1_timeout, timeout), timeout
+
+    def get(self, key, default=None, version=None):
+        start = time.perf_counter()
+        value = self.l1.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            self.metrics.record_get(1, 0, time.perf_counter() - start, l1_hits=1)
+            return value
+        value = self._l2_get(key, version)
+        if value is _MISSING:
+            self.metrics.record_get(0, 1, time.perf_counter() - start)
+            return default
+        self.l1.set(key, value, self.l1_timeout, version=version)
+        self.metrics.record_get(1, 0, time.perf_counter() - start)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        start = time.perf_counter()
+        found = self.l1.get_many(keys, version=version)
+        l1_hits = len(found)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            from_l2 = self._l2_get_many(missing, version)
+            if from_l2:
+                self.l1.set_many(from_l2, self.l1_timeout, version=version)
+            found.update(from_l2)
+        self.metrics.record_get(len(found), len(keys) - len(found), time.perf_counter() - start, l1_hits=l1_hits)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        start = time.perf_counter()
+        l1_timeout, l2_timeout = self._timeouts(timeout)
+        data = self.serializer.dumps(value)
+        self.l2.set(key, data, l2_timeout, version=version)
+        self.l1.set(key, value, l1_timeout, version=version)
+        self._record_set(start, (value,), (data,))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        start = time.perf_counter()
+        l1_timeout, l2_timeout = self._timeouts(timeout)
+        encoded = self._encode_many(data)
+        failed = self.l2.set_many(encoded, l2_timeout, version=version)
+        self.l1.set_many({k: v for k, v in data.items() if k not in failed}, l1_timeout, version=version)
+        self._record_set(start, data.values(), encoded.values(), count=len(data))
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        start = time.perf_counter()
+        l1_timeout, l2_timeout = self._timeouts(timeout)
+        data = self.serializer.dumps(value)
+        added = self.l2.add(key, data, l2_timeout, version=version)
+        if added:
+            self.l1.set(key, value, l1_timeout, version=version)
+            self._record_set(start, (value,), (data,))
+        else:
+            self.l1.delete(key, version=version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        l1_timeout, l2_timeout = self._timeouts(timeout)
+        self.l1.touch(key, l1_timeout, version=version)
+        return self.l2.touch(key, l2_timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(key, version=version)
+        return super().delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l1.delete_many(keys, version=version)
+        super().delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.l1.has_key(key, version=version) or self.l2.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.l1.delete(key, version=version)
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.l1.delete(key, version=version)
+        return self.l2.decr(key, delta, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def clear_local(self):
+        """Drop this process's L1 copies only."""
+        self.l1.clear()
+
+
+class LockingDatabaseCache(DatabaseCache):
+    """``DatabaseCache`` whose ``incr``/``decr`` can't lose concurrent updates."""
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db = router.db_for_write(self.cache_model_class)
+        connection = connections[db]
+        quote_name = connection.ops.quote_name
+        table = quote_name(self._table)
+        now = connection.ops.adapt_datetimefield_value(timezone.now().replace(microsecond=0))
+
+        with transaction.atomic(using=db), connection.cursor() as cursor:
+            # A no-op write takes the row lock (the database lock on SQLite)
+            # before the value is read, so concurrent increments queue up
+            cursor.execute(
+                "UPDATE %s SET %s = %s WHERE %s = %%s AND %s > %%s" % (
+                    table, quote_name('expires'), quote_name('expires'),
+                    quote_name('cache_key'), quote_name('expires'),
+                ),
+                [key, now],
+            )
+            if not cursor.rowcount:
+                raise ValueError("Key '%s' not found" % key)
+            cursor.execute(
+                "SELECT %s FROM %s WHERE %s = %%s" % (quote_name('value'), table, quote_name('cache_key')),
+                [key],
+            )
+            value = pickle.loads(base64.b64decode(cursor.fetchone()[0].encode())) + delta
+            cursor.execute(
+                "UPDATE %s SET %s = %%s WHERE %s = %%s" % (table, quote_name('value'), quote_name('cache_key')),
+                [base64.b64encode(pickle.dumps(value, self.pickle_protocol)).decode('latin1'), key],
+            )
+        return value
+
+
+def create_cache_tables(using='default', verbosity=1, **kwargs) -> None:
+    """``post_migrate`` receiver: create the tables of database-backed caches that don't exist yet."""
+    call_command('createcachetable', database=using, verbosity=max(verbosity - 1, 0))
@@ -0,0 +1,258 @@
+"""
+In-process cache metrics, aggregated across workers.
+
+The cache backends in ``cache_backends`` record every operation here: hits
+and misses (split by tier for two-tier caches), sets, deletes and L1
+evictions, plus fixed-bucket histograms of get/set latency and payload size.
+Recording is a few integer increments under a lock. Payload sizes are exact
+for namespaces that encode their values (``api.cache_serializers``) and
+sampled elsewhere, because measuring them means pickling the value.
+
+Every ``PUBLISH_INTERVAL`` seconds each process writes its cumulative
+snapshot to the shared default cache under its own key, and
+``aggregate()`` sums the snapshots of all live workers.
+"""
+import logging
+import os
+import pickle
+import socket
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+SIZE_SAMPLE_EVERY = 10  # measure one payload in this many sets
+
+COUNTERS = ('hits', 'misses', 'l1_hits', 'sets', 'deletes', 'evictions')
+
+SNAPSHOT_KEY = "cache_metrics_worker_{worker}"
+WORKERS_KEY = "cache_metrics_workers"
+PUBLISH_INTERVAL = 30
+SNAPSHOT_TIMEOUT = 600  # workers silent for this long drop out of the aggregate
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Histogram:
+    """Counts per upper bound, with one overflow bucket past the last bound."""
+
+    def __init__(self, bounds: Iterable[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                break
+        else:
+            index = len(self.bounds)
+        self.counts[index] += 1
+        self.total += value
+
+    def as_dict(self) -> Dict:
+        return {'bounds': list(self.bounds), 'counts': list(self.counts), 'total': self.total}
+
+
+class NamespaceMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.key_count = None  # callable returning {'l1': n} for caches with an L1
+        self.clear()
+
+    def clear(self) -> None:
+        self.counters = Counter()
+        self.get_latency = Histogram(LATENCY_BUCKETS_MS)
+        self.set_latency = Histogram(LATENCY_BUCKETS_MS)
+        self.payload_size = Histogram(SIZE_BUCKETS)
+
+    def record_get(self, hits: int, misses: int, seconds: float, l1_hits: int = 0) -> None:
+        with _lock:
+            self.counters['hits'] += hits
+            self.counters['misses'] += misses
+            self.counters['l1_hits'] += l1_hits
+            self.get_latency.observe(seconds * 1000)
+        _maybe_publish()
+
+    def record_set(self, seconds: float, values: Iterable = (), count: int = 1,
+                   sizes: Optional[Iterable[Optional[int]]] = None) -> None:
+        """Count ``count`` sets; ``sizes`` are encoded lengths, else ``values`` are sampled."""
+        with _lock:
+            self.counters['sets'] += count
+            self.set_latency.observe(seconds * 1000)
+            if sizes is not None:
+                for size in sizes:
+                    if size is not None:
+                        self.payload_size.observe(size)
+                values = ()
+            sample = [] if self.counters['sets'] % SIZE_SAMPLE_EVERY >= count else list(values)[:1]
+        for value in sample:
+            try:
+                size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            except Exception:
+                continue  # unpicklable values fail in the backend itself
+            with _lock:
+                self.payload_size.observe(size)
+        _maybe_publish()
+
+    def record_delete(self, count: int = 1) -> None:
+        with _lock:
+            self.counters['deletes'] += count
+
+    def record_evictions(self, count: int) -> None:
+        if count > 0:
+            with _lock:
+                self.counters['evictions'] += count
+
+    def snapshot(self) -> Dict:
+        with _lock:
+            snapshot = {
+                'counters': dict(self.counters),
+                'get_latency_ms': self.get_latency.as_dict(),
+                'set_latency_ms': self.set_latency.as_dict(),
+                'payload_bytes': self.payload_size.as_dict(),
+            }
+        if self.key_count is not None:
+            try:
+                snapshot['keys'] = self.key_count()
+            except Exception as e:
+                logger.error(f"Error counting keys for cache {self.name}: {e}")
+        return snapshot
+
+
+_lock = threading.Lock()
+_registry: Dict[str, NamespaceMetrics] = {}
+_last_publish = time.monotonic()
+
+
+def namespace(name: str) -> NamespaceMetrics:
+    """The process-wide metrics object for cache namespace ``name``."""
+    with _lock:
+        if name not in _registry:
+            _registry[name] = NamespaceMetrics(name)
+        return _registry[name]
+
+
+def local_snapshot() -> Dict[str, Dict]:
+    with _lock:
+        namespaces = list(_registry.values())
+    return {metrics.name: metrics.snapshot() for metrics in namespaces}
+
+
+def reset() -> None:
+    """Zero this process's metrics (used by tests)."""
+    with _lock:
+        for metrics in _registry.values():
+            metrics.clear()
+
+
+def _maybe_publish() -> None:
+    global _last_publish
+    with _lock:
+        if time.monotonic() - _last_publish < PUBLISH_INTERVAL:
+            return
+        _last_publish = time.monotonic()
+    publish()
+
+
+def publish() -> None:
+    """Write this process's snapshot to the shared cache and register the worker."""
+    from django.core.cache import caches
+
+    shared = caches['default']
+    try:
+        shared.set(SNAPSHOT_KEY.format(worker=WORKER_ID), local_snapshot(), SNAPSHOT_TIMEOUT)
+        now = time.time()
+        # Read-modify-write: a worker lost to a race re-registers on its next publish
+        workers = {
+            worker: seen for worker, seen in (shared.get(WORKERS_KEY) or {}).items()
+            if now - seen < SNAPSHOT_TIMEOUT
+        }
+        workers[WORKER_ID] = now
+        shared.set(WORKERS_KEY, workers, None)
+    except Exception as e:
+        logger.error(f"Error publishing cache metrics: {e}")
+
+
+def _merge_histogram(into: Optional[Dict], other: Dict) -> Dict:
+    if into is None or into['bounds'] != other['bounds']:
+        return {'bounds': list(other['bounds']), 'counts': list(other['counts']), 'total': other['total']}
+    into['counts'] = [a + b for a, b in zip(into['counts'], other['counts'])]
+    into['total'] += other['total']
+    return into
+
+
+def _percentile(histogram: Dict, fraction: float) -> Optional[float]:
+    """Upper bound of the bucket holding the given fraction of observations (None past the last bound)."""
+    count = sum(histogram['counts'])
+    if not count:
+        return None
+    threshold = fraction * count
+    seen = 0
+    for index, bucket in enumerate(histogram['counts']):
+        seen += bucket
+        if seen >= threshold:
+            return histogram['bounds'][index] if index < len(histogram['bounds']) else None
+    return None
+
+
+def summarize(histogram: Dict) -> Dict:
+    count = sum(histogram['counts'])
+    return {
+        **histogram,
+        'count': count,
+        'mean': round(histogram['total'] / count, 3) if count else None,
+        'p50': _percentile(histogram, 0.5),
+        'p95': _percentile(histogram, 0.95),
+        'p99': _percentile(histogram, 0.99),
+    }
+
+
+def merge_snapshots(snapshots: List[Dict[str, Dict]]) -> Dict[str, Dict]:
+    """Sum per-namespace counters, histograms and L1 key counts across workers."""
+    merged: Dict[str, Dict] = {}
+    for snapshot in snapshots:
+        for name, metrics in snapshot.items():
+            target = merged.setdefault(name, {'counters': Counter(), 'keys': Counter()})
+            target['counters'].update(metrics.get('counters', {}))
+            target['keys'].update(metrics.get('keys', {}))
+            for histogram in ('get_latency_ms', 'set_latency_ms', 'payload_bytes'):
+                target[histogram] = _merge_histogram(target.get(histogram), metrics[histogram])
+
+    report = {}
+    for name, metrics in merged.items():
+        counters = {counter: metrics['counters'].get(counter, 0) for counter in COUNTERS}
+        lookups = counters['hits'] + counters['misses']
+        report[name] = {
+            **counters,
+            'hit_rate': round(counters['hits'] / lookups, 4) if lookups else None,
+            'keys': dict(metrics['keys']),
+            'get_latency_ms': summarize(metrics['get_latency_ms']),
+            'set_latency_ms': summarize(metrics['set_latency_ms']),
+            'payload_bytes': summarize(metrics['payload_bytes']),
+        }
+    return report
+
+
+def aggregate() -> Dict:
+    """Metrics summed over every worker that published recently, including this one."""
+    from django.core.cache import caches
+
+    publish()
+    shared = caches['default']
+    workers = []
+    snapshots = []
+    try:
+        workers = sorted(shared.get(WORKERS_KEY) or {})
+        found = shared.get_many([SNAPSHOT_KEY.format(worker=worker) for worker in workers])
+        snapshots = list(found.values())
+    except Exception as e:
+        logger.error(f"Error reading cache metrics: {e}")
+    if not snapshots:
+        # No shared cache (e.g. DummyCache): report this process alone
+        workers, snapshots = [WORKER_ID], [local_snapshot()]
+    return {'workers': len(workers), 'namespaces': merge_snapshots(snapshots)}
@@ -0,0 +1,167 @@
+"""
+Value encodings for the shared cache tier.
+
+``MeteredCache``/``TieredCache`` encode values before handing them to the
+shared backend, which then only has to store bytes. Every encoded value
+starts with a three-byte header - magic byte, format, compression - so
+``loads`` can read any encoding whatever the namespace is configured to
+write, and values written before a configuration change stay readable.
+
+Formats:
+
+* ``pickle`` - any Python object (Django's default behaviour).
+* ``json`` - orjson when installed, else the standard library. Compact and
+  fast for the JSON-shaped payloads in the product caches. Values JSON can't
+  encode (bytes, sets, non-string keys, datetimes) fall back to pickle; UUIDs
+  and tuples come back as strings and lists.
+* ``msgpack`` - needs the ``msgpack`` package; same fallback rules.
+
+Bodies of at least ``min_compress_bytes`` are compressed with ``zlib`` or
+``lz4`` (needs the ``lz4`` package) when that makes them smaller.
+
+Plain ``int`` values are stored as is so the backend's atomic ``incr`` and
+``decr`` keep working on counters. The default - pickle, no compression - is
+what Django's backends already do, so it stores every value as is.
+"""
+import json
+import pickle
+import zlib
+from typing import Any, Dict, Optional, Type
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+MAGIC = b'\xa7'
+NO_COMPRESSION = b'-'
+
+
+class Unencodable(Exception):
+    """The format can't represent the value; pickle it instead."""
+
+
+class PickleFormat:
+    code = b'p'
+
+    @staticmethod
+    def encode(value: Any) -> bytes:
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def decode(data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+class JSONFormat:
+    code = b'j'
+
+    @staticmethod
+    def _reject(value):
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+    @staticmethod
+    def encode(value: Any) -> bytes:
+        try:
+            if orjson is not None:
+                return orjson.dumps(value, default=JSONFormat._reject, option=orjson.OPT_PASSTHROUGH_DATETIME)
+            return json.dumps(value, separators=(',', ':'), default=JSONFormat._reject).encode()
+        except (TypeError, ValueError) as e:
+            raise Unencodable(str(e))
+
+    @staticmethod
+    def decode(data: bytes) -> Any:
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class MsgpackFormat:
+    code = b'm'
+
+    @staticmethod
+    def _reject(value):
+        raise TypeError(f"{type(value).__name__} is not msgpack serializable")
+
+    @staticmethod
+    def encode(value: Any) -> bytes:
+        if msgpack is None:
+            raise ImproperlyConfigured("The msgpack cache serializer needs the 'msgpack' package")
+        try:
+            return msgpack.packb(value, use_bin_type=True, default=MsgpackFormat._reject)
+        except (TypeError, ValueError, OverflowError) as e:
+            raise Unencodable(str(e))
+
+    @staticmethod
+    def decode(data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+FORMATS: Dict[str, Type] = {'pickle': PickleFormat, 'json': JSONFormat, 'msgpack': MsgpackFormat}
+_FORMATS_BY_CODE = {format_class.code: format_class for format_class in FORMATS.values()}
+
+COMPRESSORS = {
+    'zlib': (b'z', lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lz4': (
+        b'4',
+        lambda data: lz4_frame.compress(data),
+        lambda data: lz4_frame.decompress(data),
+    ),
+}
+_DECOMPRESSORS = {code: decompress for code, _, decompress in COMPRESSORS.values()}
+
+
+class CacheSerializer:
+    """Encode values as ``MAGIC + format + compression + body``."""
+
+    def __init__(self, format: str = 'pickle', compressor: Optional[str] = None, min_compress_bytes: int = 1024):
+        if format in FORMATS:
+            self.format = FORMATS[format]
+        else:
+            self.format = import_string(format)
+        if self.format is MsgpackFormat and msgpack is None:
+            raise ImproperlyConfigured("The msgpack cache serializer needs the 'msgpack' package")
+        if compressor and compressor not in COMPRESSORS:
+            raise ImproperlyConfigured(f"Unknown cache compressor {compressor!r}")
+        if compressor == 'lz4' and lz4_frame is None:
+            raise ImproperlyConfigured("The lz4 cache compressor needs the 'lz4' package")
+        self.compressor = COMPRESSORS[compressor] if compressor else None
+        self.min_compress_bytes = min_compress_bytes
+        self.passthrough = self.format is PickleFormat and self.compressor is None
+
+    def dumps(self, value: Any):
+        if self.passthrough or type(value) is int:
+            return value
+        format_class = self.format
+        try:
+            body = format_class.encode(value)
+        except Unencodable:
+            format_class = PickleFormat
+            body = PickleFormat.encode(value)
+
+        compression = NO_COMPRESSION
+        if self.compressor is not None and len(body) >= self.min_compress_bytes:
+            code, compress, _ = self.compressor
+            compressed = compress(body)
+            if len(compressed) < len(body):
+                compression, body = code, compressed
+        return MAGIC + format_class.code + compression + body
+
+    def loads(self, data: Any) -> Any:
+        if not isinstance(data, bytes) or data[:1] != MAGIC or len(data) < 3:
+            return data  # a counter, or a value stored before encoding was enabled
+        format_code, compression, body = data[1:2], data[2:3], data[3:]
+        if compression != NO_COMPRESSION:
+            body = _DECOMPRESSORS[compression](body)
+        return _FORMATS_BY_CODE[format_code].decode(body)
@@ -1,14 +1,39 @@
 """
 Redis caching utilities for Zutali Conmart
 Handles popular products, user sessions, and performance optimization
+
+The 'products' and 'sessions' caches are two-tier (see api.cache_backends):
+reads go to the per-process LRU first, then the shared tier, and a shared
+hit is copied into the local tier.
+
+Expensive entries (popular, trending, product details) are stored in an
+envelope with a soft expiry. Past it the stale value is still served for a
+grace period while one worker - elected with a lock key in the shared cache -
+recomputes it in the background. On a hard miss, callers in the same process
+coalesce onto a single computation and other processes wait briefly for the
+lock holder's result instead of all querying the database at once.
+
+Entries can also carry tags - ``product:<id>``, ``owner:<id>``,
+``category:<id>`` and ``listing`` - whose generation counters live in the
+shared default cache. An entry records the generations it was built from and
+is treated as a miss once any of them is bumped, so a product edit only
+invalidates what depends on that product. Popular and trending lists are not
+tagged: they are read from the event-driven leaderboards (see
+``api.leaderboards``) and cached for a few minutes.
 """
 from django.core.cache import caches, cache
 from django.conf import settings
+from django.db import close_old_connections
 import json
 import logging
-from typing import Any, Optional, List, Dict
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional
 from datetime import datetime, timedelta
 
+from . import leaderboards
+
 logger = logging.getLogger(__name__)
 
 # Get different cache instances
@@ -16,6 +41,68 @@ default_cache = caches['default']
 products_cache = caches['products']
 sessions_cache = caches['sessions']
 
+ENVELOPE_MARKER = '_swr'
+LOCK_KEY = "lock_{cache_key}"
+LOCK_TIMEOUT = 30  # seconds a recompute may hold the lock
+LOCK_WAIT = 5  # seconds a caller waits for another worker's recompute
+LOCK_POLL_INTERVAL = 0.05
+DEFAULT_STALE_GRACE = 300  # seconds a stale value may be served past its soft TTL
+TAG_VERSION_KEY = "cache_tag_{tag}"
+LEADERBOARD_TIMEOUT = 300  # popular/trending lists follow the live leaderboards this closely
+LEADERBOARD_OVERFETCH = 2  # leaderboard entries read per listed product, to skip hidden ones
+
+LISTING_TAG = 'listing'
+SUBSCRIPTION_PLANS_TAG = 'subscription_plans'
+
+
+def product_tag(product_id) -> str:
+    return f"product:{product_id}"
+
+
+def owner_tag(owner_id) -> str:
+    return f"owner:{owner_id}"
+
+
+def category_tag(category_id) -> str:
+    return f"category:{category_id}"
+
+
+def product_details_tags(product_id, product_data: Dict) -> List[str]:
+    """Tags for a serialized product: itself, its owner and its categories."""
+    tags = [product_tag(product_id)]
+    owner = product_data.get('owner')
+    if isinstance(owner, dict):
+        owner = owner.get('id')
+    if owner:
+        tags.append(owner_tag(owner))
+    for field in ('category', 'subcategory'):
+        if product_data.get(field):
+            tags.append(category_tag(product_data[field]))
+    return tags
+
+
+class _Flight:
+    """One in-process computation that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def _run_in_background(func: Callable[[], None]) -> None:
+    """Run ``func`` on a daemon thread (replaced in tests to run inline)."""
+    def runner():
+        try:
+            func()
+        finally:
+            close_old_connections()
+    threading.Thread(target=runner, daemon=True).start()
+
 class CacheManager:
     """Centralized cache management for Zutali Conmart"""
     
@@ -30,67 +117,259 @@ class CacheManager:
     USER_QUOTATIONS_KEY = "user_quotations_{user_id}"
     
     @staticmethod
-    def get_popular_products(limit: int = 10) -> Optional[List[Dict]]:
-        """Get popular products from cache"""
+    def get_tag_versions(tags: Iterable[str]) -> Dict[str, int]:
+        """Current generation of each tag, starting unseen tags at the current time"""
+        keys = {TAG_VERSION_KEY.format(tag=tag): tag for tag in tags}
+        if not keys:
+            return {}
+        found = default_cache.get_many(list(keys))
+        versions = {}
+        for key, tag in keys.items():
+            version = found.get(key)
+            if version is None:
+                # A time-based start can't repeat a generation lost to eviction
+                default_cache.add(key, int(time.time() * 1000), None)
+                version = default_cache.get(key, 0)
+            versions[tag] = version
+        return versions
+
+    @staticmethod
+    def bump_tags(*tags: str) -> None:
+        """Invalidate every entry built from any of ``tags``"""
+        for tag in tags:
+            key = TAG_VERSION_KEY.format(tag=tag)
+            try:
+                default_cache.incr(key)
+            except ValueError:
+                # Never seen, or evicted: any new start invalidates old entries
+                default_cache.add(key, int(time.time() * 1000), None)
+            except Exception as e:
+                logger.error(f"Error bumping cache tag {tag}: {e}")
+
+    @staticmethod
+    def store(cache_key: str, value: Any, timeout: int, cache_backend=None,
+              grace: int = DEFAULT_STALE_GRACE, tags: Iterable[str] = ()) -> bool:
+        """Cache ``value`` as fresh for ``timeout`` seconds and servable-stale for ``grace`` more"""
         try:
-            cache_key = CacheManager.POPULAR_PRODUCTS_KEY
-            popular_products = products_cache.get(cache_key)
-            
-            if popular_products is None:
-                logger.info("Popular products not in cache, will need to compute")
+            versions = CacheManager.get_tag_versions(tags)
+        except Exception as e:
+            logger.error(f"Error reading cache tags for {cache_key}: {e}")
+            return False
+        return CacheManager._store(cache_key, value, timeout, cache_backend, grace, versions)
+
+    @staticmethod
+    def _store(cache_key, value, timeout, cache_backend, grace, versions) -> bool:
+        cache_backend = cache_backend or products_cache
+        try:
+            envelope = {ENVELOPE_MARKER: 1, 'value': value, 'soft_expires_at': time.time() + timeout}
+            if versions:
+                envelope['tags'] = versions
+            cache_backend.set(cache_key, envelope, timeout + grace)
+            return True
+        except Exception as e:
+            logger.error(f"Error caching {cache_key}: {e}")
+            return False
+
+    @staticmethod
+    def _read(cache_key: str, cache_backend) -> Any:
+        """Return the raw entry, or None if it is missing or one of its tags was bumped"""
+        entry = cache_backend.get(cache_key)
+        if isinstance(entry, dict) and entry.get(ENVELOPE_MARKER) and entry.get('tags'):
+            if CacheManager.get_tag_versions(entry['tags']) != entry['tags']:
                 return None
-            
+        return entry
+
+    @staticmethod
+    def peek(cache_key: str, cache_backend=None) -> Any:
+        """Return the cached value, fresh or stale, without triggering a recompute"""
+        entry = CacheManager._read(cache_key, cache_backend or products_cache)
+        if isinstance(entry, dict) and entry.get(ENVELOPE_MARKER):
+            return entry['value']
+        return entry
+
+    @staticmethod
+    def get_or_compute(cache_key: str, compute: Callable[[], Any], timeout: int = 1800,
+                       cache_backend=None, grace: int = DEFAULT_STALE_GRACE,
+                       tags: Iterable[str] = (),
+                       value_tags: Optional[Callable[[Any], Iterable[str]]] = None) -> Any:
+        """
+        Read through L1 -> L2. Fresh hits are returned as is; stale hits are
+        returned while one worker refreshes them in the background; misses are
+        computed once per key however many callers arrive together.
+
+        ``value_tags`` takes the computed value and returns further tags, for
+        dependencies (an owner, a category) only known once it is built. Pass
+        every tag known up front in ``tags``: their generations are read before
+        computing, so a bump during the computation still invalidates it.
+        """
+        cache_backend = cache_backend or products_cache
+        entry = None
+        try:
+            entry = CacheManager._read(cache_key, cache_backend)
+        except Exception as e:
+            logger.error(f"Error reading {cache_key} from cache: {e}")
+
+        if isinstance(entry, dict) and entry.get(ENVELOPE_MARKER):
+            if time.time() >= entry['soft_expires_at']:
+                CacheManager._refresh_in_background(cache_key, compute, timeout, cache_backend, grace, tags, value_tags)
+            return entry['value']
+        if entry is not None:
+            return entry  # written without an envelope
+
+        return CacheManager._compute_single_flight(cache_key, compute, timeout, cache_backend, grace, tags, value_tags)
+
+    @staticmethod
+    def _compute_and_store(cache_key, compute, timeout, cache_backend, grace, tags, value_tags) -> Any:
+        # Snapshot known generations before computing, so a bump that lands
+        # mid-computation still invalidates the result
+        versions = CacheManager.get_tag_versions(tags)
+        value = compute()
+        if value_tags is not None:
+            derived = set(value_tags(value)).difference(versions)
+            versions = {**CacheManager.get_tag_versions(derived), **versions}
+        CacheManager._store(cache_key, value, timeout, cache_backend, grace, versions)
+        return value
+
+    @staticmethod
+    def _acquire_lock(lock_key: str) -> Optional[str]:
+        """Take ``lock_key`` for LOCK_TIMEOUT seconds; return the owner token, or None if it is held."""
+        token = uuid.uuid4().hex
+        return token if default_cache.add(lock_key, token, LOCK_TIMEOUT) else None
+
+    @staticmethod
+    def _release_lock(lock_key: str, token: str) -> None:
+        # A compute that outlived LOCK_TIMEOUT must not delete the lock a
+        # later worker has since taken
+        if default_cache.get(lock_key) == token:
+            default_cache.delete(lock_key)
+
+    @staticmethod
+    def _refresh_in_background(cache_key, compute, timeout, cache_backend, grace, tags, value_tags) -> None:
+        lock_key = LOCK_KEY.format(cache_key=cache_key)
+        token = CacheManager._acquire_lock(lock_key)
+        if token is None:
+            return  # someone else is already refreshing
+
+        def refresh():
+            try:
+                CacheManager._compute_and_store(cache_key, compute, timeout, cache_backend, grace, tags, value_tags)
+            except Exception as e:
+                logger.error(f"Error refreshing {cache_key} in background: {e}")
+            finally:
+                CacheManager._release_lock(lock_key, token)
+
+        _run_in_background(refresh)
+
+    @staticmethod
+    def _compute_single_flight(cache_key, compute, timeout, cache_backend, grace, tags, value_tags) -> Any:
+        with _flights_lock:
+            flight = _flights.get(cache_key)
+            leader = flight is None
+            if leader:
+                flight = _flights[cache_key] = _Flight()
+
+        if not leader:
+            # Coalesce onto the computation already running in this process
+            if flight.done.wait(LOCK_WAIT + LOCK_TIMEOUT):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            return compute()
+
+        try:
+            flight.value = CacheManager._compute_with_lock(
+                cache_key, compute, timeout, cache_backend, grace, tags, value_tags,
+            )
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with _flights_lock:
+                _flights.pop(cache_key, None)
+            flight.done.set()
+
+    @staticmethod
+    def _compute_with_lock(cache_key, compute, timeout, cache_backend, grace, tags, value_tags) -> Any:
+        lock_key = LOCK_KEY.format(cache_key=cache_key)
+        token = CacheManager._acquire_lock(lock_key)
+        if token is None:
+            # Another process is computing: wait briefly for its result
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                entry = CacheManager._read(cache_key, cache_backend)
+                if isinstance(entry, dict) and entry.get(ENVELOPE_MARKER):
+                    return entry['value']
+            logger.warning(f"Timed out waiting for {cache_key} recompute, computing locally")
+            return CacheManager._compute_and_store(cache_key, compute, timeout, cache_backend, grace, tags, value_tags)
+
+        try:
+            return CacheManager._compute_and_store(cache_key, compute, timeout, cache_backend, grace, tags, value_tags)
+        finally:
+            CacheManager._release_lock(lock_key, token)
+
+    @staticmethod
+    def get_popular_products(limit: int = 10, timeout: int = LEADERBOARD_TIMEOUT) -> Optional[List[Dict]]:
+        """Get popular products, computing them once on a miss and refreshing stale ones in the background"""
+        try:
+            popular_products = CacheManager.get_or_compute(
+                CacheManager.POPULAR_PRODUCTS_KEY, ProductCacheWarmer.compute_popular_products, timeout
+            )
             return popular_products[:limit]
         except Exception as e:
-            logger.error(f"Error getting popular products from cache: {e}")
+            logger.error(f"Error getting popular products: {e}")
             return None
     
     @staticmethod
-    def set_popular_products(products_data: List[Dict], timeout: int = 3600) -> bool:
+    def set_popular_products(products_data: List[Dict], timeout: int = LEADERBOARD_TIMEOUT) -> bool:
         """Cache popular products"""
-        try:
-            cache_key = CacheManager.POPULAR_PRODUCTS_KEY
-            products_cache.set(cache_key, products_data, timeout)
+        if CacheManager.store(CacheManager.POPULAR_PRODUCTS_KEY, products_data, timeout):
             logger.info(f"Cached {len(products_data)} popular products")
             return True
-        except Exception as e:
-            logger.error(f"Error caching popular products: {e}")
-            return False
+        return False
     
     @staticmethod
-    def get_trending_products(days: int = 7, limit: int = 10) -> Optional[List[Dict]]:
+    def get_trending_products(days: int = 7, limit: int = 10,
+                              timeout: int = LEADERBOARD_TIMEOUT) -> Optional[List[Dict]]:
         """Get trending products based on recent activity"""
         try:
-            cache_key = CacheManager.TRENDING_PRODUCTS_KEY.format(days=days)
-            trending_products = products_cache.get(cache_key)
-            
-            if trending_products is None:
-                logger.info(f"Trending products for {days} days not in cache")
-                return None
-            
+            trending_products = CacheManager.get_or_compute(
+                CacheManager.TRENDING_PRODUCTS_KEY.format(days=days),
+                lambda: ProductCacheWarmer.compute_trending_products(days),
+                timeout,
+            )
             return trending_products[:limit]
         except Exception as e:
-            logger.error(f"Error getting trending products from cache: {e}")
+            logger.error(f"Error getting trending products: {e}")
             return None
     
     @staticmethod
-    def set_trending_products(products_data: List[Dict], days: int = 7, timeout: int = 1800) -> bool:
+    def set_trending_products(products_data: List[Dict], days: int = 7,
+                              timeout: int = LEADERBOARD_TIMEOUT) -> bool:
         """Cache trending products"""
-        try:
-            cache_key = CacheManager.TRENDING_PRODUCTS_KEY.format(days=days)
-            products_cache.set(cache_key, products_data, timeout)
+        cache_key = CacheManager.TRENDING_PRODUCTS_KEY.format(days=days)
+        if CacheManager.store(cache_key, products_data, timeout):
             logger.info(f"Cached {len(products_data)} trending products for {days} days")
             return True
-        except Exception as e:
-            logger.error(f"Error caching trending products: {e}")
-            return False
+        return False
     
     @staticmethod
-    def get_product_details(product_id: str) -> Optional[Dict]:
-        """Get cached product details"""
+    def get_product_details(product_id: str, compute: Optional[Callable[[], Dict]] = None,
+                            timeout: int = 1800) -> Optional[Dict]:
+        """
+        Get cached product details. With ``compute``, a miss is filled by a
+        single computation and a stale entry is refreshed in the background.
+        """
+        cache_key = CacheManager.PRODUCT_DETAILS_KEY.format(product_id=product_id)
+        if compute is not None:
+            # Errors from ``compute`` (e.g. Http404) reach the caller
+            return CacheManager.get_or_compute(
+                cache_key, compute, timeout, tags=[product_tag(product_id)],
+                value_tags=lambda data: product_details_tags(product_id, data),
+            )
         try:
-            cache_key = CacheManager.PRODUCT_DETAILS_KEY.format(product_id=product_id)
-            return products_cache.get(cache_key)
+            return CacheManager.peek(cache_key)
         except Exception as e:
             logger.error(f"Error getting product details from cache: {e}")
             return None
@@ -98,31 +377,22 @@ class CacheManager:
     @staticmethod
     def set_product_details(product_id: str, product_data: Dict, timeout: int = 1800) -> bool:
         """Cache product details"""
-        try:
-            cache_key = CacheManager.PRODUCT_DETAILS_KEY.format(product_id=product_id)
-            products_cache.set(cache_key, product_data, timeout)
-            return True
-        except Exception as e:
-            logger.error(f"Error caching product details: {e}")
-            return False
+        cache_key = CacheManager.PRODUCT_DETAILS_KEY.format(product_id=product_id)
+        return CacheManager.store(cache_key, product_data, timeout, tags=product_details_tags(product_id, product_data))
     
     @staticmethod
-    def invalidate_product_cache(product_id: str) -> bool:
-        """Invalidate all cache entries for a product"""
+    def invalidate_product_cache(product_id: str, listing: bool = False) -> bool:
+        """
+        Invalidate cache entries built from a product. Pass ``listing`` when the
+        change affects which products public lists show or how they sort.
+        Popular and trending lists are left to their scheduled refresh.
+        """
         try:
-            # Invalidate product details
-            cache_key = CacheManager.PRODUCT_DETAILS_KEY.format(product_id=product_id)
-            products_cache.delete(cache_key)
-            
-            # Invalidate popular and trending products
-            products_cache.delete(CacheManager.POPULAR_PRODUCTS_KEY)
-            
-            # Invalidate trending products for different periods
-            for days in [1, 7, 30]:
-                trending_key = CacheManager.TRENDING_PRODUCTS_KEY.format(days=days)
-                products_cache.delete(trending_key)
-            
-            logger.info(f"Invalidated cache for product {product_id}")
+            tags = [product_tag(product_id)]
+            if listing:
+                tags.append(LISTING_TAG)
+            CacheManager.bump_tags(*tags)
+            logger.debug(f"Invalidated cache for product {product_id}")
             return True
         except Exception as e:
             logger.error(f"Error invalidating product cache: {e}")
@@ -148,6 +418,34 @@ class CacheManager:
         except Exception as e:
             logger.error(f"Error caching user favorites: {e}")
             return False
+
+    @staticmethod
+    def get_favorite_ids(user_id, timeout: int = 3600) -> FrozenSet[str]:
+        """
+        The user's favorite product ids, loaded with one query on a miss.
+        The miss is filled with ``add`` so it never overwrites a newer set
+        written by ``toggle_favorite_product`` in the meantime.
+        """
+        favorites = CacheManager.get_user_favorites(user_id)
+        if favorites is None:
+            from .models import User
+
+            favorites = [
+                str(product_id) for product_id in
+                User.favorite_products.through.objects.filter(user_id=user_id).values_list('product_id', flat=True)
+            ]
+            try:
+                default_cache.add(CacheManager.USER_FAVORITES_KEY.format(user_id=user_id), favorites, timeout)
+            except Exception as e:
+                logger.error(f"Error caching user favorites: {e}")
+        return frozenset(favorites)
+
+    @staticmethod
+    def invalidate_user_favorites(*user_ids) -> None:
+        try:
+            default_cache.delete_many([CacheManager.USER_FAVORITES_KEY.format(user_id=user_id) for user_id in user_ids])
+        except Exception as e:
+            logger.error(f"Error invalidating user favorites: {e}")
     
     @staticmethod
     def get_supplier_ratings(supplier_id: str) -> Optional[Dict]:
@@ -178,7 +476,7 @@ class CacheManager:
                 query_hash=query_hash, 
                 filters_hash=filters_hash
             )
-            return products_cache.get(cache_key)
+            return CacheManager.peek(cache_key)
         except Exception as e:
             logger.error(f"Error getting search results from cache: {e}")
             return None
@@ -186,16 +484,11 @@ class CacheManager:
     @staticmethod
     def set_search_results(query_hash: str, filters_hash: str, results: Dict, timeout: int = 600) -> bool:
         """Cache search results"""
-        try:
-            cache_key = CacheManager.SEARCH_RESULTS_KEY.format(
-                query_hash=query_hash, 
-                filters_hash=filters_hash
-            )
-            products_cache.set(cache_key, results, timeout)
-            return True
-        except Exception as e:
-            logger.error(f"Error caching search results: {e}")
-            return False
+        cache_key = CacheManager.SEARCH_RESULTS_KEY.format(
+            query_hash=query_hash, 
+            filters_hash=filters_hash
+        )
+        return CacheManager.store(cache_key, results, timeout)
     
     @staticmethod
     def clear_all_cache() -> bool:
@@ -212,27 +505,29 @@ class CacheManager:
     
     @staticmethod
     def get_cache_stats() -> Dict[str, Any]:
-        """Get cache statistics and health info"""
+        """Get cache statistics and health info, with metrics summed over all workers"""
+        from . import cache_metrics
+
         try:
+            metrics = cache_metrics.aggregate()
+            caches_info = {}
+            for name, backend in (('default', default_cache), ('products', products_cache), ('sessions', sessions_cache)):
+                shared = getattr(backend, 'l2', backend)
+                caches_info[name] = {
+                    'backend': f"{type(backend).__module__}.{type(backend).__name__}",
+                    'shared_backend': f"{type(shared).__module__}.{type(shared).__name__}",
+                    # Server URLs can carry credentials, so only file cache paths are shown
+                    'location': getattr(shared, '_dir', 'N/A'),
+                    'shared_keys': _shared_key_count(shared),
+                    'metrics': metrics['namespaces'].get(getattr(backend, 'namespace', name)),
+                }
             stats = {
                 'timestamp': datetime.now().isoformat(),
-                'caches': {
-                    'default': {
-                        'backend': str(default_cache),
-                        'location': getattr(default_cache, '_server', 'N/A')
-                    },
-                    'products': {
-                        'backend': str(products_cache),
-                        'location': getattr(products_cache, '_server', 'N/A')
-                    },
-                    'sessions': {
-                        'backend': str(sessions_cache),
-                        'location': getattr(sessions_cache, '_server', 'N/A')
-                    }
-                },
+                'workers': metrics['workers'],
+                'caches': caches_info,
                 'sample_keys': {
-                    'popular_products_exists': default_cache.get(CacheManager.POPULAR_PRODUCTS_KEY) is not None,
-                    'trending_products_exists': products_cache.get(
+                    'popular_products_exists': CacheManager.peek(CacheManager.POPULAR_PRODUCTS_KEY) is not None,
+                    'trending_products_exists': CacheManager.peek(
                         CacheManager.TRENDING_PRODUCTS_KEY.format(days=7)
                     ) is not None,
                 }
@@ -242,78 +537,115 @@ class CacheManager:
             logger.error(f"Error getting cache stats: {e}")
             return {'error': str(e)}
 
+
+def _shared_key_count(backend) -> Optional[int]:
+    """Key count where the backend can report it cheaply (not Redis, which is shared by every namespace)."""
+    try:
+        if hasattr(backend, '_list_cache_files'):
+            return len(backend._list_cache_files())
+        if hasattr(backend, '_expire_info'):
+            return len(backend._expire_info)
+    except Exception as e:
+        logger.error(f"Error counting cache keys: {e}")
+    return None
+
 class ProductCacheWarmer:
     """Utility to warm up product-related caches"""
     
     @staticmethod
-    def warm_popular_products():
-        """Pre-populate popular products cache"""
+    def _ranked_products(product_ids: List[str], limit: int):
+        """Public products among ``product_ids``, in leaderboard order"""
         from .models import Product
-        try:
-            # Get popular products based on view count and ratings
+
+        products = Product.objects.filter(
+            pk__in=product_ids, status='active', is_approved=True
+        ).select_related('owner', 'category').in_bulk()
+        ranked = [products[pk] for pk in map(uuid.UUID, product_ids) if pk in products]
+        return ranked[:limit]
+
+    @staticmethod
+    def compute_popular_products(limit: int = 20) -> List[Dict]:
+        """Build the popular products list from the all-time leaderboard"""
+        from .models import Product
+
+        product_ids = leaderboards.top_product_ids(leaderboards.POPULAR_BOARD, limit * LEADERBOARD_OVERFETCH)
+        if product_ids:
+            popular_products = ProductCacheWarmer._ranked_products(product_ids, limit)
+        else:
+            # Empty board (fresh install, before rebuild_leaderboards): sort the table once
             popular_products = Product.objects.filter(
                 status='active',
                 is_approved=True
             ).select_related('owner', 'category').order_by(
                 '-view_count', '-average_rating'
-            )[:20]
-            
-            products_data = []
-            for product in popular_products:
-                products_data.append({
-                    'id': str(product.id),
-                    'name': product.name,
-                    'name_amharic': product.name_amharic,
-                    'images': product.images,
-                    'price': float(product.price) if product.price else None,
-                    'average_rating': float(product.average_rating),
-                    'view_count': product.view_count,
-                    'owner_name': product.owner.business_name,
-                    'category': product.category.name if product.category else None,
-                    'cached_at': datetime.now().isoformat()
-                })
-            
-            return CacheManager.set_popular_products(products_data)
-        
-        except Exception as e:
-            logger.error(f"Error warming popular products cache: {e}")
-            return False
+            )[:limit]
+
+        products_data = []
+        for product in popular_products:
+            products_data.append({
+                'id': str(product.id),
+                'name': product.name,
+                'name_amharic': product.name_amharic,
+                'images': product.images,
+                'price': float(product.price) if product.price else None,
+                'average_rating': float(product.average_rating),
+                'view_count': product.view_count,
+                'owner_name': product.owner.business_name,
+                'category': product.category.name if product.category else None,
+                'cached_at': datetime.now().isoformat()
+            })
+        return products_data
     
     @staticmethod
-    def warm_trending_products(days: int = 7):
-        """Pre-populate trending products cache"""
+    def compute_trending_products(days: int = 7, limit: int = 20) -> List[Dict]:
+        """Build the trending products list from the decayed leaderboard closest to ``days``"""
         from .models import Product
         from django.utils import timezone
-        
-        try:
+
+        board = leaderboards.trending_board(days)
+        product_ids = leaderboards.top_product_ids(board, limit * LEADERBOARD_OVERFETCH)
+        if product_ids:
+            trending_products = ProductCacheWarmer._ranked_products(product_ids, limit)
+        else:
             since_date = timezone.now() - timedelta(days=days)
-            
-            # Get products with recent activity
             trending_products = Product.objects.filter(
                 status='active',
                 is_approved=True,
                 updated_at__gte=since_date
             ).select_related('owner', 'category').order_by(
                 '-quotation_requests_count', '-view_count', '-updated_at'
-            )[:20]
-            
-            products_data = []
-            for product in trending_products:
-                products_data.append({
-                    'id': str(product.id),
-                    'name': product.name,
-                    'name_amharic': product.name_amharic,
-                    'images': product.images,
-                    'price': float(product.price) if product.price else None,
-                    'quotation_requests_count': product.quotation_requests_count,
-                    'view_count': product.view_count,
-                    'owner_name': product.owner.business_name,
-                    'category': product.category.name if product.category else None,
-                    'cached_at': datetime.now().isoformat()
-                })
-            
-            return CacheManager.set_trending_products(products_data, days)
-        
+            )[:limit]
+
+        products_data = []
+        for product in trending_products:
+            products_data.append({
+                'id': str(product.id),
+                'name': product.name,
+                'name_amharic': product.name_amharic,
+                'images': product.images,
+                'price': float(product.price) if product.price else None,
+                'quotation_requests_count': product.quotation_requests_count,
+                'view_count': product.view_count,
+                'owner_name': product.owner.business_name,
+                'category': product.category.name if product.category else None,
+                'cached_at': datetime.now().isoformat()
+            })
+        return products_data
+    
+    @staticmethod
+    def warm_popular_products():
+        """Pre-populate popular products cache"""
+        try:
+            return CacheManager.set_popular_products(ProductCacheWarmer.compute_popular_products())
+        except Exception as e:
+            logger.error(f"Error warming popular products cache: {e}")
+            return False
+    
+    @staticmethod
+    def warm_trending_products(days: int = 7):
+        """Pre-populate trending products cache"""
+        try:
+            return CacheManager.set_trending_products(ProductCacheWarmer.compute_trending_products(days), days)
         except Exception as e:
             logger.error(f"Error warming trending products cache: {e}")
-            return False
\ No newline at end of file
+            return False
@@ -0,0 +1,215 @@
+"""
+Parallel cache warm-up for deploys and cache flushes.
+
+``warm_caches`` fills these namespaces on a thread pool:
+
+* ``category_tree`` - the cached category tree;
+* ``popular`` / ``trending`` - the leaderboard lists (trending for 1, 7 and
+  30 days);
+* ``product_details`` - the detail cache for the top products on the popular
+  leaderboard;
+* ``listing_pages`` - the anonymous response cache for the first page of the
+  product list, of each main category and of quotation-ready products, plus
+  the category and subscription plan lists. Their bodies hold absolute
+  pagination links, so they are only warmed once ``CACHE_WARMUP_URL`` names
+  the public scheme and host.
+
+Details and listing pages are produced by calling the real views with an
+anonymous request, so they land under exactly the keys visitors hit. Jobs
+that have not started when the time budget runs out are skipped, and the
+report gives counts and summed job time per namespace.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+from . import leaderboards
+from .cache_utils import ProductCacheWarmer
+from .category_tree import get_category_tree
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_BUDGET = 60.0  # seconds
+DEFAULT_TOP_PRODUCTS = 50
+LISTING_CATEGORIES = 10  # main categories whose first product page is warmed
+
+Job = Tuple[str, Callable[[], object]]
+
+
+class WarmupError(Exception):
+    """A warm-up request did not produce a cacheable response."""
+
+
+def warmup_origin() -> Optional[Tuple[str, str]]:
+    """(scheme, host) from ``CACHE_WARMUP_URL``, or None unless it names both."""
+    origin = urlsplit(getattr(settings, 'CACHE_WARMUP_URL', ''))
+    if origin.scheme not in ('http', 'https') or not origin.netloc:
+        return None
+    return origin.scheme, origin.netloc
+
+
+def _get(view, path: str, params: Optional[Dict] = None, **kwargs) -> None:
+    """GET ``path`` through ``view`` as an anonymous visitor of ``CACHE_WARMUP_URL``."""
+    from rest_framework.test import APIRequestFactory
+
+    scheme, host = warmup_origin() or ('http', 'localhost')
+    request = APIRequestFactory().get(path, params or {}, secure=scheme == 'https', HTTP_HOST=host)
+    response = view(request, **kwargs)
+    if response.status_code != 200:
+        raise WarmupError(f"GET {path} {params or ''} returned {response.status_code}")
+
+
+def category_tree_jobs(top_products: int) -> List[Job]:
+    return [('tree', get_category_tree)]
+
+
+def _warm(warmer: Callable[[], bool], label: str) -> Callable[[], None]:
+    def run():
+        if not warmer():
+            raise WarmupError(f"{label} was not cached")
+    return run
+
+
+def popular_jobs(top_products: int) -> List[Job]:
+    return [('popular', _warm(ProductCacheWarmer.warm_popular_products, 'popular products'))]
+
+
+def trending_jobs(top_products: int) -> List[Job]:
+    return [
+        (f'{days}d', _warm(lambda days=days: ProductCacheWarmer.warm_trending_products(days), f'trending {days}d'))
+        for days in leaderboards.TRENDING_BOARDS
+    ]
+
+
+def top_product_ids(limit: int) -> List[str]:
+    """Best products on the popular leaderboard, or the most viewed before it has entries."""
+    from .models import Product
+
+    product_ids = leaderboards.top_product_ids(leaderboards.POPULAR_BOARD, limit)
+    if product_ids:
+        return product_ids
+    return [
+        str(pk) for pk in Product.objects.filter(status='active', is_subscription_hidden=False)
+        .order_by('-view_count').values_list('pk', flat=True)[:limit]
+    ]
+
+
+def product_detail_jobs(top_products: int) -> List[Job]:
+    from .views import ProductViewSet
+
+    view = ProductViewSet.as_view({'get': 'retrieve'})
+    return [
+        (product_id, lambda product_id=product_id: _get(
+            view, reverse('product-detail', args=[product_id]), pk=product_id,
+        ))
+        for product_id in top_product_ids(top_products)
+    ]
+
+
+def listing_page_jobs(top_products: int) -> List[Job]:
+    from .models import Category
+    from .views import CategoryViewSet, ProductViewSet, SubscriptionPlanViewSet
+
+    if warmup_origin() is None:
+        # Links rendered for a guessed host would be served to every visitor
+        logger.warning("Skipping listing page warm-up: CACHE_WARMUP_URL is not set to a scheme and host")
+        return []
+
+    products = ProductViewSet.as_view({'get': 'list'})
+    pages = [
+        ('products', products, 'product-list', {}),
+        ('products?quotation_available', products, 'product-list', {'quotation_available': 'true'}),
+        ('categories', CategoryViewSet.as_view({'get': 'list'}), 'category-list', {}),
+        ('subscription-plans', SubscriptionPlanViewSet.as_view({'get': 'list'}), 'subscription-plan-list', {}),
+    ]
+    main_categories = Category.objects.filter(is_active=True, parent__isnull=True).order_by('order', 'name')
+    for category_id in main_categories.values_list('pk', flat=True)[:LISTING_CATEGORIES]:
+        pages.append((f'products?category={category_id}', products, 'product-list', {'category': str(category_id)}))
+    return [
+        (label, lambda view=view, url_name=url_name, params=params: _get(view, reverse(url_name), params))
+        for label, view, url_name, params in pages
+    ]
+
+
+NAMESPACES: Dict[str, Callable[[int], List[Job]]] = {
+    'category_tree': category_tree_jobs,
+    'popular': popular_jobs,
+    'trending': trending_jobs,
+    'product_details': product_detail_jobs,
+    'listing_pages': listing_page_jobs,
+}
+
+
+def _run(job: Job, deadline: float) -> Tuple[str, float]:
+    """Return (outcome, seconds) for one job."""
+    label, func = job
+    if time.monotonic() >= deadline:
+        return 'skipped', 0.0
+    started = time.perf_counter()
+    try:
+        func()
+        return 'warmed', time.perf_counter() - started
+    except Exception as e:
+        logger.error(f"Error warming {label}: {e}")
+        return 'failed', time.perf_counter() - started
+
+
+def _run_in_worker(job: Job, deadline: float) -> Tuple[str, float]:
+    try:
+        return _run(job, deadline)
+    finally:
+        connections.close_all()  # this worker thread's connections only
+
+
+def warm_caches(namespaces: Optional[Iterable[str]] = None, workers: int = DEFAULT_WORKERS,
+                budget: float = DEFAULT_BUDGET, top_products: int = DEFAULT_TOP_PRODUCTS) -> Dict:
+    """
+    Warm ``namespaces`` (default: all) within ``budget`` seconds and return
+    per-namespace counts of warmed, failed, skipped and timed-out jobs.
+    ``workers=1`` runs the jobs in the calling thread.
+    """
+    started = time.monotonic()
+    deadline = started + budget
+    namespaces = list(namespaces or NAMESPACES)
+    report = {
+        namespace: {'warmed': 0, 'failed': 0, 'skipped': 0, 'timed_out': 0, 'seconds': 0.0}
+        for namespace in namespaces
+    }
+
+    jobs: List[Tuple[str, Job]] = []
+    for namespace in namespaces:
+        try:
+            jobs.extend((namespace, job) for job in NAMESPACES[namespace](top_products))
+        except Exception as e:
+            logger.error(f"Error listing {namespace} cache warm-up jobs: {e}")
+            report[namespace]['failed'] += 1
+
+    results: List[Tuple[str, str, float]] = []
+    if workers <= 1:
+        results = [(namespace, *_run(job, deadline)) for namespace, job in jobs]
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cache-warmup')
+        futures = {executor.submit(_run_in_worker, job, deadline): namespace for namespace, job in jobs}
+        done, pending = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+        for future in done:
+            results.append((futures[future], *future.result()))
+        for future in pending:
+            # Jobs still running finish in the background; queued ones are dropped
+            results.append((futures[future], 'skipped' if future.cancel() else 'timed_out', 0.0))
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    for namespace, outcome, seconds in results:
+        report[namespace][outcome] += 1
+        report[namespace]['seconds'] = round(report[namespace]['seconds'] + seconds, 3)
+
+    elapsed = time.monotonic() - started
+    complete = all(not (counts['skipped'] or counts['timed_out']) for counts in report.values())
+    logger.info(f"Cache warm-up finished in {elapsed:.2f}s ({'complete' if complete else 'budget exhausted'})")
+    return {'namespaces': report, 'seconds': round(elapsed, 3), 'budget': budget, 'complete': complete}
@@ -0,0 +1,80 @@
+"""
+Category tree built in memory from a single query.
+
+Product counts come from ``Category._product_count``, which the product
+signals keep current, so no per-category COUNT is needed. The built tree is
+cached under the category-tree version (see ``http_cache``), which the
+category and product signals bump, so a change is visible on the next
+request without explicit deletes.
+"""
+import logging
+from typing import Dict, List
+
+from django.core.cache import cache
+
+from .http_cache import get_category_tree_version
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_TREE_KEY = "category_tree_{version}"
+CATEGORY_TREE_TIMEOUT = 3600
+
+TREE_FIELDS = (
+    'id', 'name', 'name_amharic', 'slug', 'description', 'description_amharic',
+    'icon', 'category_images', 'current_image_index', '_product_count', 'order', 'parent_id',
+)
+
+
+def build_category_tree() -> List[Dict]:
+    """Return active main categories with their active subcategories nested under ``children``."""
+    from .models import Category
+
+    rows = list(Category.objects.filter(is_active=True).order_by('order', 'name').values(*TREE_FIELDS))
+
+    nodes = {}
+    for row in rows:
+        nodes[row['id']] = {
+            'id': str(row['id']),
+            'name': row['name'],
+            'name_amharic': row['name_amharic'],
+            'slug': row['slug'],
+            'description': row['description'],
+            'description_amharic': row['description_amharic'],
+            'icon': row['icon'],
+            'images': row['category_images'] or [],
+            'current_image_index': row['current_image_index'],
+            'product_count': row['_product_count'],
+            'order': row['order'],
+            'parent_id': str(row['parent_id']) if row['parent_id'] else None,
+            'children': [],
+        }
+
+    roots = []
+    for row in rows:
+        node = nodes[row['id']]
+        parent = nodes.get(row['parent_id'])
+        if row['parent_id'] is None:
+            roots.append(node)
+        elif parent is not None:
+            parent['children'].append(node)
+        # Children of an inactive parent are hidden along with it
+    return roots
+
+
+def get_category_tree() -> List[Dict]:
+    """Return the cached tree for the current category-tree version, building it on a miss."""
+    version, _ = get_category_tree_version()
+    cache_key = CATEGORY_TREE_KEY.format(version=version)
+    try:
+        tree = cache.get(cache_key)
+        if tree is not None:
+            return tree
+    except Exception as e:
+        logger.error(f"Error reading category tree from cache: {e}")
+
+    tree = build_category_tree()
+    try:
+        cache.set(cache_key, tree, CATEGORY_TREE_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error caching category tree: {e}")
+    return tree
@@ -0,0 +1,202 @@
+"""
+Facet counts for the product filter sidebar.
+
+Counts are computed the way a faceted search usually presents them: every
+facet is counted against the listing filtered by all the *other* active
+parameters, so selecting a brand still shows how many results each of the
+other brands would give. Facets that share the same base queryset are
+counted together, which keeps a typical request to five grouped queries.
+
+Results are cached per normalized parameter set. The key carries a catalog
+version that product/category signals bump, so stale counts are never served
+after an edit.
+"""
+import hashlib
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+
+from .filters import ProductFilter
+from .search import search_products
+
+logger = logging.getLogger(__name__)
+
+FACETS_KEY = "product_facets_{version}_{params_hash}"
+CATALOG_VERSION_KEY = "product_facets_version"
+FACETS_TIMEOUT = 600
+MAX_BUCKETS = 50
+
+# (key, lower bound inclusive, upper bound exclusive) in ETB
+PRICE_BUCKETS = [
+    ('0-1000', None, 1000),
+    ('1000-5000', 1000, 5000),
+    ('5000-20000', 5000, 20000),
+    ('20000-100000', 20000, 100000),
+    ('100000+', 100000, None),
+]
+
+# ProductFilter parameters a facet ignores when counting its own options
+FACET_PARAMS = {
+    'category': ('category',),
+    'subcategory': ('subcategory',),
+    'brand': ('brand',),
+    'city': ('city',),
+    'delivery_available': ('delivery_available',),
+    'verified_owner': ('verified_owner',),
+    'price': ('min_price', 'max_price'),
+}
+
+# Parameters matched case-insensitively, lower-cased before hashing
+CASE_INSENSITIVE_PARAMS = {'brand', 'city', 'location', 'search'}
+# Facets describe the public listing, so ``status`` is not accepted
+ACCEPTED_PARAMS = (set(ProductFilter.base_filters) - {'status'}) | {'search'}
+
+
+def normalize_params(query_params) -> Dict[str, str]:
+    """Keep known filter parameters, trimmed, with empty values dropped."""
+    params = {}
+    for name in sorted(ACCEPTED_PARAMS):
+        value = (query_params.get(name) or '').strip()
+        if not value:
+            continue
+        if name in CASE_INSENSITIVE_PARAMS:
+            value = ' '.join(value.lower().split())
+        elif value.lower() in ('true', 'false'):
+            value = value.lower()
+        params[name] = value
+    return params
+
+
+def get_catalog_version() -> int:
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # A time-based start can't repeat a version lost to eviction
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(CATALOG_VERSION_KEY, 0)
+    return version
+
+
+def bump_catalog_version() -> None:
+    """Invalidate every cached facet set at once."""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Never set, or evicted: any new start invalidates old entries
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+    except Exception as e:
+        logger.error(f"Error bumping facet catalog version: {e}")
+
+
+def _cache_key(params: Dict[str, str]) -> str:
+    params_hash = hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return FACETS_KEY.format(version=get_catalog_version(), params_hash=params_hash)
+
+
+def _filtered(base_queryset, params: Dict[str, str], exclude: Tuple[str, ...] = ()):
+    data = {name: value for name, value in params.items() if name not in exclude}
+    search = data.pop('search', None)
+    queryset = ProductFilter(data, queryset=base_queryset).qs
+    if search:
+        queryset = search_products(queryset, search)
+    # The search backends order by rank; grouping must not inherit that ordering
+    return queryset.order_by()
+
+
+def _price_aggregates() -> Dict[str, Count]:
+    aggregates = {}
+    for index, (_, low, high) in enumerate(PRICE_BUCKETS):
+        condition = Q(price__isnull=False)
+        if low is not None:
+            condition &= Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        aggregates[f'price_{index}'] = Count('pk', filter=condition)
+    return aggregates
+
+
+def _flag_aggregates(facet: str) -> Dict[str, Count]:
+    if facet == 'delivery_available':
+        condition = Q(owner__delivery_available=True)
+    else:
+        condition = Q(owner__verification_status='verified')
+    return {f'{facet}_true': Count('pk', filter=condition), f'{facet}_total': Count('pk')}
+
+
+def _grouped(queryset, field: str, label: Optional[str] = None) -> List[Dict]:
+    """Count rows per distinct ``field`` value, largest buckets first."""
+    queryset = queryset.exclude(**{f'{field}__isnull': True})
+    if label is None:
+        queryset = queryset.exclude(**{field: ''})
+    rows = (
+        queryset.values(field, *([label] if label else []))
+        .annotate(count=Count('pk'))
+        .order_by('-count', label or field)[:MAX_BUCKETS]
+    )
+    if label:
+        return [{'id': str(row[field]), 'name': row[label], 'count': row['count']} for row in rows]
+    return [{'value': row[field], 'count': row['count']} for row in rows]
+
+
+def compute_facets(base_queryset, params: Dict[str, str]) -> Dict:
+    """Count every facet option for ``params`` using grouped aggregate queries."""
+    # Scalar facets (flags, price buckets) whose base querysets coincide
+    # are folded into a single aggregate() call.
+    aggregate_groups: Dict[Tuple[str, ...], Dict[str, Count]] = {}
+    for facet in ('delivery_available', 'verified_owner', 'price'):
+        exclude = tuple(name for name in FACET_PARAMS[facet] if name in params)
+        expressions = _price_aggregates() if facet == 'price' else _flag_aggregates(facet)
+        aggregate_groups.setdefault(exclude, {}).update(expressions)
+    aggregate_groups.setdefault((), {})['total'] = Count('pk')
+
+    totals = {}
+    for exclude, expressions in aggregate_groups.items():
+        totals.update(_filtered(base_queryset, params, exclude).aggregate(**expressions))
+
+    def excluded(facet):
+        return tuple(name for name in FACET_PARAMS[facet] if name in params)
+
+    facets = {
+        'total': totals['total'],
+        'category': _grouped(_filtered(base_queryset, params, excluded('category')), 'category_id', 'category__name'),
+        'subcategory': _grouped(_filtered(base_queryset, params, excluded('subcategory')), 'subcategory_id', 'subcategory__name'),
+        'brand': _grouped(_filtered(base_queryset, params, excluded('brand')), 'brand'),
+        'city': _grouped(_filtered(base_queryset, params, excluded('city')), 'city'),
+        'price': [
+            {'key': key, 'min': low, 'max': high, 'count': totals[f'price_{index}']}
+            for index, (key, low, high) in enumerate(PRICE_BUCKETS)
+        ],
+    }
+    for flag in ('delivery_available', 'verified_owner'):
+        true_count = totals[f'{flag}_true']
+        facets[flag] = {'true': true_count, 'false': totals[f'{flag}_total'] - true_count}
+    return facets
+
+
+def get_product_facets(base_queryset, query_params) -> Dict:
+    """Return cached facet counts for the request's filter parameters."""
+    params = normalize_params(query_params)
+    filterset = ProductFilter({k: v for k, v in params.items() if k != 'search'}, queryset=base_queryset)
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+
+    cache_key = None
+    try:
+        cache_key = _cache_key(params)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    except Exception as e:
+        logger.error(f"Error reading product facets from cache: {e}")
+
+    facets = compute_facets(base_queryset, params)
+    if cache_key is not None:
+        try:
+            cache.set(cache_key, facets, FACETS_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Error caching product facets: {e}")
+    return facets
@@ -2,7 +2,19 @@
 Custom filters for Zutali Conmart API.
 """
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
 from .models import Product, Quotation, Review
+from .search import search_products
+
+
+class FullTextSearchFilter(SearchFilter):
+    """Route ``?search=`` through the full-text backend instead of icontains scans"""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_products(queryset, query)
 
 
 class ProductFilter(filters.FilterSet):
@@ -12,6 +24,7 @@ class ProductFilter(filters.FilterSet):
     category = filters.UUIDFilter(field_name="category__id")
     subcategory = filters.UUIDFilter(field_name="subcategory__id")
     location = filters.CharFilter(field_name="location", lookup_expr='icontains')
+    city = filters.CharFilter(field_name="city", lookup_expr='iexact')
     status = filters.ChoiceFilter(choices=[
         ('active', 'Active'),
         ('inactive', 'Inactive'),
@@ -30,6 +43,7 @@ class ProductFilter(filters.FilterSet):
             'subcategory',
             'status',
             'location',
+            'city',
             'quotation_available',
             'brand',
             'in_stock',
@@ -0,0 +1,113 @@
+"""
+HTTP conditional GET helpers for catalog endpoints.
+
+Views supply a cheap validator - an ETag token and a Last-Modified time -
+computed from a narrow query or a version stamp, and requests whose
+If-None-Match / If-Modified-Since headers still match are answered with a
+304 before any serializer runs.
+
+Categories have no ``updated_at`` and their product counts change whenever a
+product does, so category responses are validated against a category-tree
+version stamp kept in the cache and bumped by the Category/Product signals.
+
+Anonymous list responses can also be cached whole: the rendered bytes are
+stored under the path, a canonical query string and the version tokens of
+the data behind them, so a version bump makes old entries unreachable.
+"""
+import hashlib
+import logging
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from typing import Optional, Tuple
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag, urlencode
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_TREE_VERSION_KEY = "category_tree_version"
+RESPONSE_CACHE_KEY = "response_{digest}"
+RESPONSE_CACHE_TIMEOUT = 300
+RESPONSE_MAX_AGE = 60  # seconds browsers and CDNs may reuse an anonymous response
+
+# (etag, last_modified); last_modified may be None to validate on the ETag alone
+Validators = Tuple[str, Optional[datetime]]
+
+
+def get_category_tree_version() -> Tuple[str, datetime]:
+    """Return the current category-tree version token and when it last changed."""
+    stamp = None
+    try:
+        stamp = cache.get(CATEGORY_TREE_VERSION_KEY)
+        if stamp is None:
+            cache.add(CATEGORY_TREE_VERSION_KEY, {'version': uuid.uuid4().hex, 'changed_at': time.time()}, None)
+            stamp = cache.get(CATEGORY_TREE_VERSION_KEY)
+    except Exception as e:
+        logger.error(f"Error reading category tree version: {e}")
+
+    if stamp is None:
+        # No shared cache (e.g. DummyCache): a one-off version never matches,
+        # so clients always get a full response.
+        stamp = {'version': uuid.uuid4().hex, 'changed_at': time.time()}
+    return stamp['version'], datetime.fromtimestamp(stamp['changed_at'], tz=dt_timezone.utc)
+
+
+def bump_category_tree_version() -> None:
+    try:
+        cache.set(CATEGORY_TREE_VERSION_KEY, {'version': uuid.uuid4().hex, 'changed_at': time.time()}, None)
+    except Exception as e:
+        logger.error(f"Error bumping category tree version: {e}")
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def not_modified_response(request, validators: Optional[Validators]):
+    """Return a 304 (or 412) response if the request's preconditions say so, else None."""
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None and response.status_code == 304:
+        _set_headers(response, validators)
+    return response
+
+
+def _set_headers(response, validators: Validators) -> None:
+    etag, last_modified = validators
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+
+
+def set_validator_headers(response, validators: Optional[Validators]):
+    if validators is not None and response.status_code == 200:
+        _set_headers(response, validators)
+    return response
+
+
+def canonical_query_string(query_params) -> str:
+    """Sorted ``name=value`` pairs with empty values dropped, so equivalent URLs share a key."""
+    pairs = sorted(
+        (name, value)
+        for name in query_params
+        for value in query_params.getlist(name)
+        if value.strip()
+    )
+    return urlencode(pairs)
+
+
+def response_cache_key(request, *versions) -> str:
+    """
+    Key for a rendered response. The scheme and host are part of it because
+    paginated bodies carry absolute ``next``/``previous`` links.
+    """
+    parts = [request.scheme, request.get_host(), request.path, canonical_query_string(request.query_params)]
+    digest = hashlib.sha1('|'.join([*parts, *(str(version) for version in versions)]).encode()).hexdigest()
+    return RESPONSE_CACHE_KEY.format(digest=digest)
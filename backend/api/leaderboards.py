@@ -0,0 +1,359 @@
+"""
+Product popularity leaderboards, updated as events happen.
+
+Views, favorites and quotation requests add weighted points to a product on
+four boards: ``popular`` (all time) and ``trending_1d``/``_7d``/``_30d``,
+whose points halve every 1, 7 and 30 days. Reading the top N is an ordered
+index scan (or ``ZREVRANGE``) instead of a sort of the whole catalog.
+
+Decay uses forward decay in log space: an event of weight ``w`` at time ``t``
+adds ``w * 2 ** (t / half_life)``, and each board stores the base-2 log of a
+product's running total. Older points never need rewriting - ranking by the
+stored score is ranking by the decayed total - and working in logs keeps the
+numbers small however long the board runs. ``2 ** (score - now / half_life)``
+is a product's current decayed total.
+
+Backends (``settings.LEADERBOARD_BACKEND``, a dotted path; empty picks Redis
+when ``REDIS_URL`` is set, otherwise the database):
+
+* ``DatabaseLeaderboardBackend`` - the ``ProductScore`` rollup table.
+* ``RedisLeaderboardBackend`` - one sorted set per board, updated by a Lua
+  script so the log-space addition is atomic.
+
+Views reach the boards in batches from ``view_counter.flush_view_counts``;
+favorites and quotations are recorded by signals. Leaderboards are
+best-effort: errors are logged and never fail the request that caused them.
+"""
+import logging
+import math
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - depends on the environment
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+POPULAR_BOARD = 'popular'
+TRENDING_BOARDS = {1: 'trending_1d', 7: 'trending_7d', 30: 'trending_30d'}
+
+DAY = 86400
+# board: half-life in seconds, or None for no decay
+BOARDS = {
+    POPULAR_BOARD: None,
+    **{board: days * DAY for days, board in TRENDING_BOARDS.items()},
+}
+
+EVENT_WEIGHTS = {'view': 1.0, 'favorite': 3.0, 'quotation': 5.0}
+
+MAX_ENTRIES = 5000  # products kept per board by trim_leaderboards
+# Half-lives of quotations rebuild_leaderboards replays per trending board;
+# anything older has decayed below 2 ** -5 (about 3%) of its weight.
+TRENDING_LOOKBACK_HALF_LIVES = 5
+EMPTY_SCORE = -1e9  # log2 of (practically) zero
+
+
+def log2_add(a: float, b: float) -> float:
+    """log2(2**a + 2**b) without overflow."""
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def event_score(weight: float, half_life: Optional[int], at: float) -> float:
+    """Log-space contribution of an event of ``weight`` at time ``at``."""
+    return math.log2(weight) + (at / half_life if half_life else 0.0)
+
+
+def trending_board(days: int) -> str:
+    """The trending board whose window is closest to ``days``."""
+    return TRENDING_BOARDS[min(TRENDING_BOARDS, key=lambda window: abs(window - days))]
+
+
+class BaseLeaderboardBackend:
+    """Interface shared by the leaderboard backends. Scores are log-space."""
+
+    def add(self, board: str, scores: Dict[str, float]) -> None:
+        """Log-add ``scores`` (product id -> log-space points) into ``board``."""
+        raise NotImplementedError
+
+    def top(self, board: str, limit: int) -> List[str]:
+        """Product ids with the highest scores, best first."""
+        raise NotImplementedError
+
+    def remove(self, product_id: str) -> None:
+        raise NotImplementedError
+
+    def trim(self, board: str, keep: int) -> int:
+        """Drop all but the ``keep`` best entries; return how many were dropped."""
+        raise NotImplementedError
+
+    def replace(self, board: str, scores: Dict[str, float]) -> None:
+        """Swap the whole board for ``scores`` (used by rebuilds)."""
+        raise NotImplementedError
+
+    def raise_scores(self, board: str, scores: Dict[str, float]) -> None:
+        """Lift each product's score to at least ``scores[product]``, keeping higher ones (used by rebuilds)."""
+        raise NotImplementedError
+
+
+class DatabaseLeaderboardBackend(BaseLeaderboardBackend):
+    """Rollup rows in ``product_scores``, read through the (board, -score) index."""
+
+    def add(self, board: str, scores: Dict[str, float]) -> None:
+        from .models import Product, ProductScore
+
+        existing = {str(pk) for pk in Product.objects.filter(pk__in=list(scores)).values_list('pk', flat=True)}
+        if not existing:
+            return
+        with transaction.atomic():
+            ProductScore.objects.bulk_create(
+                [ProductScore(board=board, product_id=product_id, score=EMPTY_SCORE) for product_id in existing],
+                ignore_conflicts=True,
+            )
+            rows = list(ProductScore.objects.select_for_update().filter(board=board, product_id__in=existing))
+            now = timezone.now()
+            for row in rows:
+                row.score = log2_add(row.score, scores[str(row.product_id)])
+                row.updated_at = now
+            ProductScore.objects.bulk_update(rows, ['score', 'updated_at'])
+
+    def top(self, board: str, limit: int) -> List[str]:
+        from .models import ProductScore
+
+        return [
+            str(product_id) for product_id in
+            ProductScore.objects.filter(board=board).order_by('-score').values_list('product_id', flat=True)[:limit]
+        ]
+
+    def remove(self, product_id: str) -> None:
+        return None  # rows are deleted with the product (CASCADE)
+
+    def trim(self, board: str, keep: int) -> int:
+        from .models import ProductScore
+
+        cutoff = ProductScore.objects.filter(board=board).order_by('-score').values_list('score', flat=True)[keep:keep + 1]
+        cutoff = list(cutoff)
+        if not cutoff:
+            return 0
+        deleted, _ = ProductScore.objects.filter(board=board, score__lte=cutoff[0]).delete()
+        return deleted
+
+    def replace(self, board: str, scores: Dict[str, float]) -> None:
+        from .models import ProductScore
+
+        with transaction.atomic():
+            ProductScore.objects.filter(board=board).delete()
+            ProductScore.objects.bulk_create(
+                [ProductScore(board=board, product_id=product_id, score=score) for product_id, score in scores.items()],
+                batch_size=500,
+            )
+
+    def raise_scores(self, board: str, scores: Dict[str, float]) -> None:
+        from .models import Product, ProductScore
+
+        existing = {str(pk) for pk in Product.objects.filter(pk__in=list(scores)).values_list('pk', flat=True)}
+        if not existing:
+            return
+        with transaction.atomic():
+            ProductScore.objects.bulk_create(
+                [ProductScore(board=board, product_id=product_id, score=EMPTY_SCORE) for product_id in existing],
+                ignore_conflicts=True,
+            )
+            rows = [
+                row for row in ProductScore.objects.select_for_update().filter(board=board, product_id__in=existing)
+                if row.score < scores[str(row.product_id)]
+            ]
+            now = timezone.now()
+            for row in rows:
+                row.score = scores[str(row.product_id)]
+                row.updated_at = now
+            ProductScore.objects.bulk_update(rows, ['score', 'updated_at'])
+
+
+# Atomic log-space ZINCRBY: score = log2(2^old + 2^add)
+_LOG2_ADD_SCRIPT = """
+local add = tonumber(ARGV[2])
+local old = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if old then
+    old = tonumber(old)
+    local high, low = math.max(old, add), math.min(old, add)
+    add = high + math.log(1 + 2 ^ (low - high)) / math.log(2)
+end
+redis.call('ZADD', KEYS[1], add, ARGV[1])
+return tostring(add)
+"""
+
+
+class RedisLeaderboardBackend(BaseLeaderboardBackend):
+    """One sorted set per board under ``zutali:leaderboard:<board>``."""
+
+    key_prefix = 'zutali:leaderboard:'
+
+    def __init__(self, url: Optional[str] = None):
+        if redis is None:
+            raise ImportError("RedisLeaderboardBackend needs the 'redis' package")
+        self.client = redis.Redis.from_url(url or settings.REDIS_URL)
+        self.log2_add = self.client.register_script(_LOG2_ADD_SCRIPT)
+
+    def key(self, board: str) -> str:
+        return f"{self.key_prefix}{board}"
+
+    def add(self, board: str, scores: Dict[str, float]) -> None:
+        pipeline = self.client.pipeline(transaction=False)
+        for product_id, score in scores.items():
+            self.log2_add(keys=[self.key(board)], args=[product_id, repr(score)], client=pipeline)
+        pipeline.execute()
+
+    def top(self, board: str, limit: int) -> List[str]:
+        return [member.decode() for member in self.client.zrevrange(self.key(board), 0, limit - 1)]
+
+    def remove(self, product_id: str) -> None:
+        pipeline = self.client.pipeline(transaction=False)
+        for board in BOARDS:
+            pipeline.zrem(self.key(board), product_id)
+        pipeline.execute()
+
+    def trim(self, board: str, keep: int) -> int:
+        return self.client.zremrangebyrank(self.key(board), 0, -(keep + 1))
+
+    def replace(self, board: str, scores: Dict[str, float]) -> None:
+        staging = f"{self.key(board)}:rebuild"
+        pipeline = self.client.pipeline()
+        pipeline.delete(staging)
+        if scores:
+            pipeline.zadd(staging, scores)
+            pipeline.rename(staging, self.key(board))
+        else:
+            pipeline.delete(self.key(board))
+        pipeline.execute()
+
+    def raise_scores(self, board: str, scores: Dict[str, float]) -> None:
+        if scores:
+            self.client.zadd(self.key(board), scores, gt=True)
+
+
+_backend: Optional[BaseLeaderboardBackend] = None
+
+
+def get_leaderboard_backend() -> BaseLeaderboardBackend:
+    """Return the configured backend (``settings.LEADERBOARD_BACKEND``) or pick one from ``REDIS_URL``."""
+    global _backend
+    if _backend is None:
+        dotted_path = getattr(settings, 'LEADERBOARD_BACKEND', '')
+        if dotted_path:
+            _backend = import_string(dotted_path)()
+        elif getattr(settings, 'REDIS_URL', '') and redis is not None:
+            _backend = RedisLeaderboardBackend()
+        else:
+            _backend = DatabaseLeaderboardBackend()
+    return _backend
+
+
+def record_events(event: str, counts: Dict, at: Optional[float] = None) -> None:
+    """Add ``counts`` (product id -> number of ``event``s) to every board."""
+    counts = {str(product_id): count for product_id, count in counts.items() if count > 0}
+    if not counts:
+        return
+    at = time.time() if at is None else at
+    weight = EVENT_WEIGHTS[event]
+    backend = get_leaderboard_backend()
+    for board, half_life in BOARDS.items():
+        try:
+            backend.add(board, {
+                product_id: event_score(weight * count, half_life, at) for product_id, count in counts.items()
+            })
+        except Exception as e:
+            logger.error(f"Error recording {event} events on leaderboard {board}: {e}")
+
+
+def record_event(event: str, product_id, at: Optional[float] = None) -> None:
+    record_events(event, {product_id: 1}, at)
+
+
+def top_product_ids(board: str, limit: int) -> List[str]:
+    try:
+        return get_leaderboard_backend().top(board, limit)
+    except Exception as e:
+        logger.error(f"Error reading leaderboard {board}: {e}")
+        return []
+
+
+def remove_product(product_id) -> None:
+    try:
+        get_leaderboard_backend().remove(str(product_id))
+    except Exception as e:
+        logger.error(f"Error removing product {product_id} from leaderboards: {e}")
+
+
+def trim_leaderboards(keep: int = MAX_ENTRIES) -> Dict[str, int]:
+    """Bound every board to its ``keep`` best products."""
+    backend = get_leaderboard_backend()
+    return {board: backend.trim(board, keep) for board in BOARDS}
+
+
+def _merge(scores: Dict[str, float], additions: Iterable) -> None:
+    for product_id, score in additions:
+        product_id = str(product_id)
+        scores[product_id] = log2_add(scores[product_id], score) if product_id in scores else score
+
+
+def rebuild_leaderboards(now: Optional[float] = None) -> Dict[str, int]:
+    """
+    Recompute the boards from the database and return how many products each
+    rebuild scored.
+
+    ``popular`` is replaced with lifetime view, favorite and quotation counts.
+    The trending boards can only be rebuilt from quotation requests, the one
+    event stored with a timestamp, replayed over TRENDING_LOOKBACK_HALF_LIVES
+    half-lives of each board. Live trending scores also hold view and
+    favorite points, so the rebuilt scores only raise lower ones (restoring
+    quotations a lost or trimmed board is missing) instead of replacing the
+    board.
+    """
+    from django.db.models import Count
+
+    from .models import Product, Quotation
+
+    now = time.time() if now is None else now
+    popular: Dict[str, float] = {}
+    totals = Product.objects.annotate(
+        favorites=Count('favorited_by_users', distinct=True),
+        quotation_requests=Count('quotations', distinct=True),
+    ).values_list('pk', 'view_count', 'quotation_requests', 'favorites')
+    for product_id, views, quotations, favorites in totals.iterator(chunk_size=2000):
+        points = (
+            views * EVENT_WEIGHTS['view']
+            + quotations * EVENT_WEIGHTS['quotation']
+            + favorites * EVENT_WEIGHTS['favorite']
+        )
+        if points > 0:
+            popular[str(product_id)] = event_score(points, None, now)
+
+    lookback = {board: BOARDS[board] * TRENDING_LOOKBACK_HALF_LIVES for board in TRENDING_BOARDS.values()}
+    since = datetime.fromtimestamp(now - max(lookback.values()), tz=dt_timezone.utc)
+    quotations = Quotation.objects.filter(created_at__gte=since).values_list('product_id', 'created_at')
+    recent = [(product_id, created_at.timestamp()) for product_id, created_at in quotations]
+
+    backend = get_leaderboard_backend()
+    backend.replace(POPULAR_BOARD, popular)
+    sizes = {POPULAR_BOARD: len(popular)}
+    for board in TRENDING_BOARDS.values():
+        half_life = BOARDS[board]
+        scores: Dict[str, float] = {}
+        _merge(scores, (
+            (product_id, event_score(EVENT_WEIGHTS['quotation'], half_life, created_at))
+            for product_id, created_at in recent
+            if created_at >= now - lookback[board]
+        ))
+        backend.raise_scores(board, scores)
+        sizes[board] = len(scores)
+    return sizes
+
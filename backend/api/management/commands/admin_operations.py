@@ -9,7 +9,8 @@ from api.models import (
     User, ProductOwner, Product, VerificationRequest, 
     Notification, Subscription, Review, ChatSession
 )
-from api.cache_utils import CacheManager, ProductCacheWarmer
+from api.cache_utils import CacheManager
+from api.cache_warmup import warm_caches
 from datetime import datetime, timedelta
 import json
 
@@ -147,6 +148,22 @@ class Command(BaseCommand):
         if 'sample_keys' in cache_stats:
             self.stdout.write(f"  Popular Products Cached: {cache_stats['sample_keys']['popular_products_exists']}")
             self.stdout.write(f"  Trending Products Cached: {cache_stats['sample_keys']['trending_products_exists']}")
+            self.stdout.write(f"  Reporting Workers: {cache_stats['workers']}")
+            for name, info in cache_stats['caches'].items():
+                metrics = info['metrics']
+                if not metrics:
+                    self.stdout.write(f"  {name}: no traffic recorded")
+                    continue
+                hit_rate = f"{metrics['hit_rate']:.1%}" if metrics['hit_rate'] is not None else 'n/a'
+                self.stdout.write(
+                    f"  {name}: hit rate {hit_rate} ({metrics['hits']} hits, {metrics['l1_hits']} from L1, "
+                    f"{metrics['misses']} misses), {metrics['sets']} sets, {metrics['evictions']} evictions"
+                )
+                self.stdout.write(
+                    f"    get p50/p95 {metrics['get_latency_ms']['p50']}/{metrics['get_latency_ms']['p95']} ms, "
+                    f"payload p50/p95 {metrics['payload_bytes']['p50']}/{metrics['payload_bytes']['p95']} bytes, "
+                    f"keys shared={info['shared_keys']} l1={metrics['keys'].get('l1', 'n/a')}"
+                )
         
     def handle_verification_requests(self, options):
         """Handle document verification requests"""
@@ -263,25 +280,13 @@ class Command(BaseCommand):
             self.stdout.write("-" * 50)
 
     def warm_cache(self):
-        """Warm up cache with popular and trending products"""
+        """Warm up catalog caches (see the warm_caches command for options)"""
         self.stdout.write("Warming up cache...")
-        
-        # Warm popular products
-        if ProductCacheWarmer.warm_popular_products():
-            self.stdout.write("✓ Popular products cache warmed")
-        else:
-            self.stdout.write("✗ Failed to warm popular products cache")
-        
-        # Warm trending products
-        if ProductCacheWarmer.warm_trending_products():
-            self.stdout.write("✓ Trending products cache warmed")
-        else:
-            self.stdout.write("✗ Failed to warm trending products cache")
-        
-        # Warm trending for different periods
-        for days in [1, 30]:
-            if ProductCacheWarmer.warm_trending_products(days):
-                self.stdout.write(f"✓ Trending products cache warmed for {days} days")
+        report = warm_caches()
+        for namespace, counts in report['namespaces'].items():
+            mark = "✗" if counts['failed'] else "✓"
+            self.stdout.write(f"{mark} {namespace}: {counts['warmed']} warmed, {counts['failed']} failed")
+        self.stdout.write(f"Finished in {report['seconds']:.2f}s")
 
     def clear_cache(self):
         """Clear all cache"""
@@ -0,0 +1,138 @@
+"""
+Compare cache serializers and compressors on real product cache payloads
+Usage: python manage.py benchmark_cache_serializers [--products N] [--iterations N] [--synthetic]
+"""
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import cache_serializers
+from api.cache_serializers import CacheSerializer, PickleFormat
+from api.cache_utils import ProductCacheWarmer
+
+
+def synthetic_products(count):
+    """Listing entries shaped like ProductCacheWarmer's output, for empty databases."""
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'name': f"Portland cement 42.5R grade {index}",
+            'name_amharic': f"ፖርትላንድ ሲሚንቶ {index}",
+            'images': [f"/media/products/{index}/{image}.jpg" for image in range(4)],
+            'price': 1250.0 + index,
+            'average_rating': 4.2,
+            'view_count': 100 + index,
+            'owner_name': f"Addis Building Supplies {index % 7}",
+            'category': 'Cement & Concrete',
+            'cached_at': '2024-01-01T00:00:00',
+        }
+        for index in range(count)
+    ]
+
+
+def product_detail_payloads(limit):
+    """Serialized product details as the detail cache stores them."""
+    from api.models import Product
+    from api.serializers import ProductSerializer
+
+    products = Product.objects.select_related('owner', 'category')[:limit]
+    return [dict(ProductSerializer(product).data) for product in products]
+
+
+def available_serializers():
+    formats = ['pickle', 'json']
+    if cache_serializers.msgpack is not None:
+        formats.append('msgpack')
+    compressors = [None, 'zlib']
+    if cache_serializers.lz4_frame is not None:
+        compressors.append('lz4')
+    return [(format, compressor) for format in formats for compressor in compressors]
+
+
+def measure(serializer, payload, iterations):
+    """Return (encoded bytes, encode microseconds, decode microseconds) per call."""
+    if serializer.passthrough:
+        # Stored as is, so the shared backend pickles it itself
+        dumps, loads = PickleFormat.encode, PickleFormat.decode
+    else:
+        dumps, loads = serializer.dumps, serializer.loads
+    data = dumps(payload)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        dumps(payload)
+    encode_us = (time.perf_counter() - started) / iterations * 1e6
+    started = time.perf_counter()
+    for _ in range(iterations):
+        loads(data)
+    decode_us = (time.perf_counter() - started) / iterations * 1e6
+    return len(data), encode_us, decode_us
+
+
+class Command(BaseCommand):
+    help = 'Benchmark pickle/JSON/msgpack with zlib/LZ4 on product cache payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=50,
+            help='Number of product details to serialize (default: 50)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Encode/decode rounds per payload (default: 200)'
+        )
+        parser.add_argument(
+            '--synthetic',
+            action='store_true',
+            help='Use generated listing payloads instead of the database'
+        )
+        parser.add_argument(
+            '--min-compress-bytes',
+            type=int,
+            default=1024,
+            help='Compression threshold passed to the serializer (default: 1024)'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1")
+
+        payloads = {}
+        if not options['synthetic']:
+            payloads['popular_products'] = ProductCacheWarmer.compute_popular_products()
+            payloads['trending_products'] = ProductCacheWarmer.compute_trending_products()
+            details = product_detail_payloads(options['products'])
+            if details:
+                payloads['product_details'] = details
+        payloads = {name: payload for name, payload in payloads.items() if payload}
+        if not payloads:
+            self.stdout.write(self.style.WARNING("No products in the database, using synthetic payloads"))
+            payloads['synthetic_listing'] = synthetic_products(20)
+
+        self.stdout.write(
+            f"{'payload':<20} {'serializer':<16} {'bytes':>9} {'ratio':>6} {'encode us':>10} {'decode us':>10}"
+        )
+        for name, payload in payloads.items():
+            # Product details are cached one entry per product, so measure them that way
+            entries = payload if name == 'product_details' else [payload]
+            baseline = None
+            for format, compressor in available_serializers():
+                serializer = CacheSerializer(format, compressor, options['min_compress_bytes'])
+                size = encode_us = decode_us = 0
+                for entry in entries:
+                    entry_size, entry_encode, entry_decode = measure(serializer, entry, options['iterations'])
+                    size += entry_size
+                    encode_us += entry_encode
+                    decode_us += entry_decode
+                baseline = baseline or size
+                label = f"{format}+{compressor or 'none'}"
+                self.stdout.write(
+                    f"{name:<20} {label:<16} {size:>9} {size / baseline:>6.2f} {encode_us:>10.1f} {decode_us:>10.1f}"
+                )
+            self.stdout.write("")
+
+        self.stdout.write("Sizes and timings are totals per cache entry set; ratio is relative to pickle+none.")
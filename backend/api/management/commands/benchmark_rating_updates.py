@@ -0,0 +1,140 @@
+"""
+Compare the per-row and set-based rating recomputations on generated reviews
+Usage: python manage.py benchmark_rating_updates [--reviews N] [--products N] [--suppliers N] [--chunk-size N]
+
+The data is created inside a transaction that is rolled back at the end, so
+the database is left as it was.
+"""
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Avg
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Category, Product, ProductOwner, Review, User
+from api.ratings import DEFAULT_CHUNK_SIZE, recompute_product_ratings, recompute_supplier_ratings
+
+
+def per_row_update():
+    """The loop update_product_ratings used to run: an aggregate and a count per row."""
+    products_updated = 0
+    for product in Product.objects.filter(reviews__isnull=False).distinct():
+        avg_rating = product.reviews.aggregate(avg_rating=Avg('rating'))['avg_rating']
+        review_count = product.reviews.count()
+        if avg_rating and (product.average_rating != avg_rating or product.total_reviews != review_count):
+            product.average_rating = round(avg_rating, 2)
+            product.total_reviews = review_count
+            product.save(update_fields=['average_rating', 'total_reviews'])
+            products_updated += 1
+
+    suppliers_updated = 0
+    for supplier in ProductOwner.objects.filter(products__reviews__isnull=False).distinct():
+        avg_rating = supplier.products.filter(reviews__isnull=False).aggregate(
+            avg_rating=Avg('reviews__rating')
+        )['avg_rating']
+        total_reviews = sum(product.total_reviews for product in supplier.products.all())
+        if avg_rating and (supplier.average_rating != avg_rating or supplier.total_reviews != total_reviews):
+            supplier.average_rating = round(avg_rating, 2)
+            supplier.total_reviews = total_reviews
+            supplier.save(update_fields=['average_rating', 'total_reviews'])
+            suppliers_updated += 1
+    return products_updated, suppliers_updated
+
+
+def set_based_update(chunk_size):
+    return len(recompute_product_ratings(chunk_size)), len(recompute_supplier_ratings(chunk_size))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-row against set-based product and supplier rating recomputation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reviews',
+            type=int,
+            default=100000,
+            help='Number of reviews to generate (default: 100000)'
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=2000,
+            help='Number of products the reviews are spread over (default: 2000)'
+        )
+        parser.add_argument(
+            '--suppliers',
+            type=int,
+            default=200,
+            help='Number of suppliers owning the products (default: 200)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows per set-based UPDATE (default: {DEFAULT_CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        reviews, products, suppliers = options['reviews'], options['products'], options['suppliers']
+        if min(reviews, products, suppliers, options['chunk_size']) < 1:
+            raise CommandError("--reviews, --products, --suppliers and --chunk-size must be at least 1")
+        if suppliers > products:
+            raise CommandError("--suppliers can't exceed --products")
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.generate(reviews, products, suppliers)
+            self.stdout.write(
+                f"Generated {reviews} reviews on {products} products of {suppliers} suppliers "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+
+            self.stdout.write(f"{'strategy':<12} {'queries':>8} {'seconds':>9} {'products':>9} {'suppliers':>10}")
+            for label, run in (
+                ('per-row', per_row_update),
+                ('set-based', lambda: set_based_update(options['chunk_size'])),
+            ):
+                # Start each run from the same stale columns
+                Product.objects.update(average_rating=0, total_reviews=0)
+                ProductOwner.objects.update(average_rating=0, total_reviews=0)
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    products_updated, suppliers_updated = run()
+                    seconds = time.perf_counter() - started
+                self.stdout.write(
+                    f"{label:<12} {len(captured):>8} {seconds:>9.2f} {products_updated:>9} {suppliers_updated:>10}"
+                )
+            transaction.set_rollback(True)
+
+        self.stdout.write("Generated data was rolled back.")
+
+    def generate(self, reviews, products, suppliers):
+        """Bulk-create the benchmark rows (no signals, so every rating starts stale)."""
+        tag = uuid.uuid4().hex[:8]
+        reviewers = -(-reviews // products)  # each reviewer reviews a product at most once
+        users = User.objects.bulk_create([
+            User(username=f"bench-{tag}-{index}", email=f"bench-{tag}-{index}@example.com", password='!')
+            for index in range(suppliers + reviewers)
+        ], batch_size=1000)
+        owners = ProductOwner.objects.bulk_create([
+            ProductOwner(user=user, business_name=f"Benchmark Supplier {index}")
+            for index, user in enumerate(users[:suppliers])
+        ], batch_size=1000)
+        category = Category.objects.create(name=f"Benchmark {tag}", slug=f"benchmark-{tag}")
+        catalog = Product.objects.bulk_create([
+            Product(
+                owner=owners[index % suppliers], category=category, name=f"Benchmark product {index}",
+                description="Benchmark", unit="bag", location="Addis Ababa", status='active',
+            )
+            for index in range(products)
+        ], batch_size=1000)
+        buyers = users[suppliers:]
+        Review.objects.bulk_create(
+            (
+                Review(product=catalog[index % products], user=buyers[index // products], rating=index * 7 % 5 + 1)
+                for index in range(reviews)
+            ),
+            batch_size=2000,
+        )
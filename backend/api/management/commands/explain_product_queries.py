@@ -0,0 +1,104 @@
+"""
+Run EXPLAIN on the SQL ProductViewSet generates for common public listing filters
+Usage: python manage.py explain_product_queries [--fail-on-scan] [--analyze]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from api.models import Category
+from api.views import ProductViewSet
+
+# Query strings the Next.js listing and category pages send most often.
+LISTING_SCENARIOS = [
+    ('newest', {}),
+    ('category', {'category': '{category}'}),
+    ('subcategory', {'subcategory': '{subcategory}'}),
+    ('category_quotation', {'category': '{category}', 'quotation_available': 'true'}),
+    ('quotation_only', {'quotation_available': 'true'}),
+    ('cursor_page', {'pagination': 'cursor'}),
+]
+
+
+def build_listing_queryset(params):
+    """Return the queryset ProductViewSet.list would paginate for ``params``."""
+    request = APIRequestFactory().get('/api/products/', params)
+    view = ProductViewSet(action_map={'get': 'list'}, format_kwarg=None, args=(), kwargs={})
+    view.request = view.initialize_request(request)
+    queryset = view.filter_queryset(view.get_queryset())
+    if params.get('pagination') == 'cursor':
+        # KeysetCursorPagination orders on (created_at, id) itself
+        queryset = queryset.order_by('-created_at', '-id')
+    return queryset
+
+
+def plan_uses_full_scan(plan: str) -> bool:
+    """True when the plan reads the whole products table instead of an index."""
+    for line in plan.splitlines():
+        lowered = line.lower()
+        if 'seq scan on products' in lowered:
+            return True
+        # SQLite reports "SCAN products" for table scans and
+        # "SCAN products USING INDEX ..." when an index drives the ordering.
+        if 'scan products' in lowered and 'using' not in lowered:
+            return True
+    return False
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the product listing queries and flag full-table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan',
+            action='store_true',
+            help='Exit with an error if any scenario scans the whole products table'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Use EXPLAIN ANALYZE where the database supports it (PostgreSQL)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Page size to apply to each query (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        category = Category.objects.filter(parent__isnull=True).first()
+        subcategory = Category.objects.filter(parent__isnull=False).first()
+        placeholders = {
+            'category': str(category.pk) if category else '00000000-0000-0000-0000-000000000000',
+            'subcategory': str(subcategory.pk) if subcategory else '00000000-0000-0000-0000-000000000000',
+        }
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        scanning = []
+        for name, params in LISTING_SCENARIOS:
+            params = {key: value.format(**placeholders) for key, value in params.items()}
+            queryset = build_listing_queryset(params)[:options['limit']]
+
+            started = time.perf_counter()
+            plan = queryset.explain(**explain_options)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            full_scan = plan_uses_full_scan(plan)
+            if full_scan:
+                scanning.append(name)
+
+            status_label = self.style.WARNING('FULL SCAN') if full_scan else self.style.SUCCESS('indexed')
+            self.stdout.write(f"=== {name} {params or ''} [{status_label}] ({elapsed_ms:.1f} ms)")
+            self.stdout.write(plan)
+            self.stdout.write("")
+
+        if scanning and options['fail_on_scan']:
+            raise CommandError(f"Full table scan on products for: {', '.join(scanning)}")
+
+        self.stdout.write(f"Explained {len(LISTING_SCENARIOS)} scenarios on {connection.vendor}, {len(scanning)} full scans")
@@ -0,0 +1,25 @@
+"""
+Rebuild the product popularity leaderboards from the database
+Usage: python manage.py rebuild_leaderboards
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.leaderboards import get_leaderboard_backend, rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recompute the popular and trending leaderboards from stored counts and quotations'
+
+    def handle(self, *args, **options):
+        backend = get_leaderboard_backend()
+        self.stdout.write(f"Rebuilding leaderboards with {type(backend).__name__}...")
+
+        started = time.perf_counter()
+        sizes = rebuild_leaderboards()
+        elapsed = time.perf_counter() - started
+
+        for board, size in sizes.items():
+            self.stdout.write(f"  {board}: {size} products")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(sizes)} leaderboards in {elapsed:.2f}s"))
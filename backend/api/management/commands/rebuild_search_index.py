@@ -0,0 +1,24 @@
+"""
+Rebuild the product full-text search index
+Usage: python manage.py rebuild_search_index
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import Product
+from api.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Re-index every product in the configured full-text search backend'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f"Rebuilding search index with {type(backend).__name__}...")
+
+        started = time.perf_counter()
+        count = backend.rebuild(Product.objects.all().iterator(chunk_size=500))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} products in {elapsed:.2f}s"))
@@ -0,0 +1,71 @@
+"""
+Recompute Category._product_count from the products table to repair drift
+Usage: python manage.py reconcile_category_counts [--dry-run]
+"""
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from api.http_cache import bump_category_tree_version
+from api.models import Category, Product
+
+
+def expected_category_counts():
+    """
+    Return {category_id: active product count} using one grouped query.
+
+    Main categories count products by ``category`` and subcategories by
+    ``subcategory``, matching the deltas applied in ``api.signals``.
+    """
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    counts = Counter({category_id: 0 for category_id in parents})
+
+    grouped = (
+        Product.objects.filter(status='active')
+        .order_by()
+        .values('category_id', 'subcategory_id')
+        .annotate(total=Count('id'))
+    )
+    for row in grouped:
+        category_id, subcategory_id = row['category_id'], row['subcategory_id']
+        if category_id in parents and parents[category_id] is None:
+            counts[category_id] += row['total']
+        if subcategory_id in parents and parents[subcategory_id] is not None:
+            counts[subcategory_id] += row['total']
+    return counts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every category product count from a single grouped query'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted counts without writing them'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            categories = list(Category.objects.select_for_update().only('id', 'name', '_product_count'))
+            expected = expected_category_counts()
+
+            drifted = []
+            for category in categories:
+                count = expected[category.id]
+                if category._product_count != count:
+                    self.stdout.write(f"  {category.name}: {category._product_count} -> {count}")
+                    category._product_count = count
+                    drifted.append(category)
+
+            if drifted and not options['dry_run']:
+                Category.objects.bulk_update(drifted, ['_product_count'], batch_size=500)
+                # bulk_update sends no signals; drop cached trees and category ETags
+                bump_category_tree_version()
+
+        verb = 'Would fix' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {len(drifted)} of {len(expected)} category counts"
+        ))
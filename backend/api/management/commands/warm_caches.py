@@ -0,0 +1,73 @@
+"""
+Warm the catalog caches in parallel after a deploy or cache flush
+Usage: python manage.py warm_caches [--namespace NAME ...] [--workers N] [--budget SECONDS] [--top-products N]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache_warmup import (
+    DEFAULT_BUDGET, DEFAULT_TOP_PRODUCTS, DEFAULT_WORKERS, NAMESPACES, warm_caches,
+)
+
+
+class Command(BaseCommand):
+    help = 'Warm category tree, popular/trending lists, top product details and listing pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--namespace',
+            action='append',
+            choices=list(NAMESPACES),
+            help='Namespace to warm (repeatable; default: all)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=f'Thread pool size (default: {DEFAULT_WORKERS}; 1 runs serially)'
+        )
+        parser.add_argument(
+            '--budget',
+            type=float,
+            default=DEFAULT_BUDGET,
+            help=f'Seconds after which unstarted jobs are skipped (default: {DEFAULT_BUDGET:g})'
+        )
+        parser.add_argument(
+            '--top-products',
+            type=int,
+            default=DEFAULT_TOP_PRODUCTS,
+            help=f'Number of product detail pages to warm (default: {DEFAULT_TOP_PRODUCTS})'
+        )
+        parser.add_argument(
+            '--fail-on-error',
+            action='store_true',
+            help='Exit with an error if any job failed'
+        )
+
+    def handle(self, *args, **options):
+        if options['budget'] <= 0:
+            raise CommandError("--budget must be positive")
+
+        report = warm_caches(
+            namespaces=options['namespace'],
+            workers=options['workers'],
+            budget=options['budget'],
+            top_products=options['top_products'],
+        )
+
+        failed = 0
+        for namespace, counts in report['namespaces'].items():
+            failed += counts['failed']
+            line = (
+                f"{namespace:<16} warmed {counts['warmed']:>4}  failed {counts['failed']:>3}  "
+                f"skipped {counts['skipped'] + counts['timed_out']:>3}  {counts['seconds']:.2f}s"
+            )
+            self.stdout.write(self.style.WARNING(line) if counts['failed'] else line)
+
+        summary = f"Warmed caches in {report['seconds']:.2f}s of a {report['budget']:g}s budget"
+        if report['complete']:
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.WARNING(f"{summary}; budget exhausted before every job ran"))
+
+        if failed and options['fail_on_error']:
+            raise CommandError(f"{failed} cache warm-up jobs failed")
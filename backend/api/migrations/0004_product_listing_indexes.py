@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_quotation_response_document_alter_product_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'is_subscription_hidden', '-created_at'], name='products_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_subscription_hidden', False), ('status', 'active')), fields=['-created_at', '-id'], name='products_public_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_subscription_hidden', False), ('status', 'active')), fields=['category', '-created_at'], name='products_public_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_subscription_hidden', False), ('status', 'active')), fields=['subcategory', '-created_at'], name='products_public_subcat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_subscription_hidden', False), ('status', 'active')), fields=['quotation_available', '-created_at'], name='products_public_quote_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['owner', 'status'], name='products_owner_status_idx'),
+        ),
+    ]
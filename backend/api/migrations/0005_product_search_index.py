@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE "products" ADD COLUMN IF NOT EXISTS "search_vector" tsvector')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS "products_search_vector_idx" ON "products" USING GIN ("search_vector")'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS product_search_fts USING fts5("
+            "product_id UNINDEXED, title, brand, place, body, tokenize='unicode61')"
+        )
+    else:
+        return
+
+    from api.search import PostgresSearchBackend, SQLiteFTSSearchBackend
+
+    backend = PostgresSearchBackend() if vendor == 'postgresql' else SQLiteFTSSearchBackend()
+    Product = apps.get_model('api', 'Product')
+    backend.rebuild(Product.objects.all().iterator())
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS "products_search_vector_idx"')
+        schema_editor.execute('ALTER TABLE "products" DROP COLUMN IF EXISTS "search_vector"')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS product_search_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_product_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
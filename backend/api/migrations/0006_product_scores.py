@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(max_length=20)),
+                ('score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_scores', to='api.product')),
+            ],
+            options={
+                'db_table': 'product_scores',
+                'indexes': [models.Index(fields=['board', '-score'], name='product_scores_board_idx')],
+                'constraints': [models.UniqueConstraint(fields=('board', 'product'), name='product_scores_board_product_uniq')],
+            },
+        ),
+    ]
@@ -3,6 +3,7 @@ Django models for Zutali Conmart.
 These models map to the existing Supabase PostgreSQL tables.
 """
 from django.db import models
+from django.db.models import Avg, Count, OuterRef, Subquery
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from datetime import timedelta
@@ -156,12 +157,36 @@ class ProductOwner(models.Model):
         products_qs = self.products.order_by('created_at')
 
         if limit is None:
-            products_qs.filter(is_subscription_hidden=True).update(is_subscription_hidden=False)
-            return
-
-        visible_ids = list(products_qs.values_list('id', flat=True)[:limit])
-        self.products.exclude(id__in=visible_ids).update(is_subscription_hidden=True)
-        self.products.filter(id__in=visible_ids).update(is_subscription_hidden=False)
+            hidden = self.products.none()
+            shown = products_qs.filter(is_subscription_hidden=True)
+        else:
+            visible_ids = list(products_qs.values_list('id', flat=True)[:limit])
+            hidden = self.products.exclude(id__in=visible_ids).filter(is_subscription_hidden=False)
+            shown = self.products.filter(id__in=visible_ids, is_subscription_hidden=True)
+
+        hidden_ids = list(hidden.values_list('id', flat=True))
+        shown_ids = list(shown.values_list('id', flat=True))
+        self.products.filter(id__in=hidden_ids).update(is_subscription_hidden=True)
+        self.products.filter(id__in=shown_ids).update(is_subscription_hidden=False)
+        if hidden_ids or shown_ids:
+            self._products_visibility_changed(hidden_ids, shown_ids)
+
+    def _products_visibility_changed(self, hidden_ids, shown_ids) -> None:
+        """Do what the product save signals would have; ``update()`` sends no post_save."""
+        from . import autocomplete, facets, product_lookup
+        from .cache_utils import LISTING_TAG, CacheManager, product_tag
+
+        changed_ids = [*hidden_ids, *shown_ids]
+        CacheManager.bump_tags(*(product_tag(product_id) for product_id in changed_ids), LISTING_TAG)
+        facets.bump_catalog_version()
+        for product_id in shown_ids:
+            product_lookup.forget_missing(product_id)
+        autocomplete.on_products_saved(
+            self.products.filter(id__in=changed_ids).select_related('category').only(
+                'id', 'name', 'name_amharic', 'brand', 'view_count', 'status', 'is_subscription_hidden',
+                'category__name',
+            )
+        )
 
 
 class Category(models.Model):
@@ -198,7 +223,88 @@ class Category(models.Model):
 
 
 
-class Product(models.Model):
+class OriginalValuesMixin(models.Model):
+    """
+    Remember the database values of ``tracked_fields`` so saves and signals can
+    tell what changed without re-reading the row.
+
+    Values are captured in ``from_db`` and refreshed after each successful
+    ``save`` or ``refresh_from_db``. Signals fired during ``save`` (pre_save/post_save) still see the
+    values from before it.
+    """
+    tracked_fields: tuple = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def _tracked_attnames(cls):
+        return {cls._meta.get_field(name).attname: name for name in cls.tracked_fields}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        tracked = cls._tracked_attnames()
+        instance._original_values = {
+            tracked[attname]: value
+            for attname, value in zip(field_names, values)
+            if attname in tracked and value is not models.DEFERRED
+        }
+        return instance
+
+    def _snapshot_tracked_values(self, fields=None):
+        originals = getattr(self, '_original_values', None)
+        if originals is None:
+            originals = self._original_values = {}
+        deferred = self.get_deferred_fields()
+        for attname, name in self._tracked_attnames().items():
+            if (fields is None or name in fields or attname in fields) and attname not in deferred:
+                originals[name] = getattr(self, attname)
+
+    def has_original_value(self, field: str) -> bool:
+        """False for unsaved instances and fields deferred when the row was loaded."""
+        return field in getattr(self, '_original_values', {})
+
+    def original_value(self, field: str):
+        """The value ``field`` had in the database, or None if it is not known."""
+        return getattr(self, '_original_values', {}).get(field)
+
+    def has_changed(self, field: str) -> bool:
+        """True if ``field`` differs from the database (always True when the original is unknown)."""
+        if not self.has_original_value(field):
+            return True
+        return self.original_value(field) != getattr(self, self._meta.get_field(field).attname)
+
+    def changed_fields(self) -> set:
+        return {name for name in self.tracked_fields if self.has_changed(name)}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot_tracked_values(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        # The reloaded values are the database's now, not the ones loaded earlier
+        self._snapshot_tracked_values(fields)
+
+
+class ProductQuerySet(models.QuerySet):
+    """Query helpers shared by the product endpoints"""
+
+    def with_review_stats(self):
+        """Annotate each product with its review average and count.
+
+        Uses correlated subqueries so the rating data comes back with the
+        product rows instead of one aggregate per product at serialization time.
+        """
+        reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        return self.annotate(
+            review_average=Subquery(reviews.annotate(value=Avg('rating')).values('value')[:1]),
+            review_total=Subquery(reviews.annotate(value=Count('id')).values('value')[:1]),
+        )
+
+
+class Product(OriginalValuesMixin, models.Model):
     """Products listed by product owners"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey(ProductOwner, on_delete=models.CASCADE, related_name='products')
@@ -263,9 +369,51 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    # Fields whose database values are remembered for change detection (see OriginalValuesMixin)
+    tracked_fields = (
+        'status', 'category', 'subcategory', 'price', 'is_subscription_hidden',
+        'name', 'name_amharic', 'brand',
+    )
+
     class Meta:
         db_table = 'products'
         ordering = ['-created_at']
+        # Mirror the filters ProductViewSet.get_queryset applies to public listings
+        # (status='active', is_subscription_hidden=False, category OR subcategory,
+        # quotation_available) ordered newest first. The partial indexes only cover
+        # publicly visible rows, which keeps them small.
+        indexes = [
+            models.Index(
+                fields=['status', 'is_subscription_hidden', '-created_at'],
+                name='products_status_recent_idx',
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='products_public_recent_idx',
+                condition=models.Q(status='active', is_subscription_hidden=False),
+            ),
+            models.Index(
+                fields=['category', '-created_at'],
+                name='products_public_cat_idx',
+                condition=models.Q(status='active', is_subscription_hidden=False),
+            ),
+            models.Index(
+                fields=['subcategory', '-created_at'],
+                name='products_public_subcat_idx',
+                condition=models.Q(status='active', is_subscription_hidden=False),
+            ),
+            models.Index(
+                fields=['quotation_available', '-created_at'],
+                name='products_public_quote_idx',
+                condition=models.Q(status='active', is_subscription_hidden=False),
+            ),
+            models.Index(
+                fields=['owner', 'status'],
+                name='products_owner_status_idx',
+            ),
+        ]
 
 
 class Review(models.Model):
@@ -310,6 +458,24 @@ class Quotation(models.Model):
         ordering = ['-created_at']
 
 
+class ProductScore(models.Model):
+    """Leaderboard score of a product, for the database leaderboard backend (see api.leaderboards)"""
+    board = models.CharField(max_length=20)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='leaderboard_scores')
+    score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'product_scores'
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'product'], name='product_scores_board_product_uniq'),
+        ]
+        # Top-N reads walk this index from the high end
+        indexes = [
+            models.Index(fields=['board', '-score'], name='product_scores_board_idx'),
+        ]
+
+
 class Message(models.Model):
     """Messages between users and product owners"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -1,7 +1,15 @@
 """
 Custom pagination classes for Zutali Conmart API.
 """
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -20,3 +28,139 @@ class LargeResultsSetPagination(PageNumberPagination):
     page_size = 50
     page_size_query_param = 'page_size'
     max_page_size = 200
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset (seek) pagination on ``(ordering field, id)``.
+
+    Skips the COUNT(*) of page-number pagination and replaces OFFSET scans with
+    a ``WHERE (field, id) < (value, pk)`` predicate, so every page costs the
+    same no matter how deep the client scrolls. Cursors are opaque base64 tokens.
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    default_ordering = '-created_at'
+    tiebreaker_field = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, view)
+        field_name = self.ordering.lstrip('-')
+        model_field = queryset.model._meta.get_field(field_name)
+        tiebreaker = queryset.model._meta.get_field(self.tiebreaker_field)
+
+        cursor = self.decode_cursor(request)
+        is_reversed = bool(cursor and cursor['reverse'])
+        descending = self.ordering.startswith('-') != is_reversed
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{field_name}', f'{prefix}{self.tiebreaker_field}')
+
+        if cursor:
+            try:
+                value = model_field.to_python(cursor['value'])
+                pk = tiebreaker.to_python(cursor['pk'])
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field_name}__{lookup}': value})
+                | Q(**{field_name: value, f'{self.tiebreaker_field}__{lookup}': pk})
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if is_reversed:
+            results.reverse()
+
+        # Walking backwards means there is always a following page, and vice versa.
+        self.has_next = bool(cursor) if is_reversed else has_more
+        self.has_previous = has_more if is_reversed else bool(cursor)
+        self.model_field = model_field
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        try:
+            size = int(value)
+        except (TypeError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request, view):
+        """Use the first ``?ordering=`` term if the view allows it."""
+        allowed = set(getattr(view, 'ordering_fields', None) or [])
+        param = request.query_params.get(self.ordering_query_param, '')
+        term = param.split(',')[0].strip()
+        if term and term.lstrip('-') in allowed:
+            return term
+        return self.default_ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            cursor = {
+                'ordering': payload['o'],
+                'value': payload['v'],
+                'pk': payload['pk'],
+                'reverse': bool(payload.get('r')),
+            }
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if cursor['ordering'] != self.ordering:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, instance, reverse):
+        payload = {
+            'o': self.ordering,
+            'v': self.model_field.value_to_string(instance),
+            'pk': str(getattr(instance, self.tiebreaker_field)),
+        }
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
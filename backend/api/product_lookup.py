@@ -0,0 +1,260 @@
+"""
+Cheap rejection of product ids that don't exist.
+
+Stale links, crawlers and mistyped URLs ask for products that are not there,
+and each of those lookups used to reach the database. Two layers stop them:
+
+* An in-process Bloom filter of every product id. An id the filter has never
+  seen definitely does not exist, so bursts of junk ids are answered from
+  memory. The creating process adds a new id to its own filter at once and,
+  after commit, appends it to a shared numbered log of recently created ids;
+  before rejecting an id, other processes add the log entries they have not
+  seen yet to their filters. The filter is rebuilt (one
+  ``values_list('pk')`` query) every ``FILTER_MAX_AGE`` seconds, when the
+  ``product_ids`` cache tag changes, or when log entries have gone missing.
+  One thread rebuilds outside the lock and swaps the result in; meanwhile
+  other lookups skip the filter and go to the database.
+  Without a working shared cache (e.g. DummyCache) the filter is not used,
+  because other processes' creations could not be noticed.
+* A short-lived negative cache of ids that passed the filter (a false
+  positive, or a product hidden from the public) but were then not found.
+  Entries are per lookup scope - ``public`` for the public detail page,
+  ``any`` for lookups that accept every status - and are dropped when the
+  product is created or its visibility changes.
+
+Rows written without ``post_save`` (``bulk_create``, ``loaddata --raw``)
+must call ``invalidate_product_ids()`` so other processes rebuild the filter.
+
+Products are looked up by UUID only; anything else (e.g. a slug from the
+``/products/[slug]`` route) is rejected before either layer.
+"""
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache_utils import CacheManager
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_IDS_TAG = 'product_ids'
+MISSING_KEY = "product_missing_{scope}_{product_id}"
+MISSING_TIMEOUT = 60
+SCOPES = ('public', 'any')
+
+RECENT_SEQUENCE_KEY = "product_ids_recent_seq"
+RECENT_KEY = "product_ids_recent_{number}"
+FILTER_MAX_AGE = 3600
+RECENT_TIMEOUT = 2 * FILTER_MAX_AGE  # outlives any filter that still needs the entry
+MAX_RECENT_IDS = 1000  # beyond this many unseen creations, rebuild instead
+
+BLOOM_BITS_PER_ITEM = 10  # about a 1% false-positive rate with 7 hashes
+BLOOM_HASHES = 7
+BLOOM_MIN_BITS = 8192
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over byte strings, using double hashing."""
+
+    def __init__(self, capacity: int, bits_per_item: int = BLOOM_BITS_PER_ITEM, hashes: int = BLOOM_HASHES):
+        self.size = max(capacity * bits_per_item, BLOOM_MIN_BITS)
+        self.hashes = hashes
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: bytes):
+        digest = hashlib.blake2b(value, digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, value: bytes) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: bytes) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+_filter: Optional[BloomFilter] = None
+_filter_version = None
+_filter_built_at = 0.0
+_recent_seen = None
+_filter_lock = threading.Lock()
+_rebuilding = False
+_created_during_rebuild: List[bytes] = []
+
+
+def parse_product_id(product_id) -> Optional[uuid.UUID]:
+    try:
+        return product_id if isinstance(product_id, uuid.UUID) else uuid.UUID(str(product_id))
+    except ValueError:
+        return None
+
+
+def _recent_sequence() -> Optional[int]:
+    sequence = cache.get(RECENT_SEQUENCE_KEY)
+    if sequence is None:
+        # Unset or evicted: start above any number handed out before
+        cache.add(RECENT_SEQUENCE_KEY, int(time.time() * 1000), None)
+        sequence = cache.get(RECENT_SEQUENCE_KEY)
+    return sequence
+
+
+def _current_filter() -> Optional[BloomFilter]:
+    """The filter for the current ``product_ids`` generation, or None if it can't be trusted."""
+    global _filter, _filter_version, _filter_built_at, _recent_seen, _rebuilding
+    from .models import Product
+
+    version = CacheManager.get_tag_versions([PRODUCT_IDS_TAG])[PRODUCT_IDS_TAG]
+    if not version:
+        return None  # no shared cache to announce new products
+    with _filter_lock:
+        if (_filter is not None and _filter_version == version
+                and time.monotonic() - _filter_built_at < FILTER_MAX_AGE):
+            return _filter
+        if _rebuilding:
+            return None  # an outdated filter could reject a new product
+        _rebuilding = True
+        _created_during_rebuild.clear()
+
+    bloom = None
+    try:
+        # Ids logged up to here were committed before the scan starts
+        sequence = _recent_sequence()
+        if sequence is None:
+            return None
+        built_at = time.monotonic()
+        # The table scan runs without the lock so other lookups aren't held up
+        product_ids = list(Product.objects.values_list('pk', flat=True))
+        bloom = BloomFilter(len(product_ids))
+        for product_id in product_ids:
+            bloom.add(product_id.bytes)
+    finally:
+        with _filter_lock:
+            if bloom is not None:
+                for product_id in _created_during_rebuild:
+                    bloom.add(product_id)
+                _filter, _filter_version, _filter_built_at, _recent_seen = bloom, version, built_at, sequence
+            _rebuilding = False
+            _created_during_rebuild.clear()
+    return bloom
+
+
+def _add_recent_ids(bloom: BloomFilter) -> bool:
+    """Add the logged ids ``bloom`` hasn't seen; False if some of them can no longer be read."""
+    global _recent_seen
+    with _filter_lock:
+        seen = _recent_seen
+    sequence = cache.get(RECENT_SEQUENCE_KEY)
+    if sequence == seen:
+        return True
+    if sequence is None or seen is None or not 0 < sequence - seen <= MAX_RECENT_IDS:
+        return False
+    keys = [RECENT_KEY.format(number=number) for number in range(seen + 1, sequence + 1)]
+    found = cache.get_many(keys)
+    if len(found) != len(keys):
+        return False  # evicted
+    with _filter_lock:
+        for product_id in found.values():
+            bloom.add(product_id)
+        if _filter is bloom and _recent_seen == seen:
+            _recent_seen = sequence
+    return True
+
+
+def _drop_filter(bloom: BloomFilter) -> None:
+    global _filter
+    with _filter_lock:
+        if _filter is bloom:
+            _filter = None
+
+
+def product_may_exist(product_id) -> bool:
+    """False only when ``product_id`` is malformed or certainly not a product."""
+    parsed = parse_product_id(product_id)
+    if parsed is None:
+        return False
+    try:
+        bloom = _current_filter()
+        if bloom is None or parsed.bytes in bloom:
+            return True
+        if not _add_recent_ids(bloom):
+            _drop_filter(bloom)  # rebuild on the next lookup
+            return True
+    except Exception as e:
+        logger.error(f"Error checking product id filter: {e}")
+        return True
+    return parsed.bytes in bloom
+
+
+def _missing_key(product_id, scope: str) -> str:
+    return MISSING_KEY.format(scope=scope, product_id=parse_product_id(product_id) or product_id)
+
+
+def is_known_missing(product_id, scope: str) -> bool:
+    try:
+        return bool(cache.get(_missing_key(product_id, scope)))
+    except Exception as e:
+        logger.error(f"Error reading negative cache for product {product_id}: {e}")
+        return False
+
+
+def lookup_allowed(product_id, scope: str) -> bool:
+    """Whether a lookup of ``product_id`` may go to the database at all."""
+    return product_may_exist(product_id) and not is_known_missing(product_id, scope)
+
+
+def remember_missing(product_id, scope: str) -> None:
+    try:
+        cache.set(_missing_key(product_id, scope), 1, MISSING_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error caching missing product {product_id}: {e}")
+
+
+def forget_missing(product_id) -> None:
+    try:
+        cache.delete_many([_missing_key(product_id, scope) for scope in SCOPES])
+    except Exception as e:
+        logger.error(f"Error clearing negative cache for product {product_id}: {e}")
+
+
+def invalidate_product_ids() -> None:
+    """Make every process rebuild its filter on its next lookup."""
+    CacheManager.bump_tags(PRODUCT_IDS_TAG)
+
+
+def _log_created(product_id: uuid.UUID) -> None:
+    """Append ``product_id`` to the shared log of recently created ids."""
+    try:
+        sequence = _recent_sequence()
+        if sequence is None:
+            return  # no shared cache (e.g. DummyCache)
+        # Store the entry before advancing the sequence, so readers never miss it;
+        # add() fails for numbers concurrent creators have already taken
+        for number in range(sequence + 1, sequence + 1 + MAX_RECENT_IDS):
+            if cache.add(RECENT_KEY.format(number=number), product_id.bytes, RECENT_TIMEOUT):
+                break
+        else:
+            raise ValueError("no free log number")
+        cache.incr(RECENT_SEQUENCE_KEY)
+    except Exception as e:
+        logger.error(f"Error logging created product {product_id}: {e}")
+        invalidate_product_ids()
+
+
+def product_created(product_id) -> None:
+    """Make a new product visible to this process now and to the others after commit."""
+    parsed = parse_product_id(product_id)
+    with _filter_lock:
+        if parsed is not None:
+            if _filter is not None:
+                _filter.add(parsed.bytes)
+            if _rebuilding:
+                _created_during_rebuild.append(parsed.bytes)
+    forget_missing(product_id)
+    if parsed is not None:
+        transaction.on_commit(lambda: _log_created(parsed))
@@ -0,0 +1,78 @@
+"""
+Set-based recomputation of the denormalized rating columns.
+
+``Product.average_rating``/``total_reviews`` are kept current by the review
+signals; ``ProductOwner.average_rating``/``total_reviews`` are only refreshed
+here. ``recompute_ratings`` reconciles both from the reviews table: rows are
+walked in primary-key chunks, and for each chunk one SELECT finds the rows
+whose stored values differ from grouped review subqueries and one UPDATE
+rewrites just those. The query count grows with the number of chunks, not
+with the number of products or reviews.
+
+Values follow ``signals.update_product_rating_summary``: the average rounded
+to two places and the review count, both 0 for rows without reviews.
+"""
+from typing import Dict, List
+
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Round
+
+from .cache_utils import LISTING_TAG, CacheManager, owner_tag, product_tag
+from .models import Product, ProductOwner, Review
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _recompute(model, reviews, chunk_size: int) -> List:
+    """
+    Bring ``average_rating``/``total_reviews`` of every ``model`` row in line
+    with ``reviews`` (grouped on the outer row) and return the changed pks.
+    """
+    reviews = reviews.order_by()
+    average = Round(Coalesce(
+        Subquery(reviews.annotate(value=Avg('rating')).values('value')[:1], output_field=FloatField()),
+        Value(0.0),
+    ), 2)
+    total = Coalesce(
+        Subquery(reviews.annotate(value=Count('id')).values('value')[:1], output_field=IntegerField()),
+        Value(0),
+    )
+    stale = ~Q(average_rating=average) | ~Q(total_reviews=total)
+
+    changed = []
+    last_pk = None
+    while True:
+        chunk = model.objects.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        pks = list(chunk.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return changed
+        last_pk = pks[-1]
+        stale_pks = list(model.objects.filter(stale, pk__in=pks).values_list('pk', flat=True))
+        if stale_pks:
+            model.objects.filter(pk__in=stale_pks).update(average_rating=average, total_reviews=total)
+            changed.extend(stale_pks)
+
+
+def recompute_product_ratings(chunk_size: int = DEFAULT_CHUNK_SIZE) -> List:
+    """Recompute product ratings; return the pks of products that changed."""
+    return _recompute(Product, Review.objects.filter(product=OuterRef('pk')).values('product'), chunk_size)
+
+
+def recompute_supplier_ratings(chunk_size: int = DEFAULT_CHUNK_SIZE) -> List:
+    """Recompute supplier ratings over all reviews of their products; return the changed pks."""
+    return _recompute(
+        ProductOwner, Review.objects.filter(product__owner=OuterRef('pk')).values('product__owner'), chunk_size,
+    )
+
+
+def recompute_ratings(chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    """Recompute product and supplier ratings and invalidate the cache entries that show them."""
+    products = recompute_product_ratings(chunk_size)
+    suppliers = recompute_supplier_ratings(chunk_size)
+    tags = [product_tag(pk) for pk in products] + [owner_tag(pk) for pk in suppliers]
+    if tags:
+        # Ratings appear on list cards and sort the rating ordering
+        CacheManager.bump_tags(*tags, LISTING_TAG)
+    return {'products_updated': len(products), 'suppliers_updated': len(suppliers)}
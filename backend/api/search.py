@@ -0,0 +1,312 @@
+"""
+Full-text product search for Zutali Conmart.
+
+Text is tokenized in Python so English and Amharic (Ge'ez script) behave the
+same on every database: Ethiopic word separators (፡ ። ፣ ...) split words,
+combining marks stay attached, and homophone letter series (ሐ/ኀ/ሀ, ሠ/ሰ, ዐ/አ,
+ፀ/ጸ) are folded so either spelling matches. The token stream is then stored in
+a backend-specific index:
+
+* PostgreSQL - a weighted ``tsvector`` column on ``products`` with a GIN index,
+  ranked with ``ts_rank_cd``.
+* SQLite - an FTS5 shadow table ranked with ``bm25``.
+* Anything else - ``icontains`` matching, unranked.
+
+Indexes are kept current by the Product save/delete signals in ``signals.py``.
+"""
+import logging
+import re
+import unicodedata
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Word characters plus the Ethiopic combining marks (U+135D-U+135F), which are
+# not matched by \w but belong to the preceding syllable.
+TOKEN_RE = re.compile(r'[\w፝-፟]+')
+
+# Homophone series written interchangeably in Amharic, mapped to the canonical
+# series. Each series has seven orders on consecutive code points.
+_HOMOPHONE_SERIES = {
+    0x1210: 0x1200,  # ሐ -> ሀ
+    0x1280: 0x1200,  # ኀ -> ሀ
+    0x1220: 0x1230,  # ሠ -> ሰ
+    0x12D0: 0x12A0,  # ዐ -> አ
+    0x1340: 0x1338,  # ፀ -> ጸ
+}
+AMHARIC_FOLD = {
+    source + order: target + order
+    for source, target in _HOMOPHONE_SERIES.items()
+    for order in range(7)
+}
+
+# Product columns feeding each weighted section of the index.
+INDEX_SECTIONS = {
+    'title': ('name', 'name_amharic'),
+    'brand': ('brand', 'model'),
+    'place': ('location', 'city'),
+    'body': ('description', 'description_amharic'),
+}
+INDEXED_FIELDS = frozenset(field for fields in INDEX_SECTIONS.values() for field in fields)
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """NFC-normalize, case-fold and fold Amharic homophone letters."""
+    if not text:
+        return ''
+    return unicodedata.normalize('NFC', str(text)).casefold().translate(AMHARIC_FOLD)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split English and Amharic text into normalized search tokens."""
+    return TOKEN_RE.findall(normalize_text(text))
+
+
+def product_sections(product) -> Dict[str, str]:
+    """Return the space-joined tokens for each weighted index section."""
+    sections = {}
+    for section, fields in INDEX_SECTIONS.items():
+        tokens = []
+        for field in fields:
+            tokens.extend(tokenize(getattr(product, field, None)))
+        sections[section] = ' '.join(tokens)
+    return sections
+
+
+class BaseSearchBackend:
+    """Interface shared by the search backends."""
+
+    max_results = 500
+    _available: Optional[bool] = None
+
+    def is_available(self) -> bool:
+        """Whether this backend's index exists, checked once per process."""
+        if self._available is None:
+            try:
+                self._available = self.check_index()
+            except DatabaseError as exc:
+                logger.error(f"Error checking {type(self).__name__} index: {exc}")
+                return False
+        return self._available
+
+    def check_index(self) -> bool:
+        return True
+
+    def index_product(self, product) -> None:
+        raise NotImplementedError
+
+    def remove_product(self, product_id) -> None:
+        raise NotImplementedError
+
+    def search(self, queryset, query: str):
+        """Filter ``queryset`` to matches for ``query``, best matches first."""
+        raise NotImplementedError
+
+    def rebuild(self, products: Iterable) -> int:
+        count = 0
+        for product in products:
+            self.index_product(product)
+            count += 1
+        return count
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """Portable fallback: unranked ``icontains`` across the indexed columns."""
+
+    def index_product(self, product) -> None:
+        return None
+
+    def remove_product(self, product_id) -> None:
+        return None
+
+    def search(self, queryset, query: str):
+        terms = [term for term in query.split() if term]
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            condition = Q()
+            for field in INDEXED_FIELDS:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Weighted ``tsvector`` column with a GIN index, ranked by ``ts_rank_cd``."""
+
+    config = 'simple'  # tokens are pre-normalized; no stemmer exists for Amharic
+    weights = {'title': 'A', 'brand': 'B', 'body': 'C', 'place': 'D'}
+
+    def check_index(self) -> bool:
+        # search() returns a lazy queryset, so a missing column would only
+        # fail once the caller evaluates it - too late to fall back.
+        from .models import Product
+
+        table = Product._meta.db_table
+        with connection.cursor() as cursor:
+            columns = connection.introspection.get_table_description(cursor, table)
+        return any(column.name == 'search_vector' for column in columns)
+
+    def index_product(self, product) -> None:
+        sections = product_sections(product)
+        parts = []
+        params = []
+        for section, weight in self.weights.items():
+            parts.append(f"setweight(to_tsvector(%s, %s), '{weight}')")
+            params.extend([self.config, sections[section]])
+        table = product._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE "{table}" SET search_vector = {" || ".join(parts)} WHERE id = %s',
+                params + [product.pk],
+            )
+
+    def remove_product(self, product_id) -> None:
+        # The vector lives on the product row and goes away with it.
+        return None
+
+    @staticmethod
+    def build_query(query: str) -> str:
+        tokens = tokenize(query)
+        if not tokens:
+            return ''
+        # Every term must match; the last one may still be being typed.
+        terms = [f"'{token}'" for token in tokens[:-1]] + [f"'{tokens[-1]}':*"]
+        return ' & '.join(terms)
+
+    def search(self, queryset, query: str):
+        tsquery = self.build_query(query)
+        if not tsquery:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        matches = RawSQL(
+            f'SELECT id FROM "{table}" WHERE search_vector @@ to_tsquery(%s, %s)',
+            (self.config, tsquery),
+        )
+        rank = RawSQL(
+            f'ts_rank_cd("{table}"."search_vector", to_tsquery(%s, %s))',
+            (self.config, tsquery),
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank).order_by('-search_rank', '-created_at')
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """FTS5 shadow table ranked by ``bm25``; used for local development."""
+
+    table = 'product_search_fts'
+    columns = ('title', 'brand', 'place', 'body')
+    weights = (10.0, 4.0, 2.0, 1.0)
+
+    def check_index(self) -> bool:
+        with connection.cursor() as cursor:
+            return self.table in connection.introspection.table_names(cursor)
+
+    def index_product(self, product) -> None:
+        sections = product_sections(product)
+        key = uuid.UUID(str(product.pk)).hex
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE product_id = %s', [key])
+            cursor.execute(
+                f'INSERT INTO {self.table} (product_id, {", ".join(self.columns)}) VALUES (%s, %s, %s, %s, %s)',
+                [key] + [sections[column] for column in self.columns],
+            )
+
+    def remove_product(self, product_id) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE product_id = %s', [uuid.UUID(str(product_id)).hex])
+
+    @staticmethod
+    def build_query(query: str) -> str:
+        tokens = tokenize(query)
+        if not tokens:
+            return ''
+        terms = [f'"{token}"' for token in tokens[:-1]] + [f'"{tokens[-1]}"*']
+        return ' '.join(terms)
+
+    def ranked_ids(self, query: str) -> List[tuple]:
+        match = self.build_query(query)
+        if not match:
+            return []
+        weights = ', '.join(str(weight) for weight in self.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT product_id, bm25({self.table}, 0, {weights}) AS score '
+                f'FROM {self.table} WHERE {self.table} MATCH %s ORDER BY score LIMIT %s',
+                [match, self.max_results],
+            )
+            # bm25 is lower-is-better; flip it so every backend sorts rank descending.
+            return [(uuid.UUID(product_id), -score) for product_id, score in cursor.fetchall()]
+
+    def search(self, queryset, query: str):
+        ranked = self.ranked_ids(query)
+        if not ranked:
+            return queryset.none()
+        rank = Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in ranked],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=[pk for pk, _ in ranked]).annotate(search_rank=rank).order_by('-search_rank', '-created_at')
+
+    def rebuild(self, products: Iterable) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        return super().rebuild(products)
+
+
+_backend: Optional[BaseSearchBackend] = None
+
+
+def get_search_backend() -> BaseSearchBackend:
+    """Return the configured backend (``settings.SEARCH_BACKEND``) or pick one by database vendor."""
+    global _backend
+    if _backend is None:
+        dotted_path = getattr(settings, 'SEARCH_BACKEND', '')
+        if dotted_path:
+            _backend = import_string(dotted_path)()
+        elif connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite':
+            _backend = SQLiteFTSSearchBackend()
+        else:
+            _backend = IContainsSearchBackend()
+    return _backend
+
+
+def search_products(queryset, query: str):
+    """Run ``query`` through the active backend, degrading to ``icontains`` if its index is unavailable."""
+    backend = get_search_backend()
+    if not backend.is_available():
+        return IContainsSearchBackend().search(queryset, query)
+    try:
+        # Savepoint: a failed statement must not abort the caller's transaction
+        with transaction.atomic():
+            return backend.search(queryset, query)
+    except DatabaseError as exc:
+        logger.error(f"Search backend {type(backend).__name__} failed, using icontains: {exc}")
+        return IContainsSearchBackend().search(queryset, query)
+
+
+def index_product(product) -> None:
+    # Index writes run inside the product save's transaction; the savepoint
+    # keeps a failure here from leaving that transaction aborted (PostgreSQL).
+    try:
+        with transaction.atomic():
+            get_search_backend().index_product(product)
+    except DatabaseError as exc:
+        logger.error(f"Error indexing product {product.pk} for search: {exc}")
+
+
+def remove_product(product_id) -> None:
+    try:
+        with transaction.atomic():
+            get_search_backend().remove_product(product_id)
+    except DatabaseError as exc:
+        logger.error(f"Error removing product {product_id} from search index: {exc}")
@@ -0,0 +1,147 @@
+"""
+Cached results for the ``/api/search/`` endpoint.
+
+Queries are normalized before they reach the cache - NFC, case-folded,
+whitespace collapsed - so "Cement", " cement " and decomposed Amharic input
+share one entry, and filters are hashed in sorted order. The key also carries
+the catalog version that the product/category/owner signals bump (see
+``facets``), so an edit makes every cached result unreachable at once.
+
+Each process counts the queries it serves and periodically merges the counts
+into a shared, bounded table; ``warm_popular_queries`` (run by Celery)
+recomputes the most frequent ones so they are already cached under a new
+catalog version.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .cache_utils import CacheManager
+from .facets import get_catalog_version
+from .search import search_products
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TIMEOUT = 600
+MIN_QUERY_LENGTH = 2
+PRODUCT_LIMIT = 10
+CATEGORY_LIMIT = 5
+
+POPULAR_QUERIES_KEY = "search_popular_queries"
+POPULAR_QUERIES_SIZE = 200
+QUERY_COUNT_FLUSH_INTERVAL = 60  # seconds between merges of a process's counts
+
+_query_counts: Counter = Counter()
+_query_counts_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def normalize_query(query: Optional[str]) -> str:
+    """NFC-normalize, case-fold and collapse whitespace."""
+    if not query:
+        return ''
+    return ' '.join(unicodedata.normalize('NFC', str(query)).casefold().split())
+
+
+def _hash(value: str) -> str:
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def search_cache_key(query: str, filters: Optional[Dict[str, str]] = None) -> str:
+    """Cache key for a normalized query and its filters under the current catalog version."""
+    filters = {name: normalize_query(value) for name, value in (filters or {}).items() if value}
+    return CacheManager.SEARCH_RESULTS_KEY.format(
+        query_hash=_hash(f"{get_catalog_version()}|{query}"),
+        filters_hash=_hash(json.dumps(filters, sort_keys=True)),
+    )
+
+
+def compute_search_results(query: str) -> Dict[str, List[Dict]]:
+    """Run the product and category searches for an already-normalized query."""
+    from .models import Category, Product
+
+    products = search_products(Product.objects.select_related('category'), query)[:PRODUCT_LIMIT]
+    categories = Category.objects.filter(
+        Q(name__icontains=query) |
+        Q(description__icontains=query) |
+        Q(name_amharic__icontains=query) |
+        Q(description_amharic__icontains=query)
+    )[:CATEGORY_LIMIT]
+
+    return {
+        'products': [
+            {
+                'id': product.id,
+                'name': product.name,
+                'category': {'name': product.category.name} if product.category else None,
+            }
+            for product in products
+        ],
+        'categories': [{'id': category.id, 'name': category.name} for category in categories],
+    }
+
+
+def get_search_results(raw_query: Optional[str]) -> Dict[str, List[Dict]]:
+    """Return cached results for ``raw_query``, computing them once on a miss."""
+    query = normalize_query(raw_query)
+    if len(query) < MIN_QUERY_LENGTH:
+        return {'products': [], 'categories': []}
+
+    record_query(query)
+    try:
+        cache_key = search_cache_key(query)
+    except Exception as e:
+        logger.error(f"Error building search cache key: {e}")
+        return compute_search_results(query)
+    return CacheManager.get_or_compute(cache_key, lambda: compute_search_results(query), SEARCH_TIMEOUT)
+
+
+def record_query(query: str) -> None:
+    """Count a served query, merging this process's counts into the shared table now and then."""
+    global _last_flush
+    with _query_counts_lock:
+        _query_counts[query] += 1
+        if time.monotonic() - _last_flush < QUERY_COUNT_FLUSH_INTERVAL:
+            return
+        counts = _query_counts.copy()
+        _query_counts.clear()
+        _last_flush = time.monotonic()
+    flush_query_counts(counts)
+
+
+def flush_query_counts(counts: Counter) -> None:
+    # Read-modify-write: concurrent merges can drop a few counts, which is
+    # fine for ranking queries by popularity.
+    try:
+        merged = Counter(cache.get(POPULAR_QUERIES_KEY) or {})
+        merged.update(counts)
+        cache.set(POPULAR_QUERIES_KEY, dict(merged.most_common(POPULAR_QUERIES_SIZE)), None)
+    except Exception as e:
+        logger.error(f"Error recording popular search queries: {e}")
+
+
+def popular_queries(limit: int = 50) -> List[str]:
+    counts = Counter(cache.get(POPULAR_QUERIES_KEY) or {})
+    return [query for query, _ in counts.most_common(limit)]
+
+
+def warm_popular_queries(limit: int = 50) -> int:
+    """Cache results for the most frequent queries under the current catalog version."""
+    warmed = 0
+    for query in popular_queries(limit):
+        try:
+            cache_key = search_cache_key(query)
+            if CacheManager.peek(cache_key) is None:
+                CacheManager.store(cache_key, compute_search_results(query), SEARCH_TIMEOUT)
+            warmed += 1
+        except Exception as e:
+            logger.error(f"Error warming search results for {query!r}: {e}")
+    return warmed
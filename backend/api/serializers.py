@@ -2,6 +2,7 @@
 Django REST Framework serializers for Zutali Conmart API.
 """
 from rest_framework import serializers
+from django.core.exceptions import FieldDoesNotExist
 from django.utils.text import slugify
 from django.contrib.auth import authenticate
 from .models import (
@@ -9,6 +10,124 @@ from .models import (
     Review, Message, Admin, VerificationRequest,
     Subscription, SubscriptionPlan, PaymentTransaction
 )
+from . import product_lookup
+from .cache_utils import CacheManager
+
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets for read endpoints.
+
+    ``?fields=id,name,price`` limits the top-level serializer to those fields.
+    Nested relations named in ``fields`` render as their primary key; list them
+    in ``?expand=owner`` to get the full nested payload. Without ``fields`` the
+    output is unchanged. ``get_sparse_projection`` tells the view which columns
+    and joins the trimmed payload needs so it can narrow the SQL with ``only()``.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+    # Model attributes read by SerializerMethodFields, keyed by field name
+    sparse_field_sources = {}
+
+    def _is_root_serializer(self):
+        parent = self.parent
+        if parent is None:
+            return True
+        return isinstance(parent, serializers.ListSerializer) and parent.parent is None
+
+    def _query_param_set(self, name):
+        request = self.context.get('request')
+        params = getattr(request, 'query_params', None) or getattr(request, 'GET', {})
+        raw = params.get(name) or ''
+        return {part.strip() for part in raw.split(',') if part.strip()}
+
+    def get_sparse_fieldset(self):
+        """Return (fields, expand) requested by the client, or None for the full payload."""
+        request = self.context.get('request')
+        if request is None or request.method != 'GET' or not self._is_root_serializer():
+            return None
+        requested = self._query_param_set(self.fields_query_param)
+        if not requested:
+            return None
+        return requested, self._query_param_set(self.expand_query_param)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        sparse = self.get_sparse_fieldset()
+        if sparse is None:
+            return fields
+
+        requested, expand = sparse
+        trimmed = {}
+        for name, field in fields.items():
+            if name in expand:
+                trimmed[name] = field
+            elif name in requested:
+                if isinstance(field, serializers.BaseSerializer) and not getattr(field, 'many', False):
+                    kwargs = {'read_only': True}
+                    if field.source and field.source != name:
+                        kwargs['source'] = field.source
+                    field = serializers.PrimaryKeyRelatedField(**kwargs)
+                trimmed[name] = field
+        return trimmed
+
+    def get_sparse_projection(self):
+        """Return (columns, relations) for ``only()``/``select_related()``, or None."""
+        if self.get_sparse_fieldset() is None:
+            return None
+        return _collect_projection(self)
+
+
+def _collect_projection(serializer, prefix=''):
+    """Walk a bound serializer's fields and collect the columns and joins it reads."""
+    model = serializer.Meta.model
+    opts = model._meta
+    columns = {prefix + opts.pk.name}
+    restricted = set()
+    relations = set()
+    full_relations = set()
+
+    method_sources = getattr(serializer, 'sparse_field_sources', {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            paths = [source.split('.') for source in method_sources.get(name, ())]
+        elif field.source == '*':
+            continue
+        else:
+            paths = [field.source_attrs]
+
+        for attrs in paths:
+            try:
+                model_field = opts.get_field(attrs[0])
+            except FieldDoesNotExist:
+                continue
+            if not model_field.concrete or model_field.many_to_many:
+                continue
+
+            columns.add(prefix + attrs[0])
+            if not model_field.is_relation:
+                continue
+
+            nested = field if isinstance(field, serializers.ModelSerializer) else None
+            if nested is not None:
+                relation = prefix + attrs[0]
+                relations.add(relation)
+                full_relations.add(relation)
+                nested_columns, nested_relations = _collect_projection(nested, prefix=relation + '__')
+                relations.update(nested_relations)
+                full_relations.update(nested_relations)
+            elif len(attrs) > 1:
+                relations.add(prefix + attrs[0])
+                restricted.add(prefix + '__'.join(attrs[:2]))
+
+    # Relations rendered by nested serializers are loaded whole; only trim the
+    # ones reached through dotted sources such as ``category.name``.
+    for path in restricted:
+        if path.rsplit('__', 1)[0] not in full_relations:
+            columns.add(path)
+    return columns, relations
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -174,8 +293,11 @@ class ProductOwnerSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Category model"""
+    sparse_field_sources = {
+        'parent': ('parent.name', 'parent.name_amharic'),
+    }
     product_count = serializers.SerializerMethodField()
     parent = serializers.SerializerMethodField()
     images = serializers.ListField(
@@ -247,13 +369,27 @@ class CategorySerializer(serializers.ModelSerializer):
         return None
 
 
-class ProductSerializer(serializers.ModelSerializer):
+def favorite_product_ids(context) -> frozenset:
+    """The requesting user's favorite product ids, read once per serializer tree."""
+    if '_favorite_product_ids' not in context:
+        user = getattr(context.get('request'), 'user', None)
+        authenticated = user is not None and user.is_authenticated
+        context['_favorite_product_ids'] = CacheManager.get_favorite_ids(user.pk) if authenticated else frozenset()
+    return context['_favorite_product_ids']
+
+
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Product model"""
+    sparse_field_sources = {
+        'average_rating': ('average_rating',),
+        'review_count': ('total_reviews',),
+    }
     owner = ProductOwnerSerializer(read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     subcategory_name = serializers.CharField(source='subcategory.name', read_only=True)
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
+    is_favorited = serializers.SerializerMethodField()
     delivery_available = serializers.BooleanField(required=False)
 
     class Meta:
@@ -262,13 +398,19 @@ class ProductSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            return sum(r.rating for r in reviews) / len(reviews)
-        return 0
+        # Prefer the queryset annotation (see ProductQuerySet.with_review_stats) and
+        # fall back to the denormalized column kept current by the review signals.
+        if hasattr(obj, 'review_average'):
+            return float(obj.review_average) if obj.review_average is not None else 0
+        return float(obj.average_rating or 0)
 
     def get_review_count(self, obj):
-        return obj.reviews.count()
+        if hasattr(obj, 'review_total'):
+            return obj.review_total or 0
+        return obj.total_reviews or 0
+
+    def get_is_favorited(self, obj):
+        return str(obj.pk) in favorite_product_ids(self.context)
 
     def update(self, instance, validated_data):
         request = self.context.get('request')
@@ -362,7 +504,7 @@ class DashboardReviewSerializer(serializers.ModelSerializer):
         )
 
 
-class QuotationSerializer(serializers.ModelSerializer):
+class QuotationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Quotation model"""
     product = ProductSerializer(read_only=True)
     user = UserSerializer(read_only=True)
@@ -380,9 +522,12 @@ class QuotationSerializer(serializers.ModelSerializer):
         if not product_id:
             raise serializers.ValidationError({'product_id': 'This field is required.'})
 
+        if not product_lookup.lookup_allowed(product_id, 'any'):
+            raise serializers.ValidationError({'product_id': 'Invalid product.'})
         try:
             product = Product.objects.get(id=product_id)
         except Product.DoesNotExist as exc:
+            product_lookup.remember_missing(product_id, 'any')
             raise serializers.ValidationError({'product_id': 'Invalid product.'}) from exc
 
         return Quotation.objects.create(product=product, **validated_data)
@@ -1,80 +1,304 @@
 """
 Signals for the API app.
 """
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save
 from django.dispatch import receiver
-from .models import Category, Product
+from .models import Category, Product, ProductOwner, Quotation, Review, SubscriptionPlan, User
+from . import autocomplete, facets, http_cache, leaderboards, product_lookup, search
+from .cache_utils import (
+    LISTING_TAG, SUBSCRIPTION_PLANS_TAG, CacheManager, category_tag, owner_tag, product_tag,
+)
 
 
-def update_category_product_count(category):
-    """Update the product count for a category and its parent."""
-    if not category:
+# Product fields that decide which category counters a product contributes to
+COUNTED_FIELDS = frozenset({'status', 'category', 'subcategory'})
+
+
+def counted_categories(status, category_id, subcategory_id):
+    """
+    Return the (category_id, subcategory_id) counter slots an active product
+    occupies, or (None, None) for any other status.
+
+    Main categories count products by ``category`` and subcategories by
+    ``subcategory``; the UPDATE in ``adjust_category_counts`` enforces which
+    kind of category each slot may touch.
+    """
+    if status != 'active':
+        return None, None
+    return category_id, subcategory_id
+
+
+def adjust_category_counts(old_slots, new_slots):
+    """Apply +1/-1 F() deltas for the slots a product left or entered."""
+    (old_category, old_subcategory), (new_category, new_subcategory) = old_slots, new_slots
+
+    if old_category != new_category:
+        if old_category:
+            Category.objects.filter(pk=old_category, parent__isnull=True).update(_product_count=F('_product_count') - 1)
+        if new_category:
+            Category.objects.filter(pk=new_category, parent__isnull=True).update(_product_count=F('_product_count') + 1)
+
+    if old_subcategory != new_subcategory:
+        if old_subcategory:
+            Category.objects.filter(pk=old_subcategory, parent__isnull=False).update(_product_count=F('_product_count') - 1)
+        if new_subcategory:
+            Category.objects.filter(pk=new_subcategory, parent__isnull=False).update(_product_count=F('_product_count') + 1)
+
+
+@receiver(post_save, sender=Product)
+def update_product_counts_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """Move category counters only when a product enters/leaves ``active`` or changes category."""
+    if created:
+        old_slots = (None, None)
+    else:
+        if update_fields is not None and not (set(update_fields) & COUNTED_FIELDS):
+            return
+        if not (instance.changed_fields() & COUNTED_FIELDS):
+            return
+        old_slots = counted_categories(*original_counted_values(instance))
+    new_slots = counted_categories(*saved_counted_values(instance, update_fields))
+    adjust_category_counts(old_slots, new_slots)
+
+
+@receiver(post_delete, sender=Product)
+def update_product_counts_on_delete(sender, instance, **kwargs):
+    """Release the product's counter slots when it is deleted."""
+    old_slots = counted_categories(*original_counted_values(instance))
+    adjust_category_counts(old_slots, (None, None))
+
+
+@receiver(pre_save, sender=Product)
+def load_unknown_originals(sender, instance, update_fields=None, **kwargs):
+    """
+    Products loaded from the database already carry their original values.
+    Only instances built by hand or loaded with the counted columns deferred
+    need this read before the save overwrites the row.
+    """
+    if instance._state.adding:
+        return
+    if update_fields is not None and not (set(update_fields) & COUNTED_FIELDS):
         return
+    if all(instance.has_original_value(field) for field in COUNTED_FIELDS):
+        return
+    row = sender.objects.filter(pk=instance.pk).values_list('status', 'category_id', 'subcategory_id').first()
+    if row is not None:
+        instance._original_values = {
+            **getattr(instance, '_original_values', {}),
+            **dict(zip(('status', 'category', 'subcategory'), row)),
+        }
+
 
-    from django.db.models import Count, Q
+def saved_counted_values(product, update_fields=None):
+    """(status, category_id, subcategory_id) as written by the current save."""
+    original = original_counted_values(product)
+    values = []
+    for index, field in enumerate(('status', 'category', 'subcategory')):
+        if update_fields is None or field in update_fields or f'{field}_id' in update_fields:
+            values.append(getattr(product, product._meta.get_field(field).attname))
+        else:
+            values.append(original[index])
+    return tuple(values)
 
-    # Reload category from database to ensure parent relationship is loaded
-    try:
-        category = Category.objects.select_related('parent').get(pk=category.pk)
-    except Category.DoesNotExist:
+
+def original_counted_values(product):
+    """(status, category_id, subcategory_id) as stored before the current save or delete."""
+    values = []
+    for field in ('status', 'category', 'subcategory'):
+        if product.has_original_value(field):
+            values.append(product.original_value(field))
+        else:
+            values.append(getattr(product, product._meta.get_field(field).attname))
+    return tuple(values)
+
+
+def update_product_rating_summary(product_id):
+    """Refresh the denormalized rating columns for a single product."""
+    from django.db.models import Avg, Count
+
+    stats = Review.objects.filter(product_id=product_id).aggregate(
+        average=Avg('rating'),
+        total=Count('id'),
+    )
+    Product.objects.filter(pk=product_id).update(
+        average_rating=round(stats['average'] or 0, 2),
+        total_reviews=stats['total'],
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_product_rating_on_review_save(sender, instance, **kwargs):
+    """Keep Product.average_rating/total_reviews in step with its reviews."""
+    update_product_rating_summary(instance.product_id)
+
+
+@receiver(post_delete, sender=Review)
+def update_product_rating_on_review_delete(sender, instance, **kwargs):
+    update_product_rating_summary(instance.product_id)
+
+
+@receiver(post_save, sender=Product)
+def update_search_index_on_save(sender, instance, update_fields=None, **kwargs):
+    """Re-index a product's searchable text when it changes."""
+    if update_fields is not None and not (set(update_fields) & search.INDEXED_FIELDS):
+        return  # e.g. view_count bumps don't touch the index
+    search.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def update_search_index_on_delete(sender, instance, **kwargs):
+    search.remove_product(instance.pk)
+
+
+# Fields that change what the autocomplete index shows for a product
+SUGGESTION_FIELDS = frozenset({'name', 'name_amharic', 'brand', 'status', 'is_subscription_hidden', 'category'})
+
+
+@receiver(post_save, sender=Product)
+def update_suggestions_on_product_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not (set(update_fields) & SUGGESTION_FIELDS):
+        return
+    if not created and not (instance.changed_fields() & SUGGESTION_FIELDS):
         return
+    autocomplete.on_product_saved(instance)
 
-    # Check if this category has a parent (making it a subcategory)
-    if category.parent:
-        # This is a subcategory - count products where subcategory field matches
-        product_count = Product.objects.filter(subcategory=category, status='active').count()
-    else:
-        # This is a main category - count products where category field matches
-        product_count = Product.objects.filter(category=category, status='active').count()
 
-    # Update the category's product count using direct database update
-    Category.objects.filter(pk=category.pk).update(_product_count=product_count)
+@receiver(post_delete, sender=Product)
+def update_suggestions_on_product_delete(sender, instance, **kwargs):
+    autocomplete.on_product_deleted(instance.pk)
+
 
-    # If this is a subcategory, update its parent's count too
-    if category.parent:
-        parent_count = Product.objects.filter(category=category.parent, status='active').count()
-        Category.objects.filter(pk=category.parent.pk).update(_product_count=parent_count)
+@receiver(post_save, sender=Category)
+def update_suggestions_on_category_save(sender, instance, **kwargs):
+    autocomplete.on_category_saved(instance)
+
+
+@receiver(post_delete, sender=Category)
+def update_suggestions_on_category_delete(sender, instance, **kwargs):
+    autocomplete.on_category_deleted(instance.pk)
 
 
 @receiver(post_save, sender=Product)
-def update_product_counts_on_save(sender, instance, created, **kwargs):
-    """Update product counts when a product is saved."""
-    # If the product has a category, update its count
-    if instance.category:
-        update_category_product_count(instance.category)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ProductOwner)  # delivery and verification facets
+def invalidate_product_facets(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'view_count'}:
+        return  # view counts don't appear in any facet
+    facets.bump_catalog_version()
 
-    # If the product has a subcategory, update its count
-    if instance.subcategory:
-        update_category_product_count(instance.subcategory)
 
-    # If the product's category or subcategory was changed, update the old ones too
-    if hasattr(instance, '_old_category'):
-        if instance._old_category and instance._old_category != instance.category:
-            update_category_product_count(instance._old_category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_tree_version(sender, instance, update_fields=None, **kwargs):
+    """Category payloads embed product counts, so counted product changes bump the tree version too."""
+    if update_fields is not None and set(update_fields) <= {'view_count'}:
+        return
+    if sender is Product and kwargs.get('created') is False and not (instance.changed_fields() & COUNTED_FIELDS):
+        return
+    http_cache.bump_category_tree_version()
 
-    if hasattr(instance, '_old_subcategory'):
-        if instance._old_subcategory and instance._old_subcategory != instance.subcategory:
-            update_category_product_count(instance._old_subcategory)
+
+@receiver(post_save, sender=Product)
+def bump_product_cache_tags_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Bump the product's cache tag, and the listing tag when a field public
+    lists filter, sort or display by changed (``Product.tracked_fields``).
+    """
+    if update_fields is not None and set(update_fields) <= {'view_count'}:
+        return  # live view counts are merged in after cache reads
+    CacheManager.invalidate_product_cache(instance.pk, listing=created or bool(instance.changed_fields()))
 
 
 @receiver(post_delete, sender=Product)
-def update_product_counts_on_delete(sender, instance, **kwargs):
-    """Update product counts when a product is deleted."""
-    if instance.category:
-        update_category_product_count(instance.category)
-    if instance.subcategory:
-        update_category_product_count(instance.subcategory)
+def bump_product_cache_tags_on_delete(sender, instance, **kwargs):
+    CacheManager.invalidate_product_cache(instance.pk, listing=True)
 
 
-@receiver(pre_save, sender=Product)
-def store_old_category(sender, instance, **kwargs):
-    """Store the old category and subcategory before saving."""
-    if not instance.pk:
-        return  # New instance, no old values to store
-
-    try:
-        old_instance = sender.objects.get(pk=instance.pk)
-        instance._old_category = old_instance.category
-        instance._old_subcategory = old_instance.subcategory
-    except sender.DoesNotExist:
-        pass  # New instance
\ No newline at end of file
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_product_cache_tags_on_review(sender, instance, **kwargs):
+    """Ratings are shown on product pages and list cards."""
+    CacheManager.bump_tags(product_tag(instance.product_id), LISTING_TAG)
+
+
+@receiver(post_save, sender=ProductOwner)
+def bump_owner_cache_tags(sender, instance, **kwargs):
+    """Owner details are nested in product payloads and drive the verified/delivery filters."""
+    CacheManager.bump_tags(owner_tag(instance.pk), LISTING_TAG)
+
+
+@receiver(post_save, sender=User)
+def bump_owner_cache_tags_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    """The owner's user account is nested in product payloads too."""
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    owner_ids = ProductOwner.objects.filter(user=instance).values_list('pk', flat=True)
+    CacheManager.bump_tags(*(owner_tag(owner_id) for owner_id in owner_ids))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_cache_tags(sender, instance, **kwargs):
+    CacheManager.bump_tags(category_tag(instance.pk), LISTING_TAG)
+
+
+@receiver(post_save, sender=SubscriptionPlan)
+@receiver(post_delete, sender=SubscriptionPlan)
+def bump_subscription_plans_cache_tag(sender, **kwargs):
+    CacheManager.bump_tags(SUBSCRIPTION_PLANS_TAG)
+
+
+@receiver(post_save, sender=Quotation)
+def record_quotation_on_leaderboards(sender, instance, created, **kwargs):
+    if created:
+        leaderboards.record_event('quotation', instance.product_id)
+
+
+@receiver(m2m_changed, sender=User.favorite_products.through)
+def record_favorites_on_leaderboards(sender, instance, action, reverse, pk_set, **kwargs):
+    """Count new favorites; removing one doesn't take back points already earned."""
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        # product.favorited_by_users.add(*users)
+        leaderboards.record_events('favorite', {instance.pk: len(pk_set)})
+    else:
+        leaderboards.record_events('favorite', {product_id: 1 for product_id in pk_set})
+
+
+@receiver(m2m_changed, sender=User.favorite_products.through)
+def invalidate_cached_favorites(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached favorite id sets when favorites change outside toggle_favorite_product."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            CacheManager.invalidate_user_favorites(instance.pk)
+    elif action == 'pre_clear':
+        # product.favorited_by_users.clear() doesn't say whose favorites it removes
+        CacheManager.invalidate_user_favorites(*instance.favorited_by_users.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        CacheManager.invalidate_user_favorites(*pk_set)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_leaderboards(sender, instance, **kwargs):
+    leaderboards.remove_product(instance.pk)
+
+
+# Fields that decide whether a product is publicly visible
+VISIBILITY_FIELDS = frozenset({'status', 'is_subscription_hidden'})
+
+
+@receiver(post_save, sender=Product)
+def update_product_lookup_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """Admit new products to the id filter and drop stale not-found entries."""
+    if created:
+        product_lookup.product_created(instance.pk)
+        return
+    if update_fields is not None and not (set(update_fields) & VISIBILITY_FIELDS):
+        return
+    if instance.changed_fields() & VISIBILITY_FIELDS:
+        product_lookup.forget_missing(instance.pk)
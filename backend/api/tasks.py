@@ -3,14 +3,19 @@ Celery tasks for Zutali Conmart background operations
 """
 from celery import shared_task
 from django.utils import timezone
-from django.db.models import Count, Avg, Q
+from django.db.models import Count, Q
 from datetime import datetime, timedelta
 import logging
 from .models import (
     User, ProductOwner, Product, Category,
     Notification, Subscription, ChatSession, VerificationRequest
 )
-from .cache_utils import CacheManager, ProductCacheWarmer
+from .cache_utils import CacheManager, ProductCacheWarmer, default_cache
+from .view_counter import flush_view_counts
+from .leaderboards import trim_leaderboards
+from .ratings import DEFAULT_CHUNK_SIZE, recompute_ratings
+from .cache_warmup import warm_caches
+from .search_cache import warm_popular_queries
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +65,56 @@ def warm_trending_products_cache(self):
         logger.error(f"Error warming trending products cache: {str(e)}")
         raise self.retry(exc=e, countdown=60, max_retries=3)
 
+@shared_task(bind=True)
+def flush_product_view_counts(self):
+    """
+    Write buffered product views to Product.view_count
+    """
+    try:
+        result = flush_view_counts()
+        return {"status": "success", **result}
+    except Exception as e:
+        logger.error(f"Error flushing product view counts: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+@shared_task(bind=True)
+def warm_all_caches(self, budget=60.0, workers=4, namespaces=None):
+    """
+    Warm category tree, product lists, top product details and listing pages in parallel
+    """
+    try:
+        report = warm_caches(namespaces=namespaces, workers=workers, budget=budget)
+        return {"status": "success", **report}
+    except Exception as e:
+        logger.error(f"Error warming caches: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+@shared_task(bind=True)
+def trim_product_leaderboards(self):
+    """
+    Keep each popularity leaderboard to its best products
+    """
+    try:
+        trimmed = trim_leaderboards()
+        logger.info(f"Trimmed leaderboards: {trimmed}")
+        return {"status": "success", "trimmed": trimmed}
+    except Exception as e:
+        logger.error(f"Error trimming leaderboards: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+@shared_task(bind=True)
+def warm_popular_search_results(self):
+    """
+    Pre-compute results for the most frequent search queries
+    """
+    try:
+        warmed = warm_popular_queries()
+        logger.info(f"Warmed search results for {warmed} popular queries")
+        return {"status": "success", "queries_warmed": warmed}
+    except Exception as e:
+        logger.error(f"Error warming popular search results: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
 @shared_task(bind=True)
 def rotate_category_images(self):
     """
@@ -267,51 +322,19 @@ def process_verification_reminders(self):
         return {"status": "error", "message": str(e)}
 
 @shared_task(bind=True)
-def update_product_ratings(self):
+def update_product_ratings(self, chunk_size=DEFAULT_CHUNK_SIZE):
     """
     Update product and supplier average ratings based on reviews
     """
     try:
         logger.info("Starting product ratings update task")
-        
-        # Update product ratings
-        products_updated = 0
-        products_with_reviews = Product.objects.filter(reviews__isnull=False).distinct()
-        
-        for product in products_with_reviews:
-            avg_rating = product.reviews.aggregate(avg_rating=Avg('rating'))['avg_rating']
-            review_count = product.reviews.count()
-            
-            if avg_rating and (product.average_rating != avg_rating or product.total_reviews != review_count):
-                product.average_rating = round(avg_rating, 2)
-                product.total_reviews = review_count
-                product.save(update_fields=['average_rating', 'total_reviews'])
-                products_updated += 1
-        
-        # Update supplier ratings
-        suppliers_updated = 0
-        suppliers_with_reviews = ProductOwner.objects.filter(products__reviews__isnull=False).distinct()
-        
-        for supplier in suppliers_with_reviews:
-            # Get all reviews for this supplier's products
-            avg_rating = supplier.products.filter(reviews__isnull=False).aggregate(
-                avg_rating=Avg('reviews__rating')
-            )['avg_rating']
-            total_reviews = sum(product.total_reviews for product in supplier.products.all())
-            
-            if avg_rating and (supplier.average_rating != avg_rating or supplier.total_reviews != total_reviews):
-                supplier.average_rating = round(avg_rating, 2)
-                supplier.total_reviews = total_reviews
-                supplier.save(update_fields=['average_rating', 'total_reviews'])
-                suppliers_updated += 1
-        
-        logger.info(f"Ratings update completed. Updated {products_updated} products, {suppliers_updated} suppliers")
-        return {
-            "status": "success",
-            "products_updated": products_updated,
-            "suppliers_updated": suppliers_updated
-        }
-        
+        result = recompute_ratings(chunk_size=chunk_size)
+        logger.info(
+            f"Ratings update completed. Updated {result['products_updated']} products, "
+            f"{result['suppliers_updated']} suppliers"
+        )
+        return {"status": "success", **result}
+
     except Exception as e:
         logger.error(f"Error updating ratings: {str(e)}")
         return {"status": "error", "message": str(e)}
@@ -352,7 +375,7 @@ def generate_admin_report(self):
         
         # Store report in cache for admin dashboard
         cache_key = f"admin_report_{today.isoformat()}"
-        CacheManager.default_cache.set(cache_key, stats, timeout=86400)  # 24 hours
+        default_cache.set(cache_key, stats, timeout=86400)  # 24 hours
         
         logger.info(f"Admin report generated successfully for {today}")
         return {"status": "success", "report_date": today.isoformat(), "stats": stats}
@@ -0,0 +1,55 @@
+"""
+Fixtures shared by the API tests.
+
+``api.cache_utils`` binds its cache aliases at import, so overriding CACHES
+alone does not reach it; ``CacheSettingsMixin`` overrides CACHES for each
+test and points ``cache_utils`` at the overriding backends, cleared.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import override_settings
+
+from api import cache_utils
+from api.models import Product, ProductOwner
+
+CACHE_ALIASES = {'default': 'default_cache', 'products': 'products_cache', 'sessions': 'sessions_cache'}
+
+# No caching at all, for tests that count queries or need the uncached paths
+NO_CACHES = {alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'} for alias in CACHE_ALIASES}
+
+# A working shared cache for every alias, private to the test process
+LOCMEM_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'tests-{alias}'}
+    for alias in CACHE_ALIASES
+}
+
+
+class CacheSettingsMixin:
+    """Run every test with ``cache_settings`` as CACHES."""
+
+    cache_settings = NO_CACHES
+
+    def setUp(self):
+        override = override_settings(CACHES=self.cache_settings)
+        override.enable()
+        self.addCleanup(override.disable)
+        for alias, name in CACHE_ALIASES.items():
+            backend = caches[alias]
+            backend.clear()
+            patcher = mock.patch.object(cache_utils, name, backend)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        super().setUp()
+
+
+def create_owner(username="supplier", **fields) -> ProductOwner:
+    user = get_user_model().objects.create_user(username=username, password="password123", role="product_owner")
+    return ProductOwner.objects.create(user=user, business_name="Supplier Co", **fields)
+
+
+def create_product(owner, category, name="Portland Cement", **fields) -> Product:
+    """An active product; ``fields`` override the defaults."""
+    fields = {'description': name, 'unit': "bag", 'location': "Addis Ababa", 'status': "active", **fields}
+    return Product.objects.create(owner=owner, category=category, name=name, **fields)
@@ -0,0 +1,95 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api import cache_metrics
+
+METERED_CACHES = {
+    'default_shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'metrics-default'},
+    'default': {'BACKEND': 'api.cache_backends.MeteredCache', 'LOCATION': 'default', 'OPTIONS': {'L2': 'default_shared'}},
+    'products_shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'metrics-products'},
+    'products': {
+        'BACKEND': 'api.cache_backends.TieredCache',
+        'LOCATION': 'products',
+        'OPTIONS': {'L2': 'products_shared', 'L1_TIMEOUT': 60, 'L1_MAX_ENTRIES': 8},
+    },
+}
+
+
+@override_settings(CACHES=METERED_CACHES)
+class CacheMetricsTests(SimpleTestCase):
+    def setUp(self):
+        cache_metrics.reset()
+        for alias in ('default_shared', 'products_shared'):
+            caches[alias].clear()
+        self.products = caches['products']
+        self.products.clear_local()
+
+    def metrics(self, name):
+        return cache_metrics.merge_snapshots([cache_metrics.local_snapshot()])[name]
+
+    def test_hits_are_split_by_tier(self):
+        self.products.set('a', 1)
+        self.products.get('a')  # L1
+        self.products.clear_local()
+        self.products.get('a')  # L2
+        self.products.get('missing')
+
+        metrics = self.metrics('products')
+        self.assertEqual((metrics['hits'], metrics['l1_hits'], metrics['misses']), (2, 1, 1))
+        self.assertEqual(metrics['sets'], 1)
+        self.assertAlmostEqual(metrics['hit_rate'], 2 / 3, places=3)
+        self.assertEqual(metrics['get_latency_ms']['count'], 3)
+
+    def test_l1_culls_count_as_evictions(self):
+        for index in range(12):
+            self.products.set(f'key-{index}', index)
+        metrics = self.metrics('products')
+        self.assertGreater(metrics['evictions'], 0)
+        self.assertLessEqual(metrics['keys']['l1'], 8)
+
+    def test_payload_sizes_are_sampled(self):
+        with mock.patch.object(cache_metrics, 'SIZE_SAMPLE_EVERY', 1):
+            caches['default'].set('big', 'x' * 5000)
+        self.assertEqual(self.metrics('default')['payload_bytes']['p50'], 16384)
+
+    def test_workers_are_summed_through_the_shared_cache(self):
+        caches['default'].get('a')
+        other = {'default': {
+            'counters': {'hits': 4, 'misses': 1},
+            'get_latency_ms': {'bounds': list(cache_metrics.LATENCY_BUCKETS_MS),
+                               'counts': [5] + [0] * len(cache_metrics.LATENCY_BUCKETS_MS), 'total': 1.0},
+            'set_latency_ms': {'bounds': list(cache_metrics.LATENCY_BUCKETS_MS),
+                               'counts': [0] * (len(cache_metrics.LATENCY_BUCKETS_MS) + 1), 'total': 0.0},
+            'payload_bytes': {'bounds': list(cache_metrics.SIZE_BUCKETS),
+                              'counts': [0] * (len(cache_metrics.SIZE_BUCKETS) + 1), 'total': 0.0},
+        }}
+        caches['default_shared'].set(cache_metrics.SNAPSHOT_KEY.format(worker='other:1'), other)
+        caches['default_shared'].set(cache_metrics.WORKERS_KEY, {'other:1': time.time()})
+
+        report = cache_metrics.aggregate()
+        self.assertEqual(report['workers'], 2)
+        self.assertEqual(report['namespaces']['default']['hits'], 4)
+        # publish() itself reads the worker list, after this process's get
+        self.assertGreaterEqual(report['namespaces']['default']['misses'], 2)
+
+
+@override_settings(CACHES=METERED_CACHES)
+class CacheMetricsEndpointTests(APITestCase):
+    def test_admins_only(self):
+        url = reverse("admin-cache-metrics")
+        user = get_user_model().objects.create_user(username="buyer", password="password123")
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        admin = get_user_model().objects.create_user(username="admin", password="password123", role="admin")
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("sample_keys", response.json())
+        self.assertIn("products", response.json()["caches"])
@@ -0,0 +1,111 @@
+import datetime
+import pickle
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api import cache_metrics, cache_serializers
+from api.cache_serializers import MAGIC, CacheSerializer
+
+SERIALIZED_CACHES = {
+    'products_shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'serializer-products'},
+    'products': {
+        'BACKEND': 'api.cache_backends.TieredCache',
+        'LOCATION': 'products',
+        'OPTIONS': {
+            'L2': 'products_shared', 'L1_TIMEOUT': 60,
+            'SERIALIZER': 'json', 'COMPRESSOR': 'zlib', 'COMPRESS_MIN_BYTES': 256,
+        },
+    },
+}
+
+LISTING = [{'id': 'a1', 'name': 'Cement', 'price': 1250.5, 'images': ['/media/a.jpg'], 'category': None}] * 20
+
+
+class CacheSerializerTests(SimpleTestCase):
+    def test_json_round_trip(self):
+        serializer = CacheSerializer('json')
+        data = serializer.dumps(LISTING)
+        self.assertEqual(data[:3], MAGIC + b'j-')
+        self.assertEqual(serializer.loads(data), LISTING)
+
+    def test_values_json_cannot_encode_fall_back_to_pickle(self):
+        serializer = CacheSerializer('json')
+        for value in ({'content': b'{}'}, {1: 'a'}, {'at': datetime.datetime(2024, 1, 1)}):
+            data = serializer.dumps(value)
+            self.assertEqual(data[1:2], b'p')
+            self.assertEqual(serializer.loads(data), value)
+
+    def test_ints_are_stored_raw_for_incr(self):
+        self.assertEqual(CacheSerializer('json', 'zlib').dumps(42), 42)
+
+    def test_default_pickle_stores_values_as_is(self):
+        serializer = CacheSerializer()
+        self.assertTrue(serializer.passthrough)
+        self.assertIs(serializer.dumps(LISTING), LISTING)
+
+    def test_compression_only_above_threshold(self):
+        serializer = CacheSerializer('json', 'zlib', min_compress_bytes=256)
+        self.assertEqual(serializer.dumps({'a': 1})[2:3], b'-')
+        data = serializer.dumps(LISTING)
+        self.assertEqual(data[2:3], b'z')
+        self.assertLess(len(data), len(CacheSerializer('json').dumps(LISTING)))
+        self.assertEqual(serializer.loads(data), LISTING)
+
+    def test_reads_any_encoding_and_legacy_values(self):
+        reader = CacheSerializer('pickle')
+        self.assertEqual(reader.loads(CacheSerializer('json', 'zlib', 0).dumps(LISTING)), LISTING)
+        self.assertEqual(reader.loads({'written': 'before encoding'}), {'written': 'before encoding'})
+        self.assertEqual(reader.loads(pickle.dumps('raw')), pickle.dumps('raw'))
+
+    def test_unknown_or_missing_backends_are_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            CacheSerializer('json', 'brotli')
+        if cache_serializers.lz4_frame is None:
+            with self.assertRaises(ImproperlyConfigured):
+                CacheSerializer('json', 'lz4')
+        if cache_serializers.msgpack is None:
+            with self.assertRaises(ImproperlyConfigured):
+                CacheSerializer('msgpack')
+
+
+@override_settings(CACHES=SERIALIZED_CACHES)
+class SerializedTieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.products = caches['products']
+        self.products.clear()
+
+    def test_l2_holds_encoded_bytes_and_l1_objects(self):
+        self.products.set('listing', LISTING)
+        raw = caches['products_shared'].get('listing')
+        self.assertEqual(raw[:3], MAGIC + b'jz')
+        self.assertEqual(self.products.l1.get('listing'), LISTING)
+
+        self.products.clear_local()
+        self.assertEqual(self.products.get('listing'), LISTING)
+        self.assertEqual(self.products.get_many(['listing']), {'listing': LISTING})
+
+    def test_metrics_record_encoded_sizes(self):
+        cache_metrics.reset()
+        self.products.set_many({'a': LISTING, 'b': {'small': True}})
+        sizes = cache_metrics.merge_snapshots([cache_metrics.local_snapshot()])['products']['payload_bytes']
+        self.assertEqual(sizes['count'], 2)
+        self.assertEqual(sizes['total'], sum(len(caches['products_shared'].get(key)) for key in 'ab'))
+
+    def test_counters_still_increment(self):
+        self.products.set('count', 1)
+        self.assertEqual(self.products.incr('count'), 2)
+        self.products.clear_local()
+        self.assertEqual(self.products.get('count'), 2)
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_synthetic_run(self):
+        out = StringIO()
+        call_command('benchmark_cache_serializers', '--synthetic', '--iterations', '2', stdout=out)
+        output = out.getvalue()
+        self.assertIn('json+zlib', output)
+        self.assertIn('pickle+none', output)
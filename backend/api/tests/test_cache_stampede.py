@@ -0,0 +1,105 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from api import cache_utils
+from api.cache_utils import CacheManager
+from api.tests.helpers import LOCMEM_CACHES, CacheSettingsMixin
+
+
+def run_inline(func):
+    func()
+
+
+class StampedeProtectionTests(CacheSettingsMixin, SimpleTestCase):
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        self.default = caches['default']
+        self.products = caches['products']
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return ['value']
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(CacheManager.get_or_compute('hot', compute, 60)))
+            for _ in range(5)
+        ]
+        threads[0].start()
+        started.wait(1)
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [['value']] * 5)
+
+    def test_compute_errors_reach_every_waiter_and_are_not_cached(self):
+        compute = mock.Mock(side_effect=RuntimeError('database down'))
+        with self.assertRaises(RuntimeError):
+            CacheManager.get_or_compute('hot', compute, 60)
+        self.assertIsNone(self.products.get('hot'))
+        self.assertIsNone(self.default.get('lock_hot'))
+
+    def test_stale_value_is_served_while_one_refresh_runs(self):
+        CacheManager.store('hot', ['old'], timeout=60)
+        compute = mock.Mock(return_value=['new'])
+        background = mock.Mock()
+
+        with mock.patch('api.cache_utils.time.time', return_value=time.time() + 120), \
+                mock.patch.object(cache_utils, '_run_in_background', background):
+            self.assertEqual(CacheManager.get_or_compute('hot', compute, 60), ['old'])
+            self.assertEqual(CacheManager.get_or_compute('hot', compute, 60), ['old'])
+
+        # The second stale read found the refresh lock taken
+        background.assert_called_once()
+        background.call_args[0][0]()
+        compute.assert_called_once()
+        self.assertEqual(CacheManager.peek('hot'), ['new'])
+        self.assertIsNone(self.default.get('lock_hot'))
+
+    def test_fresh_value_is_not_recomputed(self):
+        CacheManager.store('hot', ['cached'], timeout=60)
+        compute = mock.Mock()
+        with mock.patch.object(cache_utils, '_run_in_background', run_inline):
+            self.assertEqual(CacheManager.get_or_compute('hot', compute, 60), ['cached'])
+        compute.assert_not_called()
+
+    def test_waits_for_another_process_holding_the_lock(self):
+        self.default.add('lock_hot', 1, 30)
+        compute = mock.Mock(return_value=['mine'])
+
+        def other_process_finishes(seconds):
+            CacheManager.store('hot', ['theirs'], timeout=60)
+
+        with mock.patch('api.cache_utils.time.sleep', side_effect=other_process_finishes):
+            self.assertEqual(CacheManager.get_or_compute('hot', compute, 60), ['theirs'])
+        compute.assert_not_called()
+
+    def test_an_overrunning_compute_keeps_the_next_workers_lock(self):
+        def compute():
+            # Our lock expired mid-compute and another worker took it
+            self.default.set('lock_hot', 'their-token', 30)
+            return ['mine']
+
+        self.assertEqual(CacheManager.get_or_compute('hot', compute, 60), ['mine'])
+        self.assertEqual(self.default.get('lock_hot'), 'their-token')
+
+    def test_popular_products_are_limited_after_read_through(self):
+        products = [{'id': str(index)} for index in range(20)]
+        with mock.patch.object(cache_utils.ProductCacheWarmer, 'compute_popular_products', return_value=products):
+            self.assertEqual(len(CacheManager.get_popular_products(limit=5)), 5)
+        self.assertEqual(CacheManager.peek(CacheManager.POPULAR_PRODUCTS_KEY), products)
@@ -0,0 +1,124 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.test import APITestCase
+
+from api import autocomplete, cache_utils, facets
+from api.cache_utils import CacheManager, LISTING_TAG, product_tag
+from api.models import Category, Product, Review
+from api.tests.helpers import LOCMEM_CACHES, CacheSettingsMixin, create_owner, create_product
+
+
+class TaggedInvalidationTests(CacheSettingsMixin, APITestCase):
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        self.owner = create_owner()
+        self.user = self.owner.user
+        self.category = Category.objects.create(name="Cement", slug="cement")
+        self.product = create_product(self.owner, self.category, "Portland Cement")
+        self.other = create_product(self.owner, self.category, "Rebar")
+
+    def cache_details(self, product):
+        data = {'id': str(product.pk), 'owner': {'id': str(self.owner.pk)}, 'category': str(self.category.pk)}
+        CacheManager.set_product_details(str(product.pk), data)
+
+    def details(self, product):
+        return CacheManager.get_product_details(str(product.pk))
+
+    def test_product_edit_only_invalidates_that_product(self):
+        self.cache_details(self.product)
+        self.cache_details(self.other)
+        CacheManager.set_popular_products([{'id': str(self.product.pk)}])
+
+        self.product.description = "Grade 52.5"
+        self.product.save()
+
+        self.assertIsNone(self.details(self.product))
+        self.assertIsNotNone(self.details(self.other))
+        # Popular lists wait for their scheduled refresh
+        self.assertEqual(CacheManager.peek(CacheManager.POPULAR_PRODUCTS_KEY), [{'id': str(self.product.pk)}])
+
+    def test_owner_and_category_edits_reach_dependent_products(self):
+        self.cache_details(self.product)
+        self.owner.business_name = "Supplier PLC"
+        self.owner.save()
+        self.assertIsNone(self.details(self.product))
+
+        self.cache_details(self.product)
+        self.category.name = "Cement & Binders"
+        self.category.save()
+        self.assertIsNone(self.details(self.product))
+
+    def test_listing_tag_follows_listed_fields_only(self):
+        listing = CacheManager.get_tag_versions([LISTING_TAG])
+
+        self.product.description = "Grade 52.5"
+        self.product.save()
+        self.product.save(update_fields=['view_count'])
+        self.assertEqual(CacheManager.get_tag_versions([LISTING_TAG]), listing)
+
+        self.product.price = 900
+        self.product.save()
+        self.assertNotEqual(CacheManager.get_tag_versions([LISTING_TAG]), listing)
+
+    def test_reviews_bump_the_product_tag(self):
+        version = CacheManager.get_tag_versions([product_tag(self.product.pk)])
+        reviewer = get_user_model().objects.create_user(username="buyer", password="password123")
+        Review.objects.create(product=self.product, user=reviewer, rating=4, comment="Good")
+        self.assertNotEqual(CacheManager.get_tag_versions([product_tag(self.product.pk)]), version)
+
+    def test_compute_records_tags_derived_from_the_value(self):
+        compute = mock.Mock(return_value={'id': str(self.product.pk), 'owner': {'id': str(self.owner.pk)}})
+        CacheManager.get_product_details(str(self.product.pk), compute=compute)
+        CacheManager.get_product_details(str(self.product.pk), compute=compute)
+        self.assertEqual(compute.call_count, 1)
+
+        CacheManager.bump_tags(cache_utils.owner_tag(self.owner.pk))
+        CacheManager.get_product_details(str(self.product.pk), compute=compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_edit_during_compute_invalidates_the_result(self):
+        def compute():
+            # The product is saved while its details are being built
+            CacheManager.bump_tags(product_tag(self.product.pk))
+            return {'id': str(self.product.pk), 'owner': {'id': str(self.owner.pk)}}
+
+        compute = mock.Mock(side_effect=compute)
+        CacheManager.get_product_details(str(self.product.pk), compute=compute)
+        CacheManager.get_product_details(str(self.product.pk), compute=compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_subscription_downgrade_invalidates_newly_hidden_products(self):
+        autocomplete.reset_suggestion_index()
+        self.addCleanup(autocomplete.reset_suggestion_index)
+        self.assertIn("Rebar", [item['title'] for item in autocomplete.suggest("rebar")])
+        self.cache_details(self.other)
+        listing = CacheManager.get_tag_versions([LISTING_TAG])
+        catalog = facets.get_catalog_version()
+
+        self.owner.tier = 'basic'  # one visible product, the oldest
+        self.owner.enforce_subscription_product_limit()
+
+        self.assertTrue(Product.objects.get(pk=self.other.pk).is_subscription_hidden)
+        self.assertIsNone(self.details(self.other))
+        self.assertNotEqual(CacheManager.get_tag_versions([LISTING_TAG]), listing)
+        self.assertNotEqual(facets.get_catalog_version(), catalog)
+        self.assertNotIn("Rebar", [item['title'] for item in autocomplete.suggest("rebar")])
+
+    def test_catalog_version_never_repeats_after_eviction(self):
+        facets.bump_catalog_version()
+        evicted = facets.get_catalog_version()
+        later = time.time() + 1
+
+        caches['default'].delete(facets.CATALOG_VERSION_KEY)
+        with mock.patch.object(facets.time, 'time', return_value=later):
+            self.assertGreater(facets.get_catalog_version(), evicted)
+
+        caches['default'].delete(facets.CATALOG_VERSION_KEY)
+        with mock.patch.object(facets.time, 'time', return_value=later):
+            facets.bump_catalog_version()
+        self.assertGreater(facets.get_catalog_version(), evicted)
@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db.models.signals import post_migrate
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api import cache_utils
+from api.cache_utils import CacheManager
+
+TIERED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tier-default'},
+    'products_shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tier-shared'},
+    'products': {
+        'BACKEND': 'api.cache_backends.TieredCache',
+        'TIMEOUT': 1800,
+        'OPTIONS': {'L2': 'products_shared', 'L1_TIMEOUT': 60, 'L1_MAX_ENTRIES': 100},
+    },
+}
+
+TWO_NAMESPACE_CACHES = {
+    **TIERED_CACHES,
+    'sessions_shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tier-sessions'},
+    'sessions': {
+        'BACKEND': 'api.cache_backends.TieredCache',
+        'OPTIONS': {'L2': 'sessions_shared', 'L1_TIMEOUT': 30},
+    },
+}
+
+
+@override_settings(CACHES=TWO_NAMESPACE_CACHES)
+class TieredCacheNamespaceTests(SimpleTestCase):
+    def test_namespaces_without_a_location_keep_separate_l1_stores(self):
+        products, sessions = caches['products'], caches['sessions']
+        products.set('key', 'product')
+        sessions.set('key', 'session')
+        self.assertEqual(products.l1.get('key'), 'product')
+
+        sessions.clear_local()
+        self.assertEqual(products.l1.get('key'), 'product')
+        self.assertIsNone(sessions.l1.get('key'))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'api.cache_backends.LockingDatabaseCache', 'LOCATION': 'tier_cache'}})
+class LockingDatabaseCacheTests(TestCase):
+    def setUp(self):
+        # What migrate runs after the api migrations
+        post_migrate.send(
+            sender=apps.get_app_config('api'), app_config=apps.get_app_config('api'),
+            verbosity=0, interactive=False, using='default', apps=apps, plan=[],
+        )
+
+    def test_counters_and_add(self):
+        cache = caches['default']
+        with self.assertRaises(ValueError):
+            cache.incr('views')
+        self.assertTrue(cache.add('views', 1))
+        self.assertFalse(cache.add('views', 5))
+        self.assertEqual(cache.incr('views', 4), 5)
+        self.assertEqual(cache.decr('views'), 4)
+        self.assertEqual(cache.get('views'), 4)
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(cache_utils, 'default_cache', caches['default'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tiered = caches['products']
+        self.shared = caches['products_shared']
+        self.tiered.clear()
+
+    def test_writes_reach_both_tiers_and_reads_prefer_l1(self):
+        self.tiered.set('key', 'value')
+        self.assertEqual(self.shared.get('key'), 'value')
+        with mock.patch.object(self.shared, 'get', side_effect=AssertionError('L2 read')):
+            self.assertEqual(self.tiered.get('key'), 'value')
+
+    def test_l2_hits_populate_l1(self):
+        self.shared.set('key', 'from another process')
+        self.assertEqual(self.tiered.get('key'), 'from another process')
+        self.assertEqual(self.tiered.l1.get('key'), 'from another process')
+
+    def test_counters_are_decided_by_the_shared_tier(self):
+        self.tiered.set('hits', 1)
+        self.shared.incr('hits', 5)  # another process
+        self.assertEqual(self.tiered.incr('hits'), 7)
+        self.assertEqual(self.tiered.get('hits'), 7)
+        self.assertFalse(self.tiered.add('hits', 0))
+
+    def test_cache_manager_reads_through_and_populates_on_miss(self):
+        compute = mock.Mock(return_value=[{'id': 1}])
+        self.assertEqual(CacheManager.get_or_compute('popular', compute, cache_backend=self.tiered), [{'id': 1}])
+        self.assertEqual(CacheManager.get_or_compute('popular', compute, cache_backend=self.tiered), [{'id': 1}])
+        compute.assert_called_once()
+        self.assertEqual(CacheManager.peek('popular', self.shared), [{'id': 1}])
+        self.assertEqual(CacheManager.peek('popular', self.tiered.l1), [{'id': 1}])
@@ -0,0 +1,107 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api import cache_utils, cache_warmup
+from api.cache_warmup import warm_caches
+from api.models import Category
+from api.tests.helpers import LOCMEM_CACHES, CacheSettingsMixin, create_owner, create_product
+
+
+@override_settings(CACHE_WARMUP_URL='http://testserver')
+class WarmCachesTests(CacheSettingsMixin, APITestCase):
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name="Cement", slug="cement")
+        self.product = create_product(create_owner(), self.category, description="Grade 42.5", view_count=10)
+
+    def test_first_visitors_hit_warm_caches(self):
+        # Worker threads can't see this test's uncommitted rows, so warm inline
+        report = warm_caches(workers=1)
+        self.assertTrue(report['complete'])
+        for namespace, counts in report['namespaces'].items():
+            self.assertEqual(counts['failed'], 0, namespace)
+        self.assertEqual(report['namespaces']['product_details']['warmed'], 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse("product-detail", args=[self.product.pk])).status_code, 200)
+            self.assertEqual(self.client.get(reverse("product-list")).status_code, 200)
+            self.client.get(reverse("product-list"), {'category': str(self.category.pk)})
+            self.client.get(reverse("category-list"))
+        self.assertIsNotNone(cache_utils.CacheManager.peek(cache_utils.CacheManager.POPULAR_PRODUCTS_KEY))
+
+    def test_listing_pages_are_warmed_for_the_configured_scheme(self):
+        with self.settings(CACHE_WARMUP_URL='https://testserver'):
+            report = warm_caches(namespaces=['listing_pages'], workers=1)
+        self.assertGreater(report['namespaces']['listing_pages']['warmed'], 0)
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse("product-list"), secure=True)
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse("product-list"))
+        self.assertTrue(captured.captured_queries)
+
+    def test_listing_pages_need_a_configured_scheme_and_host(self):
+        with self.settings(CACHE_WARMUP_URL='testserver'):
+            report = warm_caches(namespaces=['listing_pages'], workers=1)
+        self.assertEqual(report['namespaces']['listing_pages']['warmed'], 0)
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse("product-list"))
+        self.assertTrue(captured.captured_queries)
+
+    def test_unstarted_jobs_are_skipped_once_the_budget_is_spent(self):
+        report = warm_caches(namespaces=['popular', 'trending'], workers=1, budget=0.0)
+        self.assertFalse(report['complete'])
+        self.assertEqual(report['namespaces']['trending']['skipped'], 3)
+
+    def test_command_reports_each_namespace(self):
+        out = StringIO()
+        call_command('warm_caches', '--workers', '1', '--namespace', 'category_tree', '--namespace', 'popular',
+                     stdout=out)
+        output = out.getvalue()
+        self.assertIn('category_tree', output)
+        self.assertIn('popular', output)
+        self.assertNotIn('listing_pages', output)
+
+
+class WarmCachesPoolTests(SimpleTestCase):
+    def test_jobs_run_in_parallel_within_the_budget(self):
+        threads = set()
+
+        def slow_job():
+            threads.add(threading.get_ident())
+            time.sleep(0.2)
+
+        def failing_job():
+            raise RuntimeError("boom")
+
+        namespaces = {
+            'slow': lambda top: [(f'job-{index}', slow_job) for index in range(4)],
+            'broken': lambda top: [('broken', failing_job)],
+        }
+        with mock.patch.dict(cache_warmup.NAMESPACES, namespaces, clear=True):
+            report = warm_caches(workers=4, budget=5)
+
+        self.assertEqual(report['namespaces']['slow']['warmed'], 4)
+        self.assertEqual(report['namespaces']['broken']['failed'], 1)
+        self.assertGreater(len(threads), 1)
+        self.assertLess(report['seconds'], 0.6)
+
+    def test_jobs_still_running_at_the_deadline_are_reported(self):
+        namespaces = {'slow': lambda top: [(f'job-{index}', lambda: time.sleep(0.3)) for index in range(3)]}
+        with mock.patch.dict(cache_warmup.NAMESPACES, namespaces, clear=True):
+            report = warm_caches(workers=2, budget=0.1)
+
+        counts = report['namespaces']['slow']
+        self.assertFalse(report['complete'])
+        self.assertEqual((counts['timed_out'], counts['skipped']), (2, 1))
@@ -0,0 +1,111 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from api.models import Category, Product, ProductOwner
+from api.tests.helpers import CacheSettingsMixin
+
+
+class CategoryCountSignalTests(CacheSettingsMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        owner_user = get_user_model().objects.create_user(
+            username="supplier",
+            password="password123",
+            role="product_owner",
+        )
+        self.owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        self.materials = Category.objects.create(name="Building Materials", slug="building-materials")
+        self.finishes = Category.objects.create(name="Finishes", slug="finishes")
+        self.cement = Category.objects.create(name="Cement", slug="cement", parent=self.materials)
+        self.steel = Category.objects.create(name="Steel", slug="steel", parent=self.materials)
+
+    def make_product(self, **kwargs):
+        fields = dict(
+            owner=self.owner, category=self.materials, subcategory=self.cement, name="Portland Cement",
+            description="Grade 42.5", unit="bag", location="Addis Ababa", status="active",
+        )
+        fields.update(kwargs)
+        return Product.objects.create(**fields)
+
+    def counts(self):
+        return dict(Category.objects.values_list('slug', '_product_count'))
+
+    def test_counts_follow_status_and_category_changes(self):
+        product = self.make_product()
+        self.make_product(name="Draft", status="draft")
+        self.assertEqual(self.counts(), {"building-materials": 1, "finishes": 0, "cement": 1, "steel": 0})
+
+        product.subcategory = self.steel
+        product.save()
+        self.assertEqual(self.counts()["cement"], 0)
+        self.assertEqual(self.counts()["steel"], 1)
+
+        product.status = "inactive"
+        product.save()
+        self.assertEqual(self.counts(), {"building-materials": 0, "finishes": 0, "cement": 0, "steel": 0})
+
+        product.status = "active"
+        product.category = self.finishes
+        product.save()
+        product.delete()
+        self.assertEqual(self.counts(), {"building-materials": 0, "finishes": 0, "cement": 0, "steel": 0})
+
+    def test_unrelated_saves_do_not_touch_counters(self):
+        product = self.make_product()
+        product.price = 850
+        # Original values are known, so only the UPDATE itself runs
+        with self.assertNumQueries(1):
+            product.save(update_fields=["price", "status"])
+        with self.assertNumQueries(1):
+            product.save(update_fields=["price"])
+
+    def test_loaded_products_track_original_values(self):
+        product = Product.objects.get(pk=self.make_product().pk)
+        self.assertEqual(product.changed_fields(), set())
+
+        product.status = "inactive"
+        product.price = 900
+        self.assertEqual(product.changed_fields(), {"status", "price"})
+        self.assertEqual(product.original_value("status"), "active")
+
+        # No re-read of the row: the UPDATE plus the two counter decrements
+        with self.assertNumQueries(3):
+            product.save(update_fields=["status", "price"])
+        self.assertEqual(product.changed_fields(), set())
+        self.assertEqual(self.counts()["cement"], 0)
+
+    def test_refresh_picks_up_other_writers_changes(self):
+        product = self.make_product()
+        other = Product.objects.get(pk=product.pk)
+        other.subcategory = self.steel
+        other.save()
+
+        product.refresh_from_db()
+        self.assertEqual(product.changed_fields(), set())
+        product.status = "inactive"
+        product.save()
+        self.assertEqual(self.counts(), {"building-materials": 0, "finishes": 0, "cement": 0, "steel": 0})
+
+    def test_hand_built_instances_read_originals_once(self):
+        product = self.make_product()
+        detached = Product(**{f.attname: getattr(product, f.attname) for f in Product._meta.concrete_fields})
+        detached._state.adding = False
+        detached.status = "draft"
+        detached.save(update_fields=["status"])
+        self.assertEqual(self.counts()["cement"], 0)
+
+    def test_reconcile_repairs_drift(self):
+        self.make_product()
+        self.make_product(name="Rebar", subcategory=self.steel)
+        Category.objects.update(_product_count=7)
+
+        out = StringIO()
+        call_command("reconcile_category_counts", "--dry-run", stdout=out)
+        self.assertIn("Would fix 4 of 4", out.getvalue())
+        self.assertEqual(self.counts()["cement"], 7)
+
+        call_command("reconcile_category_counts", stdout=StringIO())
+        self.assertEqual(self.counts(), {"building-materials": 2, "finishes": 0, "cement": 1, "steel": 1})
@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.models import Category, Product, ProductOwner, Review
+from api.tests.helpers import LOCMEM_CACHES, NO_CACHES, CacheSettingsMixin
+
+
+class ConditionalGetTests(CacheSettingsMixin, APITestCase):
+    # Product details stay uncached, so revalidation has to reach the database
+    cache_settings = {**LOCMEM_CACHES, 'products': NO_CACHES['products']}
+
+    def setUp(self):
+        super().setUp()
+        self.owner_user = get_user_model().objects.create_user(
+            username="supplier",
+            password="password123",
+            role="product_owner",
+        )
+        owner = ProductOwner.objects.create(user=self.owner_user, business_name="Supplier Co")
+        self.category = Category.objects.create(name="Cement", slug="cement")
+        self.product = Product.objects.create(
+            owner=owner,
+            category=self.category,
+            name="Portland Cement",
+            description="Grade 42.5",
+            unit="bag",
+            location="Addis Ababa",
+            status="active",
+        )
+        self.product_url = reverse("product-detail", args=[self.product.pk])
+
+    def test_product_detail_revalidates_with_one_narrow_query(self):
+        response = self.client.get(self.product_url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.product_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_product_detail_has_no_last_modified(self):
+        # Reviews change the body without touching updated_at, so dates can't validate it
+        response = self.client.get(self.product_url)
+        self.assertFalse(response.has_header("Last-Modified"))
+        reviewer = get_user_model().objects.create_user(username="buyer", password="password123")
+        Review.objects.create(product=self.product, user=reviewer, rating=4, comment="Good")
+        response = self.client.get(self.product_url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT")
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_etag_changes_with_reviews_and_sparse_fields(self):
+        etag = self.client.get(self.product_url)["ETag"]
+        self.assertNotEqual(self.client.get(self.product_url, {"fields": "id,name"})["ETag"], etag)
+
+        reviewer = get_user_model().objects.create_user(username="buyer", password="password123")
+        Review.objects.create(product=self.product, user=reviewer, rating=4, comment="Good")
+        self.assertEqual(self.client.get(self.product_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_category_responses_follow_the_tree_version(self):
+        list_url = reverse("category-list")
+        detail_url = reverse("category-detail", args=[self.category.pk])
+        list_etag = self.client.get(list_url)["ETag"]
+        detail_etag = self.client.get(detail_url)["ETag"]
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag).status_code, 304)
+            self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 304)
+
+        # A product status change moves category counts, so the version moves too
+        self.product.status = "inactive"
+        self.product.save()
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+
+class CategoryTreeTests(CacheSettingsMixin, APITestCase):
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        self.materials = Category.objects.create(name="Building Materials", slug="building-materials", order=1)
+        self.finishes = Category.objects.create(name="Finishes", slug="finishes", order=2)
+        self.cement = Category.objects.create(name="Cement", slug="cement", parent=self.materials)
+        Category.objects.create(name="Retired", slug="retired", parent=self.materials, is_active=False)
+        owner_user = get_user_model().objects.create_user(
+            username="supplier",
+            password="password123",
+            role="product_owner",
+        )
+        self.owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        self.url = reverse("category-tree")
+
+    def test_tree_is_built_from_one_query_and_cached(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        tree = response.json()
+        self.assertEqual([node["name"] for node in tree], ["Building Materials", "Finishes"])
+        self.assertEqual([child["name"] for child in tree[0]["children"]], ["Cement"])
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_product_changes_refresh_the_counts(self):
+        self.client.get(self.url)
+        Product.objects.create(
+            owner=self.owner,
+            category=self.materials,
+            subcategory=self.cement,
+            name="Portland Cement",
+            description="Grade 42.5",
+            unit="bag",
+            location="Addis Ababa",
+            status="active",
+        )
+        tree = self.client.get(self.url).json()
+        self.assertEqual(tree[0]["product_count"], 1)
+        self.assertEqual(tree[0]["children"][0]["product_count"], 1)
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.cache_utils import CacheManager
+from api.models import Category
+from api.tests.helpers import LOCMEM_CACHES, CacheSettingsMixin, create_owner, create_product
+
+
+class FavoritedFlagTests(CacheSettingsMixin, APITestCase):
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        self.buyer = get_user_model().objects.create_user(username="buyer", password="password123")
+        self.owner = create_owner()
+        self.category = Category.objects.create(name="Cement", slug="cement")
+        self.cement, self.rebar = [
+            create_product(self.owner, self.category, name) for name in ("Portland Cement", "Rebar 12mm")
+        ]
+        self.buyer.favorite_products.add(self.cement)
+
+    def flags(self, response):
+        return {item['name']: item['is_favorited'] for item in response.json()['results']}
+
+    def favorites_queries(self, captured):
+        table = get_user_model().favorite_products.through._meta.db_table
+        return [query for query in captured.captured_queries if table in query['sql']]
+
+    def test_list_flags_come_from_the_cached_set(self):
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(
+            self.flags(self.client.get(reverse("product-list"))),
+            {"Portland Cement": True, "Rebar 12mm": False},
+        )
+
+        for index in range(5):
+            create_product(self.owner, self.category, f"Sand {index}")
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("product-list"))
+        self.assertEqual(len(response.json()['results']), 7)
+        self.assertEqual(self.favorites_queries(captured), [])
+
+    def test_anonymous_visitors_see_no_favorites(self):
+        self.assertEqual(
+            self.flags(self.client.get(reverse("product-list"))),
+            {"Portland Cement": False, "Rebar 12mm": False},
+        )
+
+    def test_toggle_updates_the_cached_set(self):
+        self.client.force_authenticate(self.buyer)
+        response = self.client.post(reverse("toggle-favorite-product", args=[self.rebar.pk]))
+        self.assertEqual(response.json()['favorites_count'], 2)
+        self.assertEqual(
+            set(CacheManager.get_user_favorites(self.buyer.pk)), {str(self.cement.pk), str(self.rebar.pk)},
+        )
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("product-detail", args=[self.rebar.pk]))
+        self.assertTrue(response.json()['is_favorited'])
+        self.assertEqual(self.favorites_queries(captured), [])
+
+    def test_changes_outside_the_toggle_drop_the_cached_set(self):
+        self.assertEqual(CacheManager.get_favorite_ids(self.buyer.pk), {str(self.cement.pk)})
+        self.rebar.favorited_by_users.add(self.buyer)
+        self.assertEqual(CacheManager.get_favorite_ids(self.buyer.pk), {str(self.cement.pk), str(self.rebar.pk)})
+        self.buyer.favorite_products.clear()
+        self.assertEqual(CacheManager.get_favorite_ids(self.buyer.pk), frozenset())
+
+    def test_detail_etag_varies_by_user_and_favorite(self):
+        url = reverse("product-detail", args=[self.cement.pk])
+        anonymous = self.client.get(url)
+        self.client.force_authenticate(self.buyer)
+        favorited = self.client.get(url)
+        self.assertNotEqual(favorited['ETag'], anonymous['ETag'])
+        self.assertIn('Cookie', favorited['Vary'])
+
+        self.client.post(reverse("toggle-favorite-product", args=[self.cement.pk]))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=favorited['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['is_favorited'])
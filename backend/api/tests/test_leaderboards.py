@@ -0,0 +1,106 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import leaderboards
+from api.cache_utils import ProductCacheWarmer
+from api.leaderboards import DAY, POPULAR_BOARD, record_events, top_product_ids
+from api.models import Category, Product, ProductOwner, ProductScore, Quotation
+from api.tests.helpers import LOCMEM_CACHES
+from api.view_counter import record_view, flush_view_counts
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="buyer", password="password123")
+        owner_user = get_user_model().objects.create_user(
+            username="supplier", password="password123", role="product_owner",
+        )
+        self.owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        self.category = Category.objects.create(name="Cement", slug="cement")
+        self.cement, self.rebar, self.sand = [
+            Product.objects.create(
+                owner=self.owner, category=self.category, name=name, description=name,
+                unit="bag", location="Addis Ababa", status="active",
+            )
+            for name in ("Portland Cement", "Rebar 12mm", "River Sand")
+        ]
+
+    def ids(self, *products):
+        return [str(product.pk) for product in products]
+
+    def test_recent_events_outrank_older_ones_on_short_windows(self):
+        now = time.time()
+        record_events('view', {self.cement.pk: 3}, at=now - 3 * DAY)
+        record_events('view', {self.rebar.pk: 1}, at=now)
+
+        self.assertEqual(top_product_ids('trending_1d', 2), self.ids(self.rebar, self.cement))
+        self.assertEqual(top_product_ids('trending_30d', 2), self.ids(self.cement, self.rebar))
+        self.assertEqual(top_product_ids(POPULAR_BOARD, 2), self.ids(self.cement, self.rebar))
+
+    def test_scores_accumulate_in_log_space(self):
+        now = time.time()
+        record_events('view', {self.cement.pk: 2}, at=now)
+        record_events('view', {self.cement.pk: 6}, at=now)
+        score = ProductScore.objects.get(board=POPULAR_BOARD, product=self.cement).score
+        self.assertAlmostEqual(2 ** score, 8)
+
+    def test_favorites_and_quotations_are_recorded_by_signals(self):
+        self.user.favorite_products.add(self.sand)
+        Quotation.objects.create(product=self.rebar, user=self.user, quantity=10)
+
+        # quotation (5) > favorite (3)
+        self.assertEqual(top_product_ids('trending_7d', 3), self.ids(self.rebar, self.sand))
+
+    def test_unknown_products_are_ignored(self):
+        record_events('view', {'00000000-0000-0000-0000-000000000000': 1, self.cement.pk: 1})
+        self.assertEqual(top_product_ids(POPULAR_BOARD, 5), self.ids(self.cement))
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_flushed_views_reach_the_leaderboards(self):
+        cache.clear()
+        public = Product.objects.filter(status='active')
+        record_view(self.sand.pk, "viewer-1", public)
+        record_view(self.sand.pk, "viewer-2", public)
+        self.assertEqual(top_product_ids(POPULAR_BOARD, 5), [])
+
+        flush_view_counts()
+        self.assertEqual(top_product_ids(POPULAR_BOARD, 5), self.ids(self.sand))
+
+    def test_popular_list_follows_the_board_and_skips_hidden_products(self):
+        record_events('view', {self.cement.pk: 1, self.rebar.pk: 5, self.sand.pk: 3})
+        Product.objects.filter(pk=self.sand.pk).update(status='inactive')
+
+        names = [product['name'] for product in ProductCacheWarmer.compute_popular_products()]
+        self.assertEqual(names, ["Rebar 12mm", "Portland Cement"])
+
+    def test_trim_keeps_the_best_entries(self):
+        record_events('view', {self.cement.pk: 1, self.rebar.pk: 5, self.sand.pk: 3})
+        self.assertEqual(leaderboards.trim_leaderboards(keep=2)[POPULAR_BOARD], 1)
+        self.assertEqual(top_product_ids(POPULAR_BOARD, 5), self.ids(self.rebar, self.sand))
+
+    def test_rebuild_from_counts_and_quotations(self):
+        Product.objects.filter(pk=self.cement.pk).update(view_count=40)
+        Quotation.objects.create(product=self.rebar, user=self.user, quantity=1)
+        ProductScore.objects.all().delete()
+
+        sizes = leaderboards.rebuild_leaderboards()
+        self.assertEqual(sizes, {POPULAR_BOARD: 2, 'trending_1d': 1, 'trending_7d': 1, 'trending_30d': 1})
+        self.assertEqual(top_product_ids(POPULAR_BOARD, 5), self.ids(self.cement, self.rebar))
+        self.assertEqual(top_product_ids('trending_1d', 5), self.ids(self.rebar))
+
+    def test_rebuild_keeps_live_trending_points_and_replays_old_quotations(self):
+        record_events('view', {self.sand.pk: 20})
+        quotation = Quotation.objects.create(product=self.rebar, user=self.user, quantity=1)
+        ProductScore.objects.filter(product=self.rebar).delete()  # e.g. trimmed away
+        Quotation.objects.filter(pk=quotation.pk).update(created_at=timezone.now() - timedelta(days=60))
+
+        sizes = leaderboards.rebuild_leaderboards()
+        self.assertEqual(sizes['trending_1d'], 0)
+        self.assertEqual(top_product_ids('trending_1d', 5), self.ids(self.sand))
+        # Two half-lives old, the quotation still counts on the 30-day board
+        self.assertEqual(top_product_ids('trending_30d', 5), self.ids(self.sand, self.rebar))
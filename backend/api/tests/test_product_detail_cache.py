@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.models import Category, Review
+from api.tests.helpers import LOCMEM_CACHES, CacheSettingsMixin, create_owner, create_product
+from api.view_counter import PENDING_KEY
+
+
+class ProductDetailCacheTests(CacheSettingsMixin, APITestCase):
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        self.owner = create_owner()
+        self.owner_user = self.owner.user
+        self.category = Category.objects.create(name="Cement", slug="cement")
+        self.product = create_product(self.owner, self.category, description="Grade 42.5", view_count=10)
+        self.url = reverse("product-detail", args=[self.product.pk])
+
+    def test_hits_are_served_without_queries(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.json(), first.json())
+        self.assertFalse(second.json()["is_favorited"])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=second["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_live_view_count_is_merged_after_the_cache_read(self):
+        self.client.get(self.url)
+        caches['default'].set(PENDING_KEY.format(product_id=self.product.pk), 3)
+        self.assertEqual(self.client.get(self.url).json()["view_count"], 13)
+
+    def test_product_review_and_owner_changes_invalidate(self):
+        self.client.get(self.url)
+
+        self.product.name = "Portland Cement 42.5"
+        self.product.save()
+        self.assertEqual(self.client.get(self.url).json()["name"], "Portland Cement 42.5")
+
+        reviewer = get_user_model().objects.create_user(username="buyer", password="password123")
+        Review.objects.create(product=self.product, user=reviewer, rating=4, comment="Good")
+        self.assertEqual(self.client.get(self.url).json()["review_count"], 1)
+
+        self.owner.business_name = "Supplier PLC"
+        self.owner.save()
+        self.assertEqual(self.client.get(self.url).json()["owner"]["business_name"], "Supplier PLC")
+
+    def test_hidden_products_are_not_served_from_cache(self):
+        self.client.get(self.url)
+        self.product.status = "inactive"
+        self.product.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(reverse("product-detail", args=["not-a-uuid"])).status_code, 404)
+
+    def test_favorited_flag_is_per_user(self):
+        self.client.get(self.url)
+        buyer = get_user_model().objects.create_user(username="buyer", password="password123")
+        buyer.favorite_products.add(self.product)
+        self.client.force_authenticate(user=buyer)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertTrue(response.json()["is_favorited"])
+
+    def test_owners_bypass_the_shared_payload(self):
+        self.client.force_authenticate(user=self.owner_user)
+        self.product.status = "draft"
+        self.product.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.models import Category, Product, ProductOwner
+from api.tests.helpers import CacheSettingsMixin
+
+
+class ProductFacetTests(CacheSettingsMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        verified = ProductOwner.objects.create(
+            user=User.objects.create_user(username="verified", password="password123", role="product_owner"),
+            business_name="Verified Co",
+            verification_status="verified",
+            delivery_available=True,
+        )
+        unverified = ProductOwner.objects.create(
+            user=User.objects.create_user(username="unverified", password="password123", role="product_owner"),
+            business_name="Small Shop",
+        )
+        self.cement = Category.objects.create(name="Cement", slug="cement")
+        self.steel = Category.objects.create(name="Steel", slug="steel")
+
+        def make(owner, category, name, brand, city, price, status="active"):
+            return Product.objects.create(
+                owner=owner, category=category, name=name, description=name, brand=brand,
+                city=city, location=city, price=price, unit="piece", status=status,
+            )
+
+        make(verified, self.cement, "OPC Cement", "Dangote", "Addis Ababa", Decimal("850"))
+        make(verified, self.cement, "PPC Cement", "Mugher", "Adama", Decimal("790"))
+        make(unverified, self.cement, "Cement 50kg", "Dangote", "Addis Ababa", Decimal("900"))
+        make(unverified, self.steel, "Rebar 12mm", "Kality", "Addis Ababa", Decimal("12000"))
+        make(verified, self.steel, "Draft Rebar", "Kality", "Addis Ababa", Decimal("1"), status="draft")
+        self.url = reverse("product-facets")
+
+    def test_counts_public_products_per_facet(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["total"], 4)
+        self.assertEqual(
+            [(item["name"], item["count"]) for item in data["category"]],
+            [("Cement", 3), ("Steel", 1)],
+        )
+        self.assertEqual(
+            [(item["value"], item["count"]) for item in data["city"]],
+            [("Addis Ababa", 3), ("Adama", 1)],
+        )
+        self.assertEqual(data["delivery_available"], {"true": 2, "false": 2})
+        self.assertEqual(data["verified_owner"], {"true": 2, "false": 2})
+        buckets = {item["key"]: item["count"] for item in data["price"]}
+        self.assertEqual(buckets["0-1000"], 3)
+        self.assertEqual(buckets["5000-20000"], 1)
+
+    def test_selected_facet_keeps_its_sibling_options(self):
+        data = self.client.get(self.url, {"brand": "dangote", "category": str(self.cement.pk)}).json()
+        self.assertEqual(data["total"], 2)
+        # Brands are counted within the category but ignoring the selected brand
+        self.assertEqual(
+            [(item["value"], item["count"]) for item in data["brand"]],
+            [("Dangote", 2), ("Mugher", 1)],
+        )
+        # Categories are counted for the selected brand, ignoring the selected category
+        self.assertEqual([(item["name"], item["count"]) for item in data["category"]], [("Cement", 2)])
+
+    def test_city_counts_match_the_city_filter(self):
+        data = self.client.get(self.url, {"city": "addis ababa"}).json()
+        self.assertEqual(data["total"], 3)
+        # The city facet ignores the selected city, and its count is what selecting it returns
+        self.assertEqual(
+            [(item["value"], item["count"]) for item in data["city"]],
+            [("Addis Ababa", 3), ("Adama", 1)],
+        )
+        self.assertEqual(self.client.get(self.url, {"city": "Adama"}).json()["total"], 1)
+
+    def test_uses_a_fixed_number_of_grouped_queries(self):
+        # One aggregate for the flags and price buckets, one GROUP BY per list facet
+        with self.assertNumQueries(5):
+            self.client.get(self.url, {"brand": "kality"})
+        # Each active scalar filter adds one aggregate that ignores it
+        with self.assertNumQueries(7):
+            self.client.get(self.url, {"min_price": "500", "verified_owner": "true"})
+
+    def test_rejects_invalid_filter_values(self):
+        response = self.client.get(self.url, {"category": "not-a-uuid"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,212 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+
+from api.models import Category, Product, ProductOwner, Review
+from api.tests.helpers import CacheSettingsMixin
+
+
+class ProductListingQueryTests(CacheSettingsMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_model = get_user_model()
+        owner_user = self.user_model.objects.create_user(
+            username="supplier",
+            password="password123",
+            email="supplier@example.com",
+            role="product_owner",
+        )
+        self.owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        self.category = Category.objects.create(name="Cement", slug="cement")
+        self.reviewers = [
+            self.user_model.objects.create_user(username=f"reviewer{i}", password="password123")
+            for i in range(3)
+        ]
+        self.client = APIClient()
+
+    def _create_products(self, count, start=0):
+        products = []
+        for index in range(start, start + count):
+            product = Product.objects.create(
+                owner=self.owner,
+                category=self.category,
+                name=f"Product {index}",
+                description="Portland cement",
+                unit="bag",
+                location="Addis Ababa",
+                status="active",
+            )
+            for rating, reviewer in zip((5, 4, 3), self.reviewers):
+                Review.objects.create(product=product, user=reviewer, rating=rating)
+            products.append(product)
+        return products
+
+    def test_list_query_count_is_constant(self):
+        url = reverse("product-list")
+        self._create_products(2)
+
+        # One COUNT for pagination plus one SELECT carrying owners, categories and ratings.
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 2)
+
+        self._create_products(8, start=2)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.json()["count"], 10)
+
+    def test_list_and_detail_report_review_stats(self):
+        product = self._create_products(1)[0]
+
+        response = self.client.get(reverse("product-list"))
+        item = response.json()["results"][0]
+        self.assertEqual(item["average_rating"], 4.0)
+        self.assertEqual(item["review_count"], 3)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("product-detail", kwargs={"pk": product.pk}))
+        self.assertEqual(response.json()["average_rating"], 4.0)
+        self.assertEqual(response.json()["review_count"], 3)
+
+    def test_review_signals_keep_rating_columns_current(self):
+        product = self._create_products(1)[0]
+        product.refresh_from_db()
+        self.assertEqual(float(product.average_rating), 4.0)
+        self.assertEqual(product.total_reviews, 3)
+
+        Review.objects.filter(product=product, rating=3).delete()
+        product.refresh_from_db()
+        self.assertEqual(float(product.average_rating), 4.5)
+        self.assertEqual(product.total_reviews, 2)
+
+
+class ProductCursorPaginationTests(CacheSettingsMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        owner_user = get_user_model().objects.create_user(
+            username="supplier",
+            password="password123",
+            role="product_owner",
+        )
+        owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        self.products = [
+            Product.objects.create(
+                owner=owner,
+                name=f"Product {index:02d}",
+                description="Steel rebar",
+                unit="piece",
+                location="Adama",
+                status="active",
+            )
+            for index in range(7)
+        ]
+        self.client = APIClient()
+
+    def _walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            payload = response.json()
+            self.assertNotIn("count", payload)
+            seen.extend(item["id"] for item in payload["results"])
+            url = payload["next"]
+        return seen
+
+    def test_cursor_walk_covers_every_product_once(self):
+        url = reverse("product-list") + "?pagination=cursor&page_size=3"
+        seen = self._walk(url)
+        expected = [
+            str(p.id) for p in sorted(self.products, key=lambda p: (p.created_at, p.id), reverse=True)
+        ]
+        self.assertEqual(seen, expected)
+
+    def test_cursor_pages_skip_count_query(self):
+        url = reverse("product-list") + "?pagination=cursor&page_size=3"
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_previous_cursor_returns_prior_page(self):
+        url = reverse("product-list") + "?pagination=cursor&page_size=3&ordering=name"
+        first = self.client.get(url).json()
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(
+            [item["name"] for item in second["results"]],
+            ["Product 03", "Product 04", "Product 05"],
+        )
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual(back["results"], first["results"])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse("product-list") + "?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductListingIndexTests(APITestCase):
+    def test_listing_scenarios_avoid_full_table_scans(self):
+        out = StringIO()
+        call_command("explain_product_queries", "--fail-on-scan", stdout=out)
+        self.assertIn("0 full scans", out.getvalue())
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        owner_user = get_user_model().objects.create_user(
+            username="supplier",
+            password="password123",
+            role="product_owner",
+        )
+        self.owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        self.parent = Category.objects.create(name="Building Materials", slug="building-materials")
+        self.category = Category.objects.create(name="Cement", slug="cement", parent=self.parent)
+        self.product = Product.objects.create(
+            owner=self.owner,
+            category=self.category,
+            name="Dangote Cement",
+            description="A very long description nobody renders on a card",
+            unit="bag",
+            location="Addis Ababa",
+            status="active",
+            price=950,
+        )
+        self.client = APIClient()
+
+    def test_fields_trims_payload_and_selected_columns(self):
+        url = reverse("product-list") + "?fields=id,name,price,category_name"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        item = response.json()["results"][0]
+        self.assertEqual(set(item), {"id", "name", "price", "category_name"})
+        self.assertEqual(item["category_name"], "Cement")
+
+        listing_sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn('"description"', listing_sql)
+        self.assertNotIn('"product_owners"', listing_sql)
+        self.assertNotIn('"reviews"', listing_sql)
+
+    def test_nested_relation_renders_pk_unless_expanded(self):
+        url = reverse("product-detail", kwargs={"pk": self.product.pk})
+        response = self.client.get(url + "?fields=id,owner")
+        self.assertEqual(response.json()["owner"], str(self.owner.pk))
+
+        response = self.client.get(url + "?fields=id&expand=owner")
+        self.assertEqual(response.json()["owner"]["business_name"], "Supplier Co")
+
+    def test_full_payload_without_fields(self):
+        response = self.client.get(reverse("product-detail", kwargs={"pk": self.product.pk}))
+        payload = response.json()
+        self.assertIn("description", payload)
+        self.assertEqual(payload["owner"]["business_name"], "Supplier Co")
+
+    def test_category_fields(self):
+        response = self.client.get(reverse("category-list") + "?fields=id,name,parent")
+        by_name = {item["name"]: item for item in response.json()}
+        self.assertEqual(set(by_name["Cement"]), {"id", "name", "parent"})
+        self.assertEqual(by_name["Cement"]["parent"]["name"], "Building Materials")
+        self.assertIsNone(by_name["Building Materials"]["parent"])
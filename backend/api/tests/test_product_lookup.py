@@ -0,0 +1,172 @@
+import threading
+import uuid
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api import product_lookup
+from api.models import Category, Product
+from api.product_lookup import BloomFilter
+from api.tests.helpers import LOCMEM_CACHES, CacheSettingsMixin, create_owner, create_product
+
+
+def reset_filter():
+    product_lookup._filter = None
+    product_lookup._filter_version = None
+    product_lookup._recent_seen = None
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_members_are_found_and_false_positives_are_rare(self):
+        members = [uuid.uuid4().bytes for _ in range(2000)]
+        bloom = BloomFilter(len(members))
+        for member in members:
+            bloom.add(member)
+
+        self.assertTrue(all(member in bloom for member in members))
+        false_positives = sum(uuid.uuid4().bytes in bloom for _ in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class ProductLookupTests(CacheSettingsMixin, APITestCase):
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        reset_filter()
+        self.addCleanup(reset_filter)
+
+        self.user = get_user_model().objects.create_user(username="buyer", password="password123", tier="premium")
+        self.owner = create_owner()
+        self.category = Category.objects.create(name="Cement", slug="cement")
+        self.product = create_product(self.owner, self.category, "Portland Cement")
+
+    def detail(self, product_id):
+        return self.client.get(reverse("product-detail", args=[product_id]))
+
+    def test_unknown_ids_are_rejected_without_queries(self):
+        self.assertEqual(self.detail(self.product.pk).status_code, 200)  # builds the filter
+
+        with self.assertNumQueries(0):
+            for _ in range(20):
+                self.assertEqual(self.detail(uuid.uuid4()).status_code, 404)
+            self.assertEqual(self.client.get("/api/products/portland-cement/").status_code, 404)
+
+    def test_new_products_are_found_immediately(self):
+        self.assertEqual(self.detail(self.product.pk).status_code, 200)
+        rebar = create_product(self.owner, self.category, "Rebar 12mm")
+        self.assertEqual(self.detail(rebar.pk).status_code, 200)
+
+    def test_products_created_elsewhere_are_found_after_invalidation(self):
+        self.assertTrue(product_lookup.product_may_exist(self.product.pk))
+        sand = Product.objects.bulk_create([Product(
+            owner=self.owner, category=self.category, name="River Sand", description="Sand",
+            unit="m3", location="Addis Ababa", status="active",
+        )])[0]
+        product_lookup.invalidate_product_ids()
+        self.assertTrue(product_lookup.product_may_exist(sand.pk))
+
+    def create_elsewhere(self, name):
+        """Create a product as another process would, leaving this process's filter alone."""
+        with mock.patch.object(product_lookup, '_filter', None), self.captureOnCommitCallbacks(execute=True):
+            return create_product(self.owner, self.category, name)
+
+    def test_products_created_elsewhere_are_found_without_a_rebuild(self):
+        self.assertTrue(product_lookup.product_may_exist(self.product.pk))  # builds the filter
+        rebar = self.create_elsewhere("Rebar 12mm")
+
+        with self.assertNumQueries(0):
+            self.assertTrue(product_lookup.product_may_exist(rebar.pk))
+            self.assertFalse(product_lookup.product_may_exist(uuid.uuid4()))
+
+    def test_evicted_log_entries_rebuild_the_filter(self):
+        self.assertTrue(product_lookup.product_may_exist(self.product.pk))
+        rebar = self.create_elsewhere("Rebar 12mm")
+        sequence = caches['default'].get(product_lookup.RECENT_SEQUENCE_KEY)
+        caches['default'].delete(product_lookup.RECENT_KEY.format(number=sequence))
+
+        self.assertTrue(product_lookup.product_may_exist(uuid.uuid4()))  # can't be ruled out
+        with self.assertNumQueries(1):
+            self.assertTrue(product_lookup.product_may_exist(rebar.pk))
+        self.assertFalse(product_lookup.product_may_exist(uuid.uuid4()))
+
+    def test_filter_is_rebuilt_when_it_ages_out(self):
+        self.assertTrue(product_lookup.product_may_exist(self.product.pk))
+        with self.assertNumQueries(0):
+            self.assertTrue(product_lookup.product_may_exist(self.product.pk))
+        with mock.patch.object(product_lookup, 'FILTER_MAX_AGE', 0), self.assertNumQueries(1):
+            self.assertTrue(product_lookup.product_may_exist(self.product.pk))
+
+    def test_hidden_products_are_negatively_cached_until_visible(self):
+        draft = create_product(self.owner, self.category, "Draft Cement", status="inactive")
+        self.assertEqual(self.detail(draft.pk).status_code, 404)
+        self.assertTrue(product_lookup.is_known_missing(draft.pk, 'public'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.detail(draft.pk).status_code, 404)
+
+        draft.status = 'active'
+        draft.save()
+        self.assertFalse(product_lookup.is_known_missing(draft.pk, 'public'))
+        self.assertEqual(self.detail(draft.pk).status_code, 200)
+
+    def test_subscription_upgrades_clear_negative_cache_entries(self):
+        hidden = create_product(self.owner, self.category, "Rebar 12mm")
+        Product.objects.filter(pk=hidden.pk).update(is_subscription_hidden=True)
+        self.assertEqual(self.detail(hidden.pk).status_code, 404)
+
+        self.owner.tier = 'premium'
+        self.owner.enforce_subscription_product_limit()
+        self.assertFalse(product_lookup.is_known_missing(hidden.pk, 'public'))
+        self.assertEqual(self.detail(hidden.pk).status_code, 200)
+
+    def test_lookups_are_not_blocked_by_a_rebuild(self):
+        created = uuid.uuid4()
+        concurrent = []
+
+        class SlowBloomFilter(BloomFilter):
+            def __init__(self, capacity):
+                super().__init__(capacity)
+                # Another request arrives, and this process creates a product, mid-rebuild
+                def request():
+                    concurrent.append(product_lookup.product_may_exist(uuid.uuid4()))
+                    product_lookup.product_created(created)
+
+                thread = threading.Thread(target=request, daemon=True)
+                thread.start()
+                thread.join(2)
+
+        # The thread's autocommit would log the fake product for other processes at once
+        with mock.patch.object(product_lookup, 'BloomFilter', SlowBloomFilter), \
+                mock.patch.object(product_lookup, '_log_created'):
+            self.assertTrue(product_lookup.product_may_exist(self.product.pk))
+        self.assertEqual(concurrent, [True])
+        self.assertTrue(product_lookup.product_may_exist(created))
+
+    def test_writes_reject_unknown_products(self):
+        self.client.force_authenticate(self.user)
+        missing = uuid.uuid4()
+
+        response = self.client.post(reverse("toggle-favorite-product", args=[missing]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(reverse("quotation-list"), {'product_id': str(missing), 'quantity': 5})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('product_id', response.data)
+
+        response = self.client.post(reverse("toggle-favorite-product", args=[self.product.pk]))
+        self.assertEqual(response.status_code, 200)
+
+
+class ProductLookupWithoutSharedCacheTests(CacheSettingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        reset_filter()
+        self.addCleanup(reset_filter)
+
+    def test_filter_is_disabled(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(product_lookup.product_may_exist(uuid.uuid4()))
+        self.assertFalse(product_lookup.product_may_exist("not-a-uuid"))
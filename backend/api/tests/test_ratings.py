@@ -0,0 +1,71 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from api.models import Category, Product, ProductOwner, Review
+from api.ratings import recompute_ratings
+from api.tasks import update_product_ratings
+
+
+class RecomputeRatingsTests(TestCase):
+    def setUp(self):
+        owner_user = get_user_model().objects.create_user(
+            username="supplier", password="password123", role="product_owner",
+        )
+        self.owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.cement, self.rebar, self.sand = [
+            Product.objects.create(
+                owner=self.owner, category=category, name=name, description=name,
+                unit="bag", location="Addis Ababa", status="active",
+            )
+            for name in ("Portland Cement", "Rebar 12mm", "River Sand")
+        ]
+        buyers = [
+            get_user_model().objects.create_user(username=f"buyer{index}", password="password123")
+            for index in range(3)
+        ]
+        # bulk_create skips the review signals, leaving every rating stale
+        Review.objects.bulk_create([
+            Review(product=self.cement, user=buyers[0], rating=5),
+            Review(product=self.cement, user=buyers[1], rating=4),
+            Review(product=self.cement, user=buyers[2], rating=4),
+            Review(product=self.rebar, user=buyers[0], rating=2),
+        ])
+        Product.objects.filter(pk=self.sand.pk).update(average_rating=Decimal('3.50'), total_reviews=2)
+
+    def test_stale_rows_are_rewritten(self):
+        self.assertEqual(recompute_ratings(chunk_size=2), {'products_updated': 3, 'suppliers_updated': 1})
+
+        ratings = dict(Product.objects.values_list('name', 'average_rating'))
+        self.assertEqual(ratings, {
+            "Portland Cement": Decimal('4.33'), "Rebar 12mm": Decimal('2.00'), "River Sand": Decimal('0.00'),
+        })
+        self.assertEqual(
+            dict(Product.objects.values_list('name', 'total_reviews')),
+            {"Portland Cement": 3, "Rebar 12mm": 1, "River Sand": 0},
+        )
+        self.owner.refresh_from_db()
+        self.assertEqual((self.owner.average_rating, self.owner.total_reviews), (Decimal('3.75'), 4))
+
+    def test_queries_scale_with_chunks_not_rows(self):
+        recompute_ratings()
+        # Per model: one chunk of pks, its stale-row check, and the empty chunk that ends the walk
+        with self.assertNumQueries(6):
+            self.assertEqual(recompute_ratings(), {'products_updated': 0, 'suppliers_updated': 0})
+
+    def test_task_reports_rows_changed(self):
+        result = update_product_ratings.apply().get()
+        self.assertEqual(result, {'status': 'success', 'products_updated': 3, 'suppliers_updated': 1})
+
+    def test_benchmark_command_rolls_back(self):
+        out = StringIO()
+        call_command('benchmark_rating_updates', '--reviews', '60', '--products', '12', '--suppliers', '3',
+                     '--chunk-size', '5', stdout=out)
+        output = out.getvalue()
+        self.assertIn('per-row', output)
+        self.assertIn('set-based', output)
+        self.assertEqual(Review.objects.count(), 4)
@@ -0,0 +1,71 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.models import Category, SubscriptionPlan
+from api.tests.helpers import LOCMEM_CACHES, CacheSettingsMixin, create_owner, create_product
+
+
+class AnonymousResponseCacheTests(CacheSettingsMixin, APITestCase):
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        self.owner = create_owner()
+        self.owner_user = self.owner.user
+        self.category = Category.objects.create(name="Cement", slug="cement")
+        create_product(self.owner, self.category, "Portland Cement")
+
+    def test_equivalent_query_strings_share_one_rendered_response(self):
+        url = reverse("product-list")
+        first = self.client.get(url + "?page=1&ordering=name&status=")
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("public", first["Cache-Control"])
+        self.assertIn("max-age=60", first["Cache-Control"])
+        self.assertIn("Authorization", first["Vary"])
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url + "?ordering=name&page=1")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], first["Content-Type"])
+
+    def test_catalog_changes_invalidate_cached_lists(self):
+        url = reverse("product-list")
+        self.assertEqual(self.client.get(url).json()["count"], 1)
+        create_product(self.owner, self.category, "White Cement")
+        self.assertEqual(self.client.get(url).json()["count"], 2)
+
+        categories_url = reverse("category-list")
+        self.client.get(categories_url)
+        Category.objects.create(name="Steel", slug="steel")
+        self.assertEqual(len(self.client.get(categories_url).json()), 2)
+
+    def test_subscription_plans_follow_plan_saves(self):
+        url = reverse("subscription-plan-list")
+        plan = SubscriptionPlan.objects.create(
+            code="owner-standard", role="product_owner", tier="standard", display_name="Standard", amount=500,
+        )
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        plan.amount = 650
+        plan.save()
+        body = self.client.get(url).json()
+        plans = body["results"] if isinstance(body, dict) else body
+        self.assertEqual(plans[0]["amount"], "650.00")
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        url = reverse("product-list")
+        self.client.get(url)
+        self.client.force_authenticate(user=self.owner_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("public", response.get("Cache-Control", ""))
+        self.assertIn("Authorization", response["Vary"])
+
+    def test_pagination_links_follow_the_requested_host(self):
+        create_product(self.owner, self.category, "White Cement")
+        url = reverse("product-list") + "?page_size=1"
+        self.assertTrue(self.client.get(url).json()["next"].startswith("http://testserver/"))
+
+        response = self.client.get(url, HTTP_HOST="127.0.0.1", secure=True)
+        self.assertTrue(response.json()["next"].startswith("https://127.0.0.1/"))
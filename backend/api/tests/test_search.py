@@ -0,0 +1,316 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+
+from api import autocomplete, search, search_cache
+from api.models import Category, Product, ProductOwner
+from api.autocomplete import SuggestionIndex, reset_suggestion_index
+from api.search import tokenize
+from api.search_cache import normalize_query, search_cache_key
+from api.tests.helpers import LOCMEM_CACHES, CacheSettingsMixin, create_owner, create_product
+
+
+class TokenizerTests(SimpleTestCase):
+    def test_splits_on_ethiopic_punctuation(self):
+        self.assertEqual(tokenize("የግንባታ፡ቁሳቁሶች። ሲሚንቶ፣ብረት"), ["የግንባታ", "ቁሳቁሶች", "ሲሚንቶ", "ብረት"])
+
+    def test_folds_case_and_homophone_letters(self):
+        self.assertEqual(tokenize("Cement PIPES"), ["cement", "pipes"])
+        # ሠ/ሰ and ዐ/አ spellings of the same word tokenize identically
+        self.assertEqual(tokenize("ሠራ ዐይን"), tokenize("ሰራ አይን"))
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        owner_user = get_user_model().objects.create_user(
+            username="supplier",
+            password="password123",
+            role="product_owner",
+        )
+        owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.cement = Product.objects.create(
+            owner=owner,
+            category=category,
+            name="Portland Cement",
+            name_amharic="ፖርትላንድ ሲሚንቶ",
+            description="Grade 42.5 bagged cement",
+            unit="bag",
+            location="Addis Ababa",
+            status="active",
+        )
+        self.mixer = Product.objects.create(
+            owner=owner,
+            category=category,
+            name="Concrete Mixer",
+            description="Drum mixer for cement and aggregate",
+            unit="piece",
+            location="Adama",
+            status="active",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=owner_user)
+
+    def test_search_endpoint_matches_amharic(self):
+        response = self.client.get(reverse("search"), {"q": "ሲሚንቶ"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["name"] for item in response.json()["products"]], ["Portland Cement"])
+
+    def test_name_matches_rank_above_description_matches(self):
+        response = self.client.get(reverse("product-list"), {"search": "cement"})
+        names = [item["name"] for item in response.json()["results"]]
+        self.assertEqual(names, ["Portland Cement", "Concrete Mixer"])
+
+    def test_last_term_matches_as_prefix(self):
+        response = self.client.get(reverse("search"), {"q": "concrete mix"})
+        self.assertEqual([item["name"] for item in response.json()["products"]], ["Concrete Mixer"])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.mixer.name = "Drum Vibrator"
+        self.mixer.save()
+        response = self.client.get(reverse("search"), {"q": "vibrator"})
+        self.assertEqual(len(response.json()["products"]), 1)
+
+        self.mixer.delete()
+        response = self.client.get(reverse("search"), {"q": "vibrator"})
+        self.assertEqual(response.json()["products"], [])
+
+    def test_missing_index_falls_back_to_icontains(self):
+        backend = search.SQLiteFTSSearchBackend()
+        backend.table = 'missing_search_table'
+        with mock.patch.object(search, '_backend', backend):
+            results = search.search_products(Product.objects.all(), "mixer")
+            self.assertEqual([product.name for product in results], ["Concrete Mixer"])
+
+    def test_failed_index_write_does_not_break_the_save(self):
+        def broken_index(product):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT * FROM missing_search_table')
+
+        backend = search.get_search_backend()
+        with mock.patch.object(backend, 'index_product', side_effect=broken_index):
+            with transaction.atomic():
+                self.mixer.name = "Drum Vibrator"
+                self.mixer.save()
+                self.assertEqual(Product.objects.get(pk=self.mixer.pk).name, "Drum Vibrator")
+
+
+class SearchQueryNormalizationTests(SimpleTestCase):
+    def test_case_whitespace_and_unicode_forms_share_a_key(self):
+        self.assertEqual(normalize_query("  Portland\tCEMENT "), "portland cement")
+        # Decomposed and precomposed forms normalize to the same NFC string
+        self.assertEqual(normalize_query("Cafe\u0301"), normalize_query("Caf\u00e9"))
+
+    def test_filters_are_hashed_in_sorted_order(self):
+        with mock.patch.object(search_cache, 'get_catalog_version', return_value=1):
+            self.assertEqual(
+                search_cache_key("cement", {"city": "Adama", "brand": "Derba"}),
+                search_cache_key("cement", {"brand": "derba", "city": "adama"}),
+            )
+
+
+class SearchResultsCacheTests(CacheSettingsMixin, APITestCase):
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        self.owner = create_owner()
+        self.category = Category.objects.create(name="Cement", slug="cement")
+        create_product(self.owner, self.category, "Portland Cement")
+        self.client.force_authenticate(user=self.owner.user)
+
+    def test_equivalent_queries_are_served_from_cache(self):
+        url = reverse("search")
+        first = self.client.get(url, {"q": "Portland  Cement"}).json()
+        with self.assertNumQueries(0):
+            second = self.client.get(url, {"q": " portland cement"}).json()
+        self.assertEqual(first, second)
+        self.assertEqual([item["name"] for item in second["products"]], ["Portland Cement"])
+
+    def test_catalog_changes_invalidate_cached_results(self):
+        url = reverse("search")
+        self.assertEqual(len(self.client.get(url, {"q": "cement"}).json()["products"]), 1)
+        create_product(self.owner, self.category, "White Cement", location="Adama")
+        self.assertEqual(len(self.client.get(url, {"q": "cement"}).json()["products"]), 2)
+
+    def test_popular_queries_are_warmed(self):
+        search_cache.flush_query_counts({"portland": 5, "cement": 2})
+        self.assertEqual(search_cache.popular_queries(), ["portland", "cement"])
+        self.assertEqual(search_cache.warm_popular_queries(), 2)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("search"), {"q": "Portland"})
+        self.assertEqual(len(response.json()["products"]), 1)
+
+
+class SuggestionIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = SuggestionIndex([
+            ("category", "c1", "Cement", "ሲሚንቶ", None, 3.0),
+            ("product", "p1", "Portland Cement", "ፖርትላንድ ሲሚንቶ", "Cement", 1.0),
+            ("product", "p2", "Concrete Mixer", None, "Machinery", 1.2),
+        ])
+
+    def test_prefix_lookup_ranks_categories_first(self):
+        self.assertEqual([item["id"] for item in self.index.lookup("cem")], ["c1", "p1"])
+        self.assertEqual([item["id"] for item in self.index.lookup("ሲሚ")], ["c1", "p1"])
+
+    def test_trigram_fallback_tolerates_typos(self):
+        self.assertEqual([item["id"] for item in self.index.lookup("concreet")], ["p2"])
+
+    def test_brands_disappear_with_their_last_product(self):
+        self.index.set_product_brand("p1", "Dangote")
+        self.index.set_product_brand("p2", "Dangote")
+        self.index.set_product_brand("p1", None)
+        self.assertEqual([item["type"] for item in self.index.lookup("dang")], ["brand"])
+        self.index.set_product_brand("p2", "Mugher")
+        self.assertEqual(self.index.lookup("dang"), [])
+
+
+class SearchSuggestionsEndpointTests(APITestCase):
+    def setUp(self):
+        reset_suggestion_index()
+        owner_user = get_user_model().objects.create_user(
+            username="supplier",
+            password="password123",
+            role="product_owner",
+        )
+        self.owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        self.category = Category.objects.create(name="Steel", slug="steel", name_amharic="ብረት")
+        Product.objects.create(
+            owner=self.owner,
+            category=self.category,
+            name="Rebar 12mm",
+            brand="Steely",
+            unit="piece",
+            location="Addis Ababa",
+            status="active",
+        )
+
+    def tearDown(self):
+        reset_suggestion_index()
+
+    def test_suggestions_are_served_without_queries_once_built(self):
+        url = reverse("search-suggestions")
+        self.client.get(url, {"q": "st"})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"q": "ste"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item["type"], item["title"]) for item in response.json()["suggestions"]],
+            [("category", "Steel"), ("brand", "Steely")],
+        )
+
+    def test_signals_update_the_index_incrementally(self):
+        url = reverse("search-suggestions")
+        self.assertEqual(self.client.get(url, {"q": "wire"}).json()["suggestions"], [])
+        product = Product.objects.create(
+            owner=self.owner,
+            category=self.category,
+            name="Binding Wire",
+            unit="roll",
+            location="Adama",
+            status="active",
+        )
+        titles = [item["title"] for item in self.client.get(url, {"q": "wire"}).json()["suggestions"]]
+        self.assertEqual(titles, ["Binding Wire"])
+
+        product.status = "inactive"
+        product.save()
+        self.assertEqual(self.client.get(url, {"q": "wire"}).json()["suggestions"], [])
+
+
+class SuggestionDeltaTests(CacheSettingsMixin, APITestCase):
+    """Processes are simulated by swapping the module's process-wide index."""
+
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        reset_suggestion_index()
+        self.addCleanup(reset_suggestion_index)
+        self.owner = create_owner()
+        self.category = Category.objects.create(name="Steel", slug="steel")
+
+    def switch_process(self):
+        reset_suggestion_index()
+
+    def titles(self, query):
+        return [item["title"] for item in autocomplete.suggest(query)]
+
+    def test_other_processes_replay_deltas_instead_of_rebuilding(self):
+        autocomplete.get_suggestion_index()  # builds and stores the snapshot
+        create_product(self.owner, self.category, "Binding Wire")
+
+        self.switch_process()
+        with mock.patch.object(autocomplete, 'build_index_from_db', side_effect=AssertionError("rebuilt")):
+            with self.assertNumQueries(0):
+                self.assertEqual(self.titles("wire"), ["Binding Wire"])
+
+        create_product(self.owner, self.category, "Wire Mesh")
+        autocomplete._last_version_check = 0.0
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles("wire"), ["Binding Wire", "Wire Mesh"])
+
+    def test_missing_deltas_rebuild_and_store_a_fresh_snapshot(self):
+        autocomplete.get_suggestion_index()
+        product = create_product(self.owner, self.category, "Binding Wire")
+        caches['default'].delete(autocomplete.DELTA_KEY.format(version=caches['default'].get(autocomplete.VERSION_KEY)))
+
+        self.switch_process()
+        self.assertEqual(self.titles("wire"), ["Binding Wire"])
+        _, _, version = caches['default'].get(autocomplete.SNAPSHOT_KEY)
+        self.assertEqual(version, caches['default'].get(autocomplete.VERSION_KEY))
+
+        product.delete()
+        self.switch_process()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles("wire"), [])
+
+    def test_the_delta_is_stored_before_the_version_is_advanced(self):
+        autocomplete.get_suggestion_index()
+        backend = caches['default']
+        real_incr = backend.incr
+        seen = []
+
+        def incr(key, *args, **kwargs):
+            if key == autocomplete.VERSION_KEY:
+                seen.append(backend.get(autocomplete.DELTA_KEY.format(version=backend.get(key) + 1)))
+            return real_incr(key, *args, **kwargs)
+
+        with mock.patch.object(autocomplete.cache, 'incr', side_effect=incr):
+            create_product(self.owner, self.category, "Binding Wire")
+        self.assertEqual(len(seen), 1)
+        self.assertIsNotNone(seen[0])
+
+    def test_concurrent_publishers_take_separate_delta_numbers(self):
+        autocomplete.get_suggestion_index()
+        version = caches['default'].get(autocomplete.VERSION_KEY)
+        # Another process has stored its delta but not yet advanced the version
+        caches['default'].add(autocomplete.DELTA_KEY.format(version=version + 1), [], autocomplete.SNAPSHOT_TIMEOUT)
+        create_product(self.owner, self.category, "Binding Wire")
+        caches['default'].incr(autocomplete.VERSION_KEY)
+
+        self.switch_process()
+        with mock.patch.object(autocomplete, 'build_index_from_db', side_effect=AssertionError("rebuilt")):
+            self.assertEqual(self.titles("wire"), ["Binding Wire"])
+
+    def test_cache_errors_serve_the_local_index(self):
+        create_product(self.owner, self.category, "Binding Wire")
+        autocomplete.get_suggestion_index()
+        autocomplete._last_version_check = 0.0
+        failing = mock.Mock(**{name + '.side_effect': ConnectionError("down") for name in ('get', 'add', 'incr', 'set')})
+        with mock.patch.object(autocomplete, 'cache', failing):
+            with self.assertNumQueries(0):
+                self.assertEqual(self.titles("wire"), ["Binding Wire"])
+            create_product(self.owner, self.category, "Wire Mesh")
+            self.assertEqual(self.titles("wire"), ["Binding Wire", "Wire Mesh"])
+
+            self.switch_process()
+            response = self.client.get(reverse("search-suggestions"), {"q": "wire"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["title"] for item in response.json()["suggestions"]], ["Binding Wire", "Wire Mesh"])
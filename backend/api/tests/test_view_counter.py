@@ -0,0 +1,116 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.models import Category, Product, ProductOwner
+from api.tests.helpers import LOCMEM_CACHES, CacheSettingsMixin
+from api.view_counter import client_address, flush_view_counts, viewer_fingerprint
+
+
+class BufferedViewCounterTests(CacheSettingsMixin, APITestCase):
+    cache_settings = LOCMEM_CACHES
+
+    def setUp(self):
+        super().setUp()
+        owner_user = get_user_model().objects.create_user(
+            username="supplier",
+            password="password123",
+            role="product_owner",
+        )
+        owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        category = Category.objects.create(name="Cement", slug="cement")
+        self.product = Product.objects.create(
+            owner=owner,
+            category=category,
+            name="Portland Cement",
+            description="Grade 42.5",
+            unit="bag",
+            location="Addis Ababa",
+            status="active",
+            view_count=10,
+        )
+        self.url = reverse("product-increment-view", args=[self.product.pk])
+
+    def view(self, address):
+        return self.client.post(self.url, REMOTE_ADDR=address)
+
+    def test_views_are_buffered_and_deduplicated(self):
+        self.assertEqual(self.view("10.0.0.1").json()["view_count"], 11)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.view("10.0.0.2").json()["view_count"], 12)
+            # A repeat view from the same visitor is not counted again
+            self.assertEqual(self.view("10.0.0.2").json()["view_count"], 12)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_count, 10)
+
+        self.assertEqual(flush_view_counts(), {'products': 1, 'views': 2})
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_count, 12)
+        self.assertEqual(flush_view_counts(), {'products': 0, 'views': 0})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.view("10.0.0.3").json()["view_count"], 13)
+        flush_view_counts()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_count, 13)
+
+    def test_cache_errors_fall_back_to_the_database(self):
+        broken = mock.Mock(**{f'{name}.side_effect': ConnectionError("cache down") for name in ('get', 'add', 'incr')})
+        with mock.patch('api.view_counter.cache', broken):
+            response = self.view("10.0.0.1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["view_count"], 11)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_count, 11)
+
+    def test_hidden_products_are_not_counted(self):
+        Product.objects.filter(pk=self.product.pk).update(status="draft")
+        self.assertEqual(self.view("10.0.0.1").status_code, 404)
+
+
+class UnbufferedViewCounterTests(CacheSettingsMixin, APITestCase):
+    def test_falls_back_to_database_without_a_shared_cache(self):
+        owner_user = get_user_model().objects.create_user(username="s", password="password123", role="product_owner")
+        owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        product = Product.objects.create(
+            owner=owner, name="Rebar", description="Rebar", unit="piece", location="Adama", status="active",
+        )
+        response = self.client.post(reverse("product-increment-view", args=[product.pk]))
+        self.assertEqual(response.json()["view_count"], 1)
+        product.refresh_from_db()
+        self.assertEqual(product.view_count, 1)
+
+
+class DeployedCacheTests(APITestCase):
+    """Requests against the 'default' cache as deployed without Redis (the zutali_cache table)."""
+
+    def test_views_and_suggestions_use_the_cache_table(self):
+        owner_user = get_user_model().objects.create_user(username="s", password="password123", role="product_owner")
+        owner = ProductOwner.objects.create(user=owner_user, business_name="Supplier Co")
+        product = Product.objects.create(
+            owner=owner, name="Rebar", description="Rebar", unit="piece", location="Adama", status="active",
+        )
+        response = self.client.post(reverse("product-increment-view", args=[product.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse("search-suggestions"), {'q': 'reb'}).status_code, 200)
+
+
+class ClientAddressTests(SimpleTestCase):
+    def request(self, forwarded):
+        return RequestFactory().get('/', REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR=forwarded)
+
+    def test_forwarded_header_is_ignored_without_trusted_proxies(self):
+        self.assertEqual(client_address(self.request("1.2.3.4")), '10.0.0.9')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_client_supplied_entries_are_skipped(self):
+        # The proxy appends the address it saw; anything before it is spoofable
+        self.assertEqual(client_address(self.request("6.6.6.6, 1.2.3.4")), '1.2.3.4')
+        self.assertEqual(
+            viewer_fingerprint(self.request("7.7.7.7, 1.2.3.4")),
+            viewer_fingerprint(self.request("8.8.8.8, 1.2.3.4")),
+        )
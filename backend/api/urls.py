@@ -47,6 +47,7 @@ urlpatterns = [
     
     # Admin endpoints
     path('admin/dashboard/', views.admin_dashboard, name='admin-dashboard'),
+    path('admin/cache-metrics/', views.admin_cache_metrics, name='admin-cache-metrics'),
     path('admin/users/', views.admin_users, name='admin-users'),
     path('admin/users/<int:user_id>/toggle-status/', views.admin_toggle_user_status, name='admin-toggle-user-status'),
     path('admin/products/', views.admin_products, name='admin-products'),
@@ -69,6 +70,7 @@ urlpatterns = [
     
     # Search endpoint
     path('search/', views.search, name='search'),
+    path('search/suggestions/', views.search_suggestions, name='search-suggestions'),
     
     # Router URLs (these will be at /api/categories/, /api/products/, etc.)
     path('', include(router.urls)),
@@ -0,0 +1,216 @@
+"""
+Write-behind product view counter.
+
+``increment_view`` only touches the cache: each view bumps a pending counter
+for the product, and repeat views from the same viewer inside
+``VIEW_DEDUPE_WINDOW`` are ignored. ``flush_view_counts`` (run periodically
+by Celery) moves the pending counts into ``Product.view_count`` with one
+batched UPDATE per chunk of products, and adds them to the popularity
+leaderboards (``api.leaderboards``) in the same pass.
+
+Products with pending views are tracked in an append-only log of cache keys
+(``product_views_dirty_<n>``, numbered by an atomic sequence) because the
+generic cache API has no set type. A product is logged when its pending
+counter goes from 0 to 1, and again if views arrive while it is being
+flushed, so no increment is stranded.
+
+The live count returned to clients is the persisted count (cached) plus the
+pending delta. It is approximate while a flush is in progress.
+"""
+import hashlib
+import logging
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, IntegerField, Value, When
+
+from . import leaderboards
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "product_views_pending_{product_id}"
+BASE_KEY = "product_views_base_{product_id}"
+SEEN_KEY = "product_views_seen_{product_id}_{viewer}"
+DIRTY_KEY = "product_views_dirty_{index}"
+DIRTY_SEQUENCE_KEY = "product_views_dirty_seq"
+FLUSHED_SEQUENCE_KEY = "product_views_dirty_flushed"
+FLUSH_LOCK_KEY = "product_views_flush_lock"
+
+VIEW_DEDUPE_WINDOW = 30 * 60  # one counted view per viewer per product per 30 minutes
+BASE_TIMEOUT = 24 * 3600
+FLUSH_LOCK_TIMEOUT = 300
+FLUSH_CHUNK_SIZE = 500
+
+
+class CounterUnavailable(Exception):
+    """The configured cache can't hold counters (e.g. DummyCache) or is failing."""
+
+
+def client_address(request) -> str:
+    """
+    The client IP: REMOTE_ADDR, or the X-Forwarded-For entry added by the
+    outermost of ``settings.TRUSTED_PROXY_COUNT`` proxies. Entries left of
+    that are set by the client and can't be trusted.
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    if proxies > 0:
+        hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def viewer_fingerprint(request) -> str:
+    """Identify a viewer by user, session, or client address and user agent."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"u{user.pk}"
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        return f"s{session.session_key}"
+    address = client_address(request)
+    agent = request.META.get('HTTP_USER_AGENT', '')
+    return "a" + hashlib.sha1(f"{address}|{agent}".encode()).hexdigest()[:20]
+
+
+def _incr(key: str, delta: int = 1) -> int:
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Missing key: create it, tolerating a concurrent creator
+        cache.add(key, 0, None)
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            raise CounterUnavailable(key)
+
+
+def _mark_dirty(product_id: str) -> None:
+    index = _incr(DIRTY_SEQUENCE_KEY)
+    cache.set(DIRTY_KEY.format(index=index), product_id, None)
+
+
+def _persisted_count(product_id: str, queryset) -> Optional[int]:
+    key = BASE_KEY.format(product_id=product_id)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.filter(pk=product_id).values_list('view_count', flat=True).first()
+        if count is None:
+            return None
+        cache.add(key, count, BASE_TIMEOUT)
+    return count
+
+
+def record_view(product_id, viewer: str, queryset) -> Optional[int]:
+    """
+    Count a view of ``product_id`` and return the live view count, or None if
+    the product is not in ``queryset``. The database is only read the first
+    time a product's persisted count is needed. Raises CounterUnavailable
+    when the cache can't count the view, so callers can fall back to the
+    database.
+    """
+    try:
+        return _record_view(str(product_id), viewer, queryset)
+    except CounterUnavailable:
+        raise
+    except Exception as e:
+        logger.error(f"Error counting a view of product {product_id} in the cache: {e}")
+        raise CounterUnavailable(product_id) from e
+
+
+def _record_view(product_id: str, viewer: str, queryset) -> Optional[int]:
+    persisted = _persisted_count(product_id, queryset)
+    if persisted is None:
+        return None
+
+    pending_key = PENDING_KEY.format(product_id=product_id)
+    seen_key = SEEN_KEY.format(product_id=product_id, viewer=viewer)
+    if not cache.add(seen_key, 1, VIEW_DEDUPE_WINDOW):
+        return persisted + (cache.get(pending_key) or 0)
+
+    pending = _incr(pending_key)
+    if pending == 1:
+        _mark_dirty(product_id)
+    return persisted + pending
+
+
+def live_view_count(product_id, persisted: int) -> int:
+    """
+    Live count for a product whose ``persisted`` count came from elsewhere
+    (e.g. a cached payload), read from the cache without touching the database.
+    """
+    product_id = str(product_id)
+    base_key = BASE_KEY.format(product_id=product_id)
+    pending_key = PENDING_KEY.format(product_id=product_id)
+    try:
+        found = cache.get_many([base_key, pending_key])
+    except Exception as e:
+        logger.error(f"Error reading live view count for {product_id}: {e}")
+        return persisted
+    return found.get(base_key, persisted) + (found.get(pending_key) or 0)
+
+
+def flush_view_counts() -> Dict[str, int]:
+    """Apply pending view counts to the database in batched UPDATEs."""
+    from .models import Product
+
+    if not cache.add(FLUSH_LOCK_KEY, 1, FLUSH_LOCK_TIMEOUT):
+        return {'products': 0, 'views': 0, 'skipped': 1}
+    try:
+        flushed = cache.get(FLUSHED_SEQUENCE_KEY) or 0
+        sequence = cache.get(DIRTY_SEQUENCE_KEY) or 0
+        if sequence <= flushed:
+            return {'products': 0, 'views': 0}
+
+        dirty_keys = [DIRTY_KEY.format(index=index) for index in range(flushed + 1, sequence + 1)]
+        product_ids = set(cache.get_many(dirty_keys).values())
+
+        deltas = {}
+        for product_id in product_ids:
+            pending_key = PENDING_KEY.format(product_id=product_id)
+            pending = cache.get(pending_key) or 0
+            if pending <= 0:
+                continue
+            # decr rather than delete so views counted meanwhile survive
+            try:
+                remaining = cache.decr(pending_key, pending)
+            except ValueError:
+                continue  # evicted since the read; those views are lost
+            if remaining > 0:
+                _mark_dirty(product_id)
+            deltas[product_id] = pending
+
+        items = list(deltas.items())
+        for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+            chunk = items[start:start + FLUSH_CHUNK_SIZE]
+            try:
+                Product.objects.filter(pk__in=[product_id for product_id, _ in chunk]).update(
+                    view_count=F('view_count') + Case(
+                        *[When(pk=product_id, then=Value(delta)) for product_id, delta in chunk],
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    )
+                )
+            except Exception:
+                # Put the unwritten counts back so the next flush retries them
+                for product_id, delta in items[start:]:
+                    if _incr(PENDING_KEY.format(product_id=product_id), delta) == delta:
+                        _mark_dirty(product_id)
+                cache.set(FLUSHED_SEQUENCE_KEY, sequence, None)
+                raise
+
+        leaderboards.record_events('view', deltas)
+        for product_id, delta in items:
+            try:
+                cache.incr(BASE_KEY.format(product_id=product_id), delta)
+            except ValueError:
+                pass  # reloaded from the database on next use
+
+        cache.set(FLUSHED_SEQUENCE_KEY, sequence, None)
+        cache.delete_many(dirty_keys)
+        total = sum(deltas.values())
+        logger.info(f"Flushed {total} views for {len(deltas)} products")
+        return {'products': len(deltas), 'views': total}
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
@@ -24,10 +24,12 @@ from django.core.mail import send_mail
 from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import UploadedFile
 from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.shortcuts import get_object_or_404
 from datetime import datetime, timedelta
 from django.utils.text import slugify
-from django.http import HttpRequest
+from django.http import Http404, HttpRequest, HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from .models import (
     User, ProductOwner, Category, Product, Quotation,
     Review, Message, Admin, VerificationRequest,
@@ -38,11 +40,22 @@ from .serializers import (
     ProductOwnerSerializer, CategorySerializer, ProductSerializer,
     QuotationSerializer, QuotationResponseSerializer, ReviewSerializer, MessageSerializer,
     AdminSerializer, VerificationRequestSerializer,
-    SubscriptionPlanSerializer, SubscriptionSerializer, PaymentTransactionSerializer
+    SubscriptionPlanSerializer, SubscriptionSerializer, PaymentTransactionSerializer, favorite_product_ids,
 )
 from .permissions import IsProductOwner, IsAdmin, IsOwnerOrReadOnly, IsProductOwnerOfProduct
-from .pagination import StandardResultsSetPagination, LargeResultsSetPagination
-from .filters import ProductFilter, QuotationFilter, ReviewFilter
+from .pagination import StandardResultsSetPagination, LargeResultsSetPagination, KeysetCursorPagination
+from .filters import ProductFilter, QuotationFilter, ReviewFilter, FullTextSearchFilter
+from .search_cache import get_search_results
+from .autocomplete import suggest
+from .facets import get_catalog_version, get_product_facets
+from . import leaderboards, product_lookup
+from .view_counter import CounterUnavailable, live_view_count, record_view, viewer_fingerprint
+from .cache_utils import LISTING_TAG, SUBSCRIPTION_PLANS_TAG, CacheManager
+from .category_tree import get_category_tree
+from .http_cache import (
+    RESPONSE_CACHE_TIMEOUT, RESPONSE_MAX_AGE, get_category_tree_version, make_etag, not_modified_response,
+    response_cache_key, set_validator_headers,
+)
 from rest_framework import serializers
 
 logger = logging.getLogger(__name__)
@@ -1099,7 +1112,123 @@ def product_owner_profile(request):
         serializer.save()
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-class CategoryViewSet(viewsets.ModelViewSet):
+class SparseFieldsetViewMixin:
+    """Narrow the SQL of GET requests to the columns a ``?fields=`` projection renders."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request is None or self.request.method != 'GET':
+            return queryset
+
+        serializer = self.get_serializer()
+        projection = getattr(serializer, 'get_sparse_projection', None)
+        projection = projection() if projection else None
+        if projection is None:
+            return queryset
+
+        columns, relations = projection
+        return queryset.select_related(None).select_related(*sorted(relations)).only(*sorted(columns))
+
+
+class ConditionalGetViewMixin:
+    """
+    Serve 304s for list/retrieve when ``get_conditional_validators`` still
+    matches the client's If-None-Match / If-Modified-Since headers.
+    """
+
+    def get_conditional_validators(self, instance=None):
+        """
+        Return ``(etag, last_modified)`` for the current request, or None to skip.
+        ``instance`` is the object retrieve() already loaded, when there is one.
+        """
+        return None
+
+    def _conditional_etag(self, *parts):
+        # Sparse fieldsets and the renderer change the body for the same data
+        params = self.request.query_params
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return make_etag(*parts, params.get('fields', ''), params.get('expand', ''), getattr(renderer, 'format', ''))
+
+    def get_object(self):
+        obj = super().get_object()
+        self._conditional_instance = obj
+        return obj
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        meta = request.META
+        if 'HTTP_IF_NONE_MATCH' in meta or 'HTTP_IF_MODIFIED_SINCE' in meta:
+            validators = self.get_conditional_validators()
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+        else:
+            validators = None
+        response = handler(request, *args, **kwargs)
+        if validators is None:
+            # Unconditional request: derive the headers from what was just served
+            validators = self.get_conditional_validators(instance=getattr(self, '_conditional_instance', None))
+        return set_validator_headers(response, validators)
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Cache the rendered JSON of anonymous list requests, keyed on the scheme,
+    host, path, canonical query string and ``get_response_cache_versions`` -
+    tokens that change whenever the data behind the list does.
+    """
+    response_vary_headers = ('Accept', 'Authorization', 'Cookie')
+
+    def get_response_cache_versions(self):
+        raise NotImplementedError
+
+    def _response_cacheable(self, request):
+        renderer = getattr(request, 'accepted_renderer', None)
+        return not request.user.is_authenticated and getattr(renderer, 'format', None) == 'json'
+
+    def _render(self, response):
+        response.accepted_renderer = self.request.accepted_renderer
+        response.accepted_media_type = self.request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+
+    def list(self, request, *args, **kwargs):
+        if not self._response_cacheable(request):
+            response = super().list(request, *args, **kwargs)
+            patch_vary_headers(response, self.response_vary_headers)
+            return response
+
+        cache_key = cached = None
+        try:
+            cache_key = response_cache_key(
+                request, request.accepted_renderer.format, *self.get_response_cache_versions(),
+            )
+            cached = CacheManager.peek(cache_key)
+        except Exception as e:
+            logger.error(f"Error reading cached response for {request.path}: {e}")
+
+        if cached is not None:
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+        else:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == 200 and cache_key is not None:
+                self._render(response)
+                CacheManager.store(
+                    cache_key, {'content': response.content, 'content_type': response['Content-Type']},
+                    RESPONSE_CACHE_TIMEOUT, grace=0,
+                )
+        patch_cache_control(response, public=True, max_age=RESPONSE_MAX_AGE)
+        patch_vary_headers(response, self.response_vary_headers)
+        return response
+
+
+class CategoryViewSet(ConditionalGetViewMixin, AnonymousResponseCacheMixin, SparseFieldsetViewMixin,
+                      viewsets.ModelViewSet):
     """ViewSet for categories with full CRUD (admin only for create/update/delete)"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -1112,6 +1241,19 @@ class CategoryViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated(), IsAdmin()]
         return [AllowAny()]
 
+    def get_conditional_validators(self, instance=None):
+        version, changed_at = get_category_tree_version()
+        return self._conditional_etag('categories', self.action, version, self.kwargs.get('pk', '')), changed_at
+
+    def get_response_cache_versions(self):
+        version, _ = get_category_tree_version()
+        return (version,)
+
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """Active categories as a nested tree, from one query and cached per tree version"""
+        return self._conditional(lambda request: Response(get_category_tree()), request)
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -1265,21 +1407,34 @@ class CategoryViewSet(viewsets.ModelViewSet):
                 pass
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetViewMixin, AnonymousResponseCacheMixin, SparseFieldsetViewMixin,
+                     viewsets.ModelViewSet):
     """ViewSet for products"""
-    queryset = Product.objects.select_related('owner', 'category', 'subcategory').all()
+    queryset = Product.objects.select_related('owner__user', 'category', 'subcategory').all()
     serializer_class = ProductSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [FullTextSearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description', 'location']
     ordering_fields = ['created_at', 'name']
     pagination_class = StandardResultsSetPagination
+    cursor_pagination_class = KeysetCursorPagination
     filterset_class = ProductFilter
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'increment_view']:
+        if self.action in ['list', 'retrieve', 'increment_view', 'facets']:
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    @property
+    def paginator(self):
+        """Opt into keyset pagination with ``?pagination=cursor`` (or by passing a cursor)."""
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request is not None else {}
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_queryset(self):
         queryset = super().get_queryset()
 
@@ -1341,6 +1496,111 @@ class ProductViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def get_response_cache_versions(self):
+        # Catalog edits bump the catalog version; reviews bump the listing tag
+        return get_catalog_version(), CacheManager.get_tag_versions([LISTING_TAG])[LISTING_TAG]
+
+    # Query parameters that leave the full public detail payload unchanged
+    DETAIL_CACHE_PARAMS = frozenset({'format'})
+
+    def _detail_cacheable(self):
+        """Only the full payload of a publicly visible product is shared through the cache."""
+        user = self.request.user
+        if user.is_authenticated and getattr(user, 'role', None) in ('product_owner', 'admin'):
+            return False  # their querysets differ from the public one
+        return set(self.request.query_params) <= self.DETAIL_CACHE_PARAMS
+
+    def _product_detail(self):
+        """
+        The serialized product from the detail cache, with the live view count
+        and the viewer's own flags merged in. None if the cache is unusable.
+        """
+        if hasattr(self, '_product_detail_data'):
+            return self._product_detail_data
+        pk = str(self.kwargs.get('pk'))
+        try:
+            uuid.UUID(pk)
+        except ValueError:
+            raise Http404
+        if product_lookup.is_known_missing(pk, 'public'):
+            raise Http404
+        try:
+            cached = CacheManager.get_product_details(
+                pk, compute=lambda: dict(self.get_serializer(self.get_object()).data)
+            )
+        except Http404:
+            product_lookup.remember_missing(pk, 'public')
+            raise
+        except Exception as e:
+            logger.error(f"Error reading product {pk} through the detail cache: {e}")
+            cached = None
+        if cached is None:
+            self._product_detail_data = None
+            return None
+
+        data = dict(cached)
+        data['view_count'] = live_view_count(pk, data.get('view_count') or 0)
+        data['is_favorited'] = pk in favorite_product_ids(self.get_serializer_context())
+        self._product_detail_data = data
+        return data
+
+    def retrieve(self, request, *args, **kwargs):
+        if not product_lookup.product_may_exist(self.kwargs.get('pk')):
+            raise Http404
+        if self._detail_cacheable():
+            response = self._conditional(self._retrieve_cached, request, *args, **kwargs)
+        else:
+            response = super().retrieve(request, *args, **kwargs)
+        patch_vary_headers(response, ('Authorization', 'Cookie'))  # is_favorited is per user
+        return response
+
+    def _retrieve_cached(self, request, *args, **kwargs):
+        data = self._product_detail()
+        if data is None:
+            return super(ConditionalGetViewMixin, self).retrieve(request, *args, **kwargs)
+        return Response(data)
+
+    def get_conditional_validators(self, instance=None):
+        """
+        Validate product detail from a narrow row read instead of the serialized
+        product. ETag only: reviews, view flushes, category renames and the
+        viewer's favorites change the body without any timestamp to show for it,
+        so a Last-Modified date would let If-Modified-Since revalidate stale bodies.
+        """
+        if self.action != 'retrieve':
+            return None
+        if self._detail_cacheable():
+            data = self._product_detail()
+            if data is not None:
+                # The payload already carries everything the body depends on
+                digest = json.dumps(data, sort_keys=True, default=str)
+                return self._conditional_etag('product', self.kwargs.get('pk'), digest), None
+        fields = ('updated_at', 'owner__updated_at', 'view_count', 'average_rating', 'total_reviews')
+        if instance is not None and not (instance.get_deferred_fields() & set(fields)) \
+                and Product.owner.is_cached(instance) and 'updated_at' not in instance.owner.get_deferred_fields():
+            row = (instance.updated_at, instance.owner.updated_at, instance.view_count,
+                   instance.average_rating, instance.total_reviews)
+        else:
+            try:
+                row = self.get_queryset().filter(pk=self.kwargs.get('pk')).values_list(*fields).first()
+            except DjangoValidationError:
+                return None
+        if row is None:
+            return None  # let retrieve() produce the 404
+        category_version, _ = get_category_tree_version()
+        favorited = str(self.kwargs.get('pk')) in favorite_product_ids(self.get_serializer_context())
+        # Reviews and buffered view flushes change the body without touching updated_at
+        etag = self._conditional_etag('product', self.kwargs.get('pk'), *row, category_version, favorited)
+        return etag, None
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Only pay for the review subqueries when the payload renders them
+        if self.request is not None and self.request.method == 'GET':
+            if {'average_rating', 'review_count'} & set(self.get_serializer().fields):
+                queryset = queryset.with_review_stats()
+        return queryset
+
     def perform_create(self, serializer):
         # Ensure user is a product owner
         if not hasattr(self.request.user, 'product_owner_profile'):
@@ -1459,17 +1719,41 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = ReviewSerializer(reviews, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def facets(self, request):
+        """Option counts for the filter sidebar, for the same parameters as ProductFilter"""
+        public_products = Product.objects.filter(status='active', is_subscription_hidden=False)
+        return Response(get_product_facets(public_products, request.query_params))
+
     @action(detail=True, methods=['post'], permission_classes=[AllowAny])
     def increment_view(self, request, pk=None):
-        """Increment product view count"""
+        """Increment product view count (buffered in the cache, flushed by Celery)"""
+        try:
+            product_id = uuid.UUID(str(pk))
+        except ValueError:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        public_products = Product.objects.filter(status='active', is_subscription_hidden=False)
+        try:
+            view_count = record_view(product_id, viewer_fingerprint(request), public_products)
+        except CounterUnavailable:
+            view_count = self._increment_view_in_db()
+
+        if view_count is None:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'success': True,
+            'view_count': view_count
+        })
+
+    def _increment_view_in_db(self):
+        # Fallback when the cache cannot hold counters (e.g. DummyCache in development) or is down
         product = self.get_object()
         product.view_count = F('view_count') + 1
         product.save(update_fields=['view_count'])
         product.refresh_from_db()
-        return Response({
-            'success': True,
-            'view_count': product.view_count
-        })
+        leaderboards.record_event('view', product.pk)
+        return product.view_count
 
 
 def _serialize_admin_product(product: Product) -> Dict[str, Any]:
@@ -1632,9 +1916,11 @@ def admin_moderate_product(request, product_id: str):
         return Response({'message': 'Product rejected', 'product': _serialize_admin_product(product)})
 
 
-class QuotationViewSet(viewsets.ModelViewSet):
+class QuotationViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for quotations"""
-    queryset = Quotation.objects.select_related('product', 'user').all()
+    queryset = Quotation.objects.select_related(
+        'product__owner__user', 'product__category', 'product__subcategory', 'user'
+    ).all()
     serializer_class = QuotationSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
@@ -1839,11 +2125,14 @@ class MessageViewSet(viewsets.ModelViewSet):
         return Response(MessageSerializer(message).data)
 
 
-class SubscriptionPlanViewSet(viewsets.ReadOnlyModelViewSet):
+class SubscriptionPlanViewSet(AnonymousResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = SubscriptionPlan.objects.filter(is_active=True)
     serializer_class = SubscriptionPlanSerializer
     permission_classes = [AllowAny]
 
+    def get_response_cache_versions(self):
+        return (CacheManager.get_tag_versions([SUBSCRIPTION_PLANS_TAG])[SUBSCRIPTION_PLANS_TAG],)
+
     def get_queryset(self):
         queryset = super().get_queryset()
         role = self.request.query_params.get('role')
@@ -1955,6 +2244,16 @@ class VerificationRequestViewSet(viewsets.ModelViewSet):
         return Response(VerificationRequestSerializer(verification_request).data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def admin_cache_metrics(request):
+    """Per-namespace cache hit rates, latency and payload sizes, summed over all workers"""
+    stats = CacheManager.get_cache_stats()
+    if 'error' in stats:
+        return Response(stats, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response(stats, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdmin])
 def admin_dashboard(request):
@@ -2121,9 +2420,12 @@ def user_dashboard(request):
 @permission_classes([IsAuthenticated])
 def toggle_favorite_product(request, product_id: str):
     """Add or remove a product from the user's favorites"""
+    if not product_lookup.lookup_allowed(product_id, 'any'):
+        return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
     try:
         product = Product.objects.get(id=product_id)
     except Product.DoesNotExist:
+        product_lookup.remember_missing(product_id, 'any')
         return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
     user = request.user
@@ -2136,7 +2438,10 @@ def toggle_favorite_product(request, product_id: str):
         user.favorite_products.add(product)
         action = 'added'
 
-    favorites_count = user.favorite_products.count()
+    # Refresh the cached id set that drives ``is_favorited`` on product payloads
+    favorite_ids = [str(pk) for pk in user.favorite_products.values_list('pk', flat=True)]
+    CacheManager.set_user_favorites(user.pk, favorite_ids)
+    favorites_count = len(favorite_ids)
 
     return Response({
         'status': action,
@@ -2458,52 +2763,34 @@ def chapa_payment_callback(request):
 def search(request):
     """Handle search requests for products and categories"""
     try:
-        query = request.GET.get('q', '')
-        
-        if not query or len(query) < 2:
-            return Response({'products': [], 'categories': []}, status=status.HTTP_200_OK)
-        
-        # Search products
-        products = Product.objects.filter(
-            Q(name__icontains=query) | 
-            Q(description__icontains=query) |
-            Q(name_amharic__icontains=query) |
-            Q(description_amharic__icontains=query)
-        ).select_related('category')[:10]
-        
-        # Search categories
-        categories = Category.objects.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(name_amharic__icontains=query) |
-            Q(description_amharic__icontains=query)
-        )[:5]
-        
-        # Serialize results
-        product_results = []
-        for product in products:
-            product_results.append({
-                'id': product.id,
-                'name': product.name,
-                'category': {'name': product.category.name} if product.category else None
-            })
-        
-        category_results = []
-        for category in categories:
-            category_results.append({
-                'id': category.id,
-                'name': category.name
-            })
-        
-        return Response({
-            'products': product_results,
-            'categories': category_results
-        }, status=status.HTTP_200_OK)
+        # Normalized, cached per catalog version (see search_cache)
+        results = get_search_results(request.GET.get('q', ''))
+        return Response(results, status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_suggestions(request):
+    """Type-ahead suggestions served from the in-memory autocomplete index"""
+    query = request.GET.get('q', '')
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+
+    if not query.strip():
+        return Response({'suggestions': []}, status=status.HTTP_200_OK)
+
+    try:
+        return Response({'suggestions': suggest(query, limit=limit)}, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"Error building search suggestions: {e}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def api_root(request, format=None):
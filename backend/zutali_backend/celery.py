@@ -37,11 +37,23 @@ app.conf.update(
 app.conf.beat_schedule = {
     'warm-popular-products-cache': {
         'task': 'api.tasks.warm_popular_products_cache',
-        'schedule': 3600.0,  # Every hour
+        'schedule': 300.0,  # Every 5 minutes (a leaderboard read, no table sort)
     },
     'warm-trending-products-cache': {
         'task': 'api.tasks.warm_trending_products_cache',
-        'schedule': 1800.0,  # Every 30 minutes
+        'schedule': 300.0,  # Every 5 minutes
+    },
+    'trim-leaderboards': {
+        'task': 'api.tasks.trim_product_leaderboards',
+        'schedule': 3600.0,  # Every hour
+    },
+    'flush-product-view-counts': {
+        'task': 'api.tasks.flush_product_view_counts',
+        'schedule': 60.0,  # Every minute
+    },
+    'warm-popular-search-results': {
+        'task': 'api.tasks.warm_popular_search_results',
+        'schedule': 300.0,  # Every 5 minutes
     },
     'rotate-category-images': {
         'task': 'api.tasks.rotate_category_images',
@@ -1,6 +1,6 @@
 # local_settings.py
 # Development-specific settings
-# This file is ignored by git and used for local development overrides
+# Loaded by settings.py only when DJANGO_LOCAL_SETTINGS=True
 
 # Enable debug toolbar in development
 DEBUG_TOOLBAR = True
@@ -14,11 +14,18 @@ SESSION_COOKIE_AGE = 1209600  # 2 weeks
 SESSION_SAVE_EVERY_REQUEST = True
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
-# Disable caching in development for consistent behavior
+# Disable caching in development for consistent behavior. Every namespace
+# api.cache_utils uses must still exist.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
+    },
+    'products': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
 }
 
 # Development logging
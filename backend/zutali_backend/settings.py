@@ -204,16 +204,101 @@ CHAPA_BASE_URL = os.environ.get('CHAPA_BASE_URL', 'https://api.chapa.co/v1')
 CHAPA_RETURN_URL = os.environ.get('CHAPA_RETURN_URL', 'http://localhost:3000/payment/success')
 CHAPA_CALLBACK_URL = os.environ.get('CHAPA_CALLBACK_URL', 'http://localhost:8000/api/payments/callback/')
 
+# Full-text search backend (dotted path). Empty picks one from the database
+# vendor: tsvector on PostgreSQL, FTS5 on SQLite, icontains elsewhere.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', '')
+
+# Popularity leaderboard backend (dotted path). Empty picks Redis sorted sets
+# when REDIS_URL is set, otherwise the product_scores table.
+LEADERBOARD_BACKEND = os.environ.get('LEADERBOARD_BACKEND', '')
+
+# Number of reverse proxies in front of Django that append to X-Forwarded-For.
+# With 0 the client address is REMOTE_ADDR; otherwise it is the entry that
+# many hops from the right (anything further left is client-supplied).
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
+
+# Public origin (scheme and host, e.g. https://api.example.com) the cache
+# warm-up (api.cache_warmup) renders listing pages for; it appears in their
+# absolute pagination links. Listing pages are not warmed while it is empty.
+CACHE_WARMUP_URL = os.environ.get('CACHE_WARMUP_URL', '')
+
 # Cache settings
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-        'TIMEOUT': 300,
-    }
+# Shared tier: Redis when REDIS_URL is set. Without it 'default' uses the
+# zutali_cache table (api.cache_backends.LockingDatabaseCache; migrate creates
+# it), since its counters, locks and version
+# stamps need atomic add/incr, and the other namespaces use a file cache every
+# local process can see. 'products' and 'sessions' add a per-process LRU (L1) in
+# front of it via api.cache_backends.TieredCache; 'default' stays shared-only
+# (api.cache_backends.MeteredCache) because it holds counters, locks and
+# version stamps that must agree across processes. Both backends record
+# per-namespace metrics (see api.cache_metrics) and encode values for the
+# shared tier per CACHE_SERIALIZERS (see api.cache_serializers; run
+# `manage.py benchmark_cache_serializers` to compare the options).
+REDIS_URL = os.environ.get('REDIS_URL', '')
+CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, '.cache'))
+
+# namespace: (shared TTL, L1 TTL or None for no L1)
+CACHE_NAMESPACES = {
+    'default': (300, None),
+    'products': (1800, 60),
+    'sessions': (3600, 30),
+}
+
+# namespace: shared-tier encoding; namespaces not listed are pickled as is.
+# 'products' holds JSON-shaped payloads, so JSON plus zlib above 1 KB is
+# smaller than pickle; anything JSON can't encode is pickled.
+CACHE_SERIALIZERS = {
+    'products': {
+        'SERIALIZER': os.environ.get('PRODUCTS_CACHE_SERIALIZER', 'json'),
+        'COMPRESSOR': os.environ.get('PRODUCTS_CACHE_COMPRESSOR', 'zlib') or None,
+        'COMPRESS_MIN_BYTES': 1024,
+    },
 }
 
-# Local settings override
-try:
+
+def _shared_cache(namespace, timeout):
+    if REDIS_URL:
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': f'zutali:{namespace}',
+            'TIMEOUT': timeout,
+        }
+    if namespace == 'default':
+        return {
+            'BACKEND': 'api.cache_backends.LockingDatabaseCache',
+            'LOCATION': 'zutali_cache',
+            'TIMEOUT': timeout,
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(CACHE_DIR, namespace),
+        'TIMEOUT': timeout,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
+
+CACHES = {}
+for _namespace, (_timeout, _l1_timeout) in CACHE_NAMESPACES.items():
+    CACHES[f'{_namespace}_shared'] = _shared_cache(_namespace, _timeout)
+    _options = {'L2': f'{_namespace}_shared', **CACHE_SERIALIZERS.get(_namespace, {})}
+    if _l1_timeout is None:
+        CACHES[_namespace] = {
+            'BACKEND': 'api.cache_backends.MeteredCache',
+            'LOCATION': _namespace,
+            'TIMEOUT': _timeout,
+            'OPTIONS': _options,
+        }
+        continue
+    CACHES[_namespace] = {
+        'BACKEND': 'api.cache_backends.TieredCache',
+        'LOCATION': _namespace,
+        'TIMEOUT': _timeout,
+        'OPTIONS': {**_options, 'L1_TIMEOUT': _l1_timeout, 'L1_MAX_ENTRIES': 1000},
+    }
+
+# Local settings override, only when asked for: local_settings.py turns the
+# caches off, which must never happen by accident in a deployment.
+if os.environ.get('DJANGO_LOCAL_SETTINGS') == 'True':
     from .local_settings import *
-except ImportError:
-    pass
@@ -0,0 +1,16 @@
+"""
+Settings for the test suite; manage.py loads them for ``manage.py test``.
+
+'default' keeps its deployed backend (the zutali_cache table without Redis,
+created by migrate as in a deployment), so the suite runs against it.
+'products' and 'sessions' are disabled because their shared file cache would
+outlive each test; tests that exercise them override CACHES.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+CACHES = {
+    **CACHES,
+    'products': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
@@ -10,7 +10,7 @@ import { useLanguage } from "@/lib/language-context"
 interface SearchSuggestion {
   id: string
   title: string
-  type: 'product' | 'category' | 'supplier'
+  type: 'product' | 'category' | 'brand' | 'supplier'
   category?: string
 }
 
@@ -68,23 +68,16 @@ export function SearchWithSuggestions({
 
       const searchAPI = async () => {
         try {
-          // Try to fetch from Next.js API route first
-          const response = await fetch(`/api/search?q=${encodeURIComponent(query)}`)
+          // Suggestions come from the backend's in-memory autocomplete index
+          const response = await fetch(`/api/search/suggestions?q=${encodeURIComponent(query)}&limit=8`)
           if (response.ok) {
             const data = await response.json()
-            const apiSuggestions = [
-              ...data.products?.map((p: any) => ({
-                id: p.id,
-                title: p.name,
-                type: 'product' as const,
-                category: p.category?.name
-              })) || [],
-              ...data.categories?.map((c: any) => ({
-                id: c.id,
-                title: c.name,
-                type: 'category' as const
-              })) || []
-            ]
+            const apiSuggestions: SearchSuggestion[] = (data.suggestions || []).map((s: any) => ({
+              id: s.id,
+              title: s.title,
+              type: s.type,
+              category: s.category || undefined
+            }))
             setSuggestions(apiSuggestions.slice(0, 8))
           } else {
             // Fallback to mock data